@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+import time
+from dependencies import get_router
+from database import dispose_engines
+from services.archive_service import TodoArchiveService, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+
+
+async def archive(after_days: int, batch_size: int):
+    started = time.perf_counter()
+
+    def report(archived):
+        print(f"{archived} todos archived ({time.perf_counter() - started:.1f}s)")
+
+    archived = 0
+    for shard_session in get_router().shard_sessions.values():
+        async with shard_session() as session:
+            archived += await TodoArchiveService(after_days=after_days, batch_size=batch_size).archive(
+                session, on_batch=lambda shard_archived: report(archived + shard_archived))
+
+    print(f"Done: {archived} todos archived in {time.perf_counter() - started:.1f}s")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old completed todos from todos to todos_archive")
+    parser.add_argument("--after-days", type=int, default=ARCHIVE_AFTER_DAYS, help="days since the last update")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="todos per transaction")
+    args = parser.parse_args()
+    asyncio.run(archive(args.after_days, args.batch_size))
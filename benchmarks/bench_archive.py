@@ -0,0 +1,125 @@
+"""Per-user query latency on the hot todos table before and after archiving.
+
+Fills BENCH_DATABASE_URL (e.g. a scratch PostgreSQL database) or a temporary SQLite
+file with --rows todos over --users users, updated at random over the last two years,
+with --completed-ratio of them completed. Times the GET /todos/user/{user_id} query handler
+(Users service stubbed out) for --samples random users, runs the archive job, then times
+the same users again, with and without include_archived.
+
+    py benchmarks/bench_archive.py --rows 2000000 --users 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy import delete, insert, select, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base
+from models import Todo, ArchivedTodo
+from handlers.query_handler import TodoQueryHandler
+from queries import GetTodosByUserQuery
+from services.archive_service import TodoArchiveService
+from services.todos_service import TodoService
+
+INSERT_BATCH_SIZE = 50000
+
+
+async def fill(session_factory, rows: int, users: int, completed_ratio: float):
+    now = datetime.now(timezone.utc)
+    async with session_factory() as session:
+        for start in range(0, rows, INSERT_BATCH_SIZE):
+            size = min(INSERT_BATCH_SIZE, rows - start)
+            values = []
+            for i in range(size):
+                updated = now - timedelta(seconds=random.randint(0, 2 * 365 * 86400))
+                values.append({
+                    "title": f"Todo {start + i}", "description": f"Todo number {start + i}",
+                    "is_completed": random.random() < completed_ratio, "user_id": random.randint(1, users),
+                    "date_created": updated - timedelta(days=random.randint(0, 30)), "date_updated": updated,
+                })
+            await session.execute(insert(Todo), values)
+            await session.commit()
+
+
+async def time_user_queries(session_factory, user_ids: list[int], include_archived: bool = False) -> list[float]:
+    handler = TodoQueryHandler()
+    latencies = []
+    async with session_factory() as session:
+        for user_id in user_ids:
+            started = time.perf_counter()
+            await handler.handle_get_todos_by_user_query(
+                GetTodosByUserQuery(user_id=user_id, include_archived=include_archived), session)
+            latencies.append(time.perf_counter() - started)
+            session.expunge_all()
+    return latencies
+
+
+def report(label: str, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<26} {statistics.mean(latencies) * 1000:>9.2f} "
+          f"{latencies[len(latencies) // 2] * 1000:>9.2f} {p99 * 1000:>9.2f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--completed-ratio", type=float, default=0.8)
+    parser.add_argument("--after-days", type=int, default=90)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+
+    database_file = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url is None:
+        database_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{database_file}"
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(Todo))
+        await conn.execute(delete(ArchivedTodo))
+
+    await fill(session_factory, args.rows, args.users, args.completed_ratio)
+    user_ids = random.sample(range(1, args.users + 1), min(args.samples, args.users))
+
+    before = await time_user_queries(session_factory, user_ids)
+    started = time.perf_counter()
+    async with session_factory() as session:
+        archived = await TodoArchiveService(after_days=args.after_days, batch_size=args.batch_size).archive(session)
+    archive_seconds = time.perf_counter() - started
+    after = await time_user_queries(session_factory, user_ids)
+    with_archive = await time_user_queries(session_factory, user_ids, include_archived=True)
+
+    async with session_factory() as session:
+        hot_rows = await session.scalar(select(func.count()).select_from(Todo))
+
+    await engine.dispose()
+    if database_file:
+        os.remove(database_file)
+
+    print(f"backend: {engine.dialect.name}, {args.rows} todos over {args.users} users")
+    print(f"archived {archived} todos in {archive_seconds:.1f}s ({archived / archive_seconds:.0f} rows/s), "
+          f"{hot_rows} left in todos")
+    print(f"{'per-user query':<26} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    report("before archiving", before)
+    report("after archiving", after)
+    report("after, include_archived", with_archive)
+
+
+if __name__ == "__main__":
+    with patch.object(TodoService, "check_user_exists", return_value=True):
+        asyncio.run(main())
@@ -0,0 +1,69 @@
+"""CPU cost vs bytes saved for compressing GET /todos style payloads.
+
+    py benchmarks/bench_compression.py --rows 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from middleware.compression import CompressionMiddleware, available_encodings
+
+
+def build_payload(rows: int) -> bytes:
+    now = datetime.now(timezone.utc).isoformat()
+    todos = [
+        {
+            "id": i,
+            "title": f"Todo number {i}",
+            "description": f"Description for todo {i}: buy groceries, walk the dog, call home",
+            "is_completed": i % 3 == 0,
+            "user_id": i % 500,
+            "date_created": now,
+            "date_updated": now,
+        }
+        for i in range(1, rows + 1)
+    ]
+    return json.dumps(todos).encode()
+
+
+def measure(middleware: CompressionMiddleware, encoding: str, payload: bytes, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compressor = middleware.compressor_for(encoding)
+        size = len(compressor.compress(payload) + compressor.finish())
+        best = min(best, time.perf_counter() - started)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--gzip-levels", type=int, nargs="+", default=[1, 6, 9])
+    parser.add_argument("--brotli-qualities", type=int, nargs="+", default=[1, 4, 6])
+    parser.add_argument("--zstd-levels", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    levels = {"gzip": args.gzip_levels, "br": args.brotli_qualities, "zstd": args.zstd_levels}
+    print(f"{'rows':>7} {'encoding':>8} {'level':>5} {'raw KB':>9} {'out KB':>9} {'saved':>7} {'cpu ms':>9} {'MB/s':>8}")
+    for rows in args.rows:
+        payload = build_payload(rows)
+        for encoding in available_encodings():
+            for level in levels[encoding]:
+                middleware = CompressionMiddleware(
+                    None, gzip_level=level, brotli_quality=level, zstd_level=level)
+                seconds, size = measure(middleware, encoding, payload, args.repeat)
+                print(f"{rows:>7} {encoding:>8} {level:>5} {len(payload) / 1024:>9.0f} {size / 1024:>9.0f} "
+                      f"{1 - size / len(payload):>7.1%} {seconds * 1000:>9.2f} "
+                      f"{len(payload) / seconds / 1e6:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Bytes on the wire and time for a large GET /todos/user/{user_id}, full vs ?fields= projections.
+
+Seeds --todos todos for one user with --description-size byte descriptions, then times the
+query alone (repository) and the whole request (route, serialization included) for each
+field set. Uses BENCH_DATABASE_URL or a temporary SQLite file; on PostgreSQL it also prints
+the plan of the projected query, which should be an Index Only Scan on
+ix_todos_user_id_id_covering once the table has been vacuumed.
+
+    py benchmarks/bench_fields.py --todos 20000 --description-size 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base
+from dependencies import TodoSession, get_session
+from models import Todo
+from repositories.statements import TODOS_BY_USER, projected
+from repositories.todos_repository import TodoRepository
+from routers import todo_routes
+from schemas import todo_fields
+from services.todos_service import TodoService
+
+FIELD_SETS = [None, "id,title,is_completed,date_updated", "id,title,is_completed"]
+USER_ID = 1
+
+
+async def time_calls(call, repeat: int) -> float:
+    await call()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--todos", type=int, default=20000)
+    parser.add_argument("--description-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    database_file = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url is None:
+        database_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{database_file}"
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, sync_session_class=TodoSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all, tables=[Todo.__table__])
+        await conn.run_sync(Base.metadata.create_all, tables=[Todo.__table__])
+        for start in range(0, args.todos, 5000):
+            await conn.execute(insert(Todo), [
+                {"title": f"Todo number {i}", "description": "d" * args.description_size,
+                 "is_completed": i % 3 == 0, "user_id": USER_ID}
+                for i in range(start, min(start + 5000, args.todos))
+            ])
+    if engine.dialect.name == "postgresql":
+        # Sets the visibility map, which index-only scans need
+        async with engine.connect() as conn:
+            await (await conn.execution_options(isolation_level="AUTOCOMMIT")).execute(text("VACUUM ANALYZE todos"))
+
+    app = FastAPI()
+    app.include_router(todo_routes.router)
+
+    async def override_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    repository = TodoRepository()
+
+    async def read(fields):
+        async with session_factory() as session:
+            return await repository.get_user_todos_by_id(session, USER_ID, fields=fields)
+
+    print(f"backend: {engine.dialect.name}, {args.todos} todos for one user, "
+          f"{args.description_size} byte descriptions, median of {args.repeat}")
+    print(f"{'fields':<36} {'bytes':>11} {'query ms':>9} {'request ms':>11}")
+    with patch.object(TodoService, "check_user_exists", return_value=True):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for field_set in FIELD_SETS:
+                fields = todo_fields([field_set]) if field_set else None
+                path = f"/todos/user/{USER_ID}" + (f"?fields={field_set}" if field_set else "")
+                response = await client.get(path)
+                response.raise_for_status()
+                query_seconds = await time_calls(lambda: read(fields), args.repeat)
+                request_seconds = await time_calls(lambda: client.get(path), args.repeat)
+                print(f"{field_set or '(all)':<36} {len(response.content):>11,} {query_seconds * 1000:>9.1f} "
+                      f"{request_seconds * 1000:>11.1f}")
+
+    if engine.dialect.name == "postgresql":
+        statement = projected(TODOS_BY_USER, todo_fields(["id,title,is_completed"])).params(user_id=USER_ID)
+        sql = statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+        async with engine.connect() as conn:
+            plan = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))
+            print("\n".join(row[0] for row in plan))
+
+    await engine.dispose()
+    if database_file:
+        os.remove(database_file)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""Rows/second for the streaming import vs replaying rows through TodoCommandHandler.
+
+Uses BENCH_DATABASE_URL (e.g. a scratch PostgreSQL database to exercise COPY) or a
+temporary SQLite file. The Users service is stubbed with a fixed latency per call.
+
+    py benchmarks/bench_import.py --rows 100000 --per-row-rows 2000 --users 500
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from commands import CreateTodoCommand
+from database import Base
+from handlers.command_handler import TodoCommandHandler
+from models import Todo
+from services.import_service import TodoImportService
+from services.todos_service import TodoService
+
+
+def build_csv(rows: int, users: int) -> bytes:
+    lines = ["title,description,is_completed,user_id"]
+    for i in range(rows):
+        lines.append(f"Todo {i},Imported todo number {i},{'true' if i % 3 == 0 else 'false'},{random.randint(1, users)}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def chunked(data: bytes, size: int = 64 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--per-row-rows", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--users-latency", type=float, default=0.002, help="seconds per Users service call")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    database_file = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url is None:
+        database_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{database_file}"
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(Todo))
+
+    async def fake_check_user_exists(self, user_id):
+        await asyncio.sleep(args.users_latency)
+        return True
+
+    with patch.object(TodoService, "check_user_exists", fake_check_user_exists):
+        data = build_csv(args.rows, args.users)
+        started = time.perf_counter()
+        async with session_factory() as session:
+            result = await TodoImportService(batch_size=args.batch_size).import_todos(
+                chunked(data), "csv", session, io.StringIO())
+        import_seconds = time.perf_counter() - started
+
+        handler = TodoCommandHandler()
+        started = time.perf_counter()
+        async with session_factory() as session:
+            for i in range(args.per_row_rows):
+                command = CreateTodoCommand(
+                    title=f"Todo {i}", description=f"Created todo number {i}",
+                    is_completed=False, user_id=random.randint(1, args.users))
+                await handler.handle_create_todo_command(command, session)
+        per_row_seconds = time.perf_counter() - started
+
+    await engine.dispose()
+    if database_file:
+        os.remove(database_file)
+
+    import_rate = result.rows_imported / import_seconds
+    per_row_rate = args.per_row_rows / per_row_seconds
+    print(f"backend: {engine.dialect.name}, Users service latency {args.users_latency * 1000:.1f} ms")
+    print(f"{'path':<22} {'rows':>9} {'seconds':>9} {'rows/s':>10}")
+    print(f"{'streaming import':<22} {result.rows_imported:>9} {import_seconds:>9.2f} {import_rate:>10.0f}")
+    print(f"{'per-row command':<22} {args.per_row_rows:>9} {per_row_seconds:>9.2f} {per_row_rate:>10.0f}")
+    print(f"speedup: {import_rate / per_row_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
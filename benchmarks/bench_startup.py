@@ -0,0 +1,126 @@
+"""Cold start: import time of the app, and time from launch to the first 200.
+
+Each run starts fresh interpreters. "import" times `import main` alone. "ready" starts
+serve.py with one worker and polls GET /ops/ready until it answers 200, so it covers
+the interpreter, the imports and the lifespan warm-up. "first request" is the GET /todos
+that follows. Uses BENCH_DATABASE_URL or a temporary SQLite file, set up with create_db.py.
+
+With --max-import-ms / --max-ready-ms, it exits non-zero when a median is over budget.
+With --baseline, the medians written by --output on an earlier run (CI runs it on the
+base branch first) may be at most --max-regression slower.
+
+    py benchmarks/bench_startup.py --runs 5 --max-import-ms 1500 --max-ready-ms 3000
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_MAIN = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_import(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_MAIN], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_first_requests(env: dict, timeout: float) -> tuple[float, float]:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "serve.py", "--workers", "1", "--port", str(port)],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while True:
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"not ready after {timeout}s")
+                if server.poll() is not None:
+                    raise RuntimeError(f"serve.py exited with status {server.returncode}")
+                try:
+                    if client.get("/ops/ready").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+            ready = time.perf_counter() - started
+            request_started = time.perf_counter()
+            client.get("/todos").raise_for_status()
+            return ready, time.perf_counter() - request_started
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for a server to be ready")
+    parser.add_argument("--max-import-ms", type=float, help="fail if the median import time is over this")
+    parser.add_argument("--max-ready-ms", type=float, help="fail if the median time to ready is over this")
+    parser.add_argument("--output", help="also write the medians to this JSON file")
+    parser.add_argument("--baseline", help="medians JSON from an earlier run's --output")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="slowdown allowed over --baseline")
+    args = parser.parse_args()
+
+    database_file = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url is None:
+        database_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{database_file}"
+    # No drain delay, so each server stops as soon as it is measured
+    env = {**os.environ, "DATABASE_URL": url, "DRAIN_DELAY": "0"}
+    subprocess.run([sys.executable, "create_db.py"], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+
+    imports, readies, first_requests = [], [], []
+    for _ in range(args.runs):
+        imports.append(time_import(env))
+        ready, first_request = time_first_requests(env, args.timeout)
+        readies.append(ready)
+        first_requests.append(first_request)
+
+    medians = {
+        "import_ms": statistics.median(imports) * 1000,
+        "ready_ms": statistics.median(readies) * 1000,
+        "first_request_ms": statistics.median(first_requests) * 1000,
+    }
+    print(f"median of {args.runs} runs, {url.split(':')[0]}")
+    print(f"{'import main':<16} {medians['import_ms']:>8.0f} ms")
+    print(f"{'launch to ready':<16} {medians['ready_ms']:>8.0f} ms")
+    print(f"{'first GET /todos':<16} {medians['first_request_ms']:>8.1f} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(medians, output, indent=2)
+    if database_file:
+        os.remove(database_file)
+
+    budgets = {"import_ms": args.max_import_ms, "ready_ms": args.max_ready_ms}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        for name in budgets:
+            print(f"{name}: {medians[name]:.0f} vs {baseline[name]:.0f} on the baseline")
+            budget = baseline[name] * (1 + args.max_regression)
+            budgets[name] = budget if budgets[name] is None else min(budgets[name], budget)
+    over = [f"{name} {medians[name]:.0f} > {budget:.0f}"
+            for name, budget in budgets.items() if budget is not None and medians[name] > budget]
+    if over:
+        sys.exit("Startup over budget: " + ", ".join(over))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Per-call overhead of the hot reads: a select() built on every call vs the prebuilt statements.
+
+Uses BENCH_DATABASE_URL or a temporary SQLite file. Each query runs --calls times after a
+warm-up, and the compiled cache hit rate of each run is read from the engine events.
+
+    py benchmarks/bench_statements.py --calls 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base, count_statement_cache, statement_cache
+from models import Todo, VALIDATED
+from repositories.statements import TODO_BY_ID, TODOS_BY_USER, TODOS_BY_IDS
+
+
+def inline_queries(users: int, todos: int) -> dict:
+    # What the repository did before: a new construct per call
+    return {
+        "by id": lambda i: select(Todo).filter(Todo.id == i % todos + 1, Todo.validation_status == VALIDATED),
+        "by user_id": lambda i: select(Todo).filter(
+            Todo.user_id == i % users, Todo.validation_status == VALIDATED).order_by(Todo.id),
+        "by ids": lambda i: select(Todo).filter(
+            Todo.id.in_([i % todos + 1, (i + 7) % todos + 1]), Todo.validation_status == VALIDATED).order_by(Todo.id),
+    }
+
+
+def prebuilt_queries(users: int, todos: int) -> dict:
+    return {
+        "by id": lambda i: (TODO_BY_ID, {"todo_id": i % todos + 1}),
+        "by user_id": lambda i: (TODOS_BY_USER, {"user_id": i % users}),
+        "by ids": lambda i: (TODOS_BY_IDS, {"ids": [i % todos + 1, (i + 7) % todos + 1]}),
+    }
+
+
+async def run(session, build, calls: int) -> tuple[float, float]:
+    async def execute(i):
+        statement = build(i)
+        if isinstance(statement, tuple):
+            return await session.execute(*statement)
+        return await session.execute(statement)
+
+    for i in range(100):
+        (await execute(i)).scalars().all()
+    hits, misses = statement_cache.value(result="hit"), statement_cache.value(result="miss")
+    started = time.perf_counter()
+    for i in range(calls):
+        (await execute(i)).scalars().all()
+    elapsed = time.perf_counter() - started
+    hits, misses = statement_cache.value(result="hit") - hits, statement_cache.value(result="miss") - misses
+    return elapsed / calls, hits / (hits + misses)
+
+
+def construct_overhead(calls: int) -> float:
+    # Building the construct and its cache key, which the prebuilt statements skip
+    started = time.perf_counter()
+    for i in range(calls):
+        select(Todo).filter(Todo.user_id == i, Todo.validation_status == VALIDATED).order_by(Todo.id)._generate_cache_key()
+    return (time.perf_counter() - started) / calls
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--todos", type=int, default=2000)
+    args = parser.parse_args()
+
+    database_file = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url is None:
+        database_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{database_file}"
+    engine = create_async_engine(url)
+    event.listen(engine.sync_engine, "after_cursor_execute", count_statement_cache)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all, tables=[Todo.__table__])
+        await conn.run_sync(Base.metadata.create_all, tables=[Todo.__table__])
+        await conn.execute(insert(Todo), [
+            {"title": f"Todo {i}", "description": "", "is_completed": i % 2 == 0, "user_id": i % args.users}
+            for i in range(args.todos)
+        ])
+
+    results = {}
+    async with session_factory() as session:
+        for name, queries in (("inline", inline_queries), ("prebuilt", prebuilt_queries)):
+            for query, build in queries(args.users, args.todos).items():
+                results[query, name] = await run(session, build, args.calls)
+                # Keep the identity map from growing across runs
+                session.expunge_all()
+
+    await engine.dispose()
+    if database_file:
+        os.remove(database_file)
+
+    print(f"backend: {engine.dialect.name}, {args.calls} calls per query")
+    print(f"{'query':<12} {'inline us':>10} {'prebuilt us':>12} {'saved us':>9} {'hit rate':>9}")
+    for query in inline_queries(args.users, args.todos):
+        inline, _ = results[query, "inline"]
+        prebuilt, hit_rate = results[query, "prebuilt"]
+        print(f"{query:<12} {inline * 1e6:>10.1f} {prebuilt * 1e6:>12.1f} {(inline - prebuilt) * 1e6:>9.1f} "
+              f"{hit_rate:>9.1%}")
+    print(f"select() construction + cache key alone: {construct_overhead(args.calls) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Cost of GET /ops/stats against counting rows loaded through TodoRepository.get_all.
+
+Fills BENCH_DATABASE_URL (e.g. a scratch PostgreSQL database, for the SQL aggregate
+path) or a temporary SQLite file (NumPy chunked path) with --rows todos spread over
+--users users and the last year, rebuilds the summary counters, then times a cold and
+a cached stats call. The get_all baseline is skipped above --naive-max-rows, since it
+holds every row in memory.
+
+    py benchmarks/bench_stats.py --rows 10000000 --users 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base
+from models import Todo, TodoUserSummary
+from repositories.summary_repository import TodoSummaryRepository
+from repositories.todos_repository import TodoRepository
+from services.stats_service import TodoStatsService
+
+INSERT_BATCH_SIZE = 50000
+
+
+async def fill(session_factory, rows: int, users: int):
+    now = datetime.now(timezone.utc)
+    async with session_factory() as session:
+        for start in range(0, rows, INSERT_BATCH_SIZE):
+            size = min(INSERT_BATCH_SIZE, rows - start)
+            created = [now - timedelta(seconds=random.randint(0, 365 * 86400)) for _ in range(size)]
+            await session.execute(insert(Todo), [
+                {"title": f"Todo {start + i}", "description": "", "is_completed": random.random() < 0.4,
+                 "user_id": random.randint(1, users), "date_created": created[i], "date_updated": created[i]}
+                for i in range(size)
+            ])
+            await session.commit()
+        await TodoSummaryRepository().rebuild(session, 10000)
+
+
+async def naive_stats(session_factory, days: int):
+    # What a client or handler would otherwise do: load everything, count in Python
+    async with session_factory() as session:
+        todos = await TodoRepository().get_all(session)
+    per_user = {}
+    completed = 0
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    created_per_day = {}
+    for todo in todos:
+        per_user[todo.user_id] = per_user.get(todo.user_id, 0) + 1
+        completed += todo.is_completed
+        day = todo.date_created.date()
+        if day >= since:
+            created_per_day[day] = created_per_day.get(day, 0) + 1
+    np.percentile(list(per_user.values()), [50, 90, 99])
+    return completed
+
+
+async def timed(label: str, call):
+    tracemalloc.start()
+    started = time.perf_counter()
+    await call()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<26} {seconds:>10.3f} {peak / 1024 / 1024:>12.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--naive-max-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    database_file = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url is None:
+        database_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{database_file}"
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(Todo))
+        await conn.execute(delete(TodoUserSummary))
+
+    started = time.perf_counter()
+    await fill(session_factory, args.rows, args.users)
+    print(f"backend: {engine.dialect.name}, {args.rows} rows loaded in {time.perf_counter() - started:.1f}s")
+
+    stats_service = TodoStatsService(cache_ttl=60)
+
+    async def stats():
+        async with session_factory() as session:
+            await stats_service.get_stats(session, args.days)
+
+    print(f"{'path':<26} {'seconds':>10} {'peak MiB':>12}")
+    await timed("stats (cold)", stats)
+    await timed("stats (cached)", stats)
+    if args.rows <= args.naive_max_rows:
+        await timed("get_all + Python counting", lambda: naive_stats(session_factory, args.days))
+    else:
+        print(f"get_all baseline skipped above {args.naive_max_rows} rows")
+
+    await engine.dispose()
+    if database_file:
+        os.remove(database_file)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""How many change feed subscribers one worker can hold.
+
+Opens N subscriptions on the in-process broker, each drained by its own task (as the
+SSE/WebSocket routes do), then publishes events for random users and measures memory
+per subscriber and publish-to-delivery latency.
+
+    py benchmarks/bench_subscribers.py --subscribers 1000 10000 50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import AsyncExitStack
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from events.broker import InMemoryBroker
+from schemas import TodoEventModel, TodoModel
+
+
+async def consume(subscription, published_at, latencies):
+    while True:
+        event = await subscription.get()
+        latencies.append(time.perf_counter() - published_at[event.todo_id])
+
+
+async def run(subscribers: int, users: int, events: int):
+    broker = InMemoryBroker()
+    published_at = {}
+    latencies = []
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    async with AsyncExitStack() as stack:
+        consumers = []
+        for i in range(subscribers):
+            subscription = await stack.enter_async_context(broker.subscribe(i % users + 1))
+            consumers.append(asyncio.ensure_future(consume(subscription, published_at, latencies)))
+        await asyncio.sleep(0)
+        per_subscriber = (tracemalloc.get_traced_memory()[0] - baseline) / subscribers
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        for i in range(events):
+            now = datetime.now()
+            todo = TodoModel(
+                id=i, title="t", description="d", is_completed=False, user_id=random.randint(1, users),
+                date_created=now, date_updated=now)
+            published_at[i] = time.perf_counter()
+            await broker.publish(TodoEventModel(type="updated", user_id=todo.user_id, todo_id=i, todo=todo))
+            await asyncio.sleep(0)
+        while len(latencies) < events * subscribers // users and time.perf_counter() - started < 30:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+
+        for consumer in consumers:
+            consumer.cancel()
+        await asyncio.gather(*consumers, return_exceptions=True)
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    print(f"{subscribers:>11} {per_subscriber / 1024:>12.1f} {len(latencies):>10} "
+          f"{statistics.median(latencies) * 1000 if latencies else 0:>9.2f} {p99 * 1000:>9.2f} {elapsed:>8.2f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'subscribers':>11} {'KiB/subscr':>12} {'delivered':>10} {'p50 ms':>9} {'p99 ms':>9} {'seconds':>8}")
+    for subscribers in args.subscribers:
+        await run(subscribers, args.users, args.events)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""Create latency with the Users check inline (sync) vs deferred to the background validator.
+
+Uses BENCH_DATABASE_URL or a temporary SQLite file. The Users service is stubbed with a
+fixed latency per call; the deferred run also reports how long the validator takes to drain.
+
+    py benchmarks/bench_validation.py --creates 2000 --users-latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from commands import CreateTodoCommand
+from database import Base
+from handlers.command_handler import TodoCommandHandler
+from models import Todo, PENDING_VALIDATION
+from services.todos_service import TodoService
+from services.user_validation_service import UserValidationService
+
+
+async def run_creates(handler: TodoCommandHandler, session_factory, creates: int, users: int) -> list[float]:
+    latencies = []
+    async with session_factory() as session:
+        for i in range(creates):
+            command = CreateTodoCommand(
+                title=f"Todo {i}", description=f"Created todo number {i}",
+                is_completed=False, user_id=random.randint(1, users))
+            started = time.perf_counter()
+            await handler.handle_create_todo_command(command, session)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<10} {statistics.mean(latencies) * 1000:>9.2f} {latencies[len(latencies) // 2] * 1000:>9.2f} "
+          f"{p99 * 1000:>9.2f} {len(latencies) / sum(latencies):>10.0f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--creates", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--users-latency", type=float, default=0.02, help="seconds per Users service call")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    database_file = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url is None:
+        database_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{database_file}"
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def fake_check_user_exists(self, user_id):
+        await asyncio.sleep(args.users_latency)
+        return True
+
+    async def fake_check_users_exist(self, user_ids):
+        await asyncio.sleep(args.users_latency)
+        return {user_id: True for user_id in user_ids}
+
+    with patch.object(TodoService, "check_user_exists", fake_check_user_exists), \
+            patch.object(TodoService, "check_users_exist", fake_check_users_exist):
+        sync_latencies = await run_creates(
+            TodoCommandHandler(validation_mode="sync"), session_factory, args.creates, args.users)
+
+        validator = UserValidationService(session_factory=session_factory, workers=args.workers, poll_interval=0.05)
+        with patch("handlers.command_handler.get_user_validation_service", lambda: validator):
+            await validator.start()
+            deferred_latencies = await run_creates(
+                TodoCommandHandler(validation_mode="deferred"), session_factory, args.creates, args.users)
+            started = time.perf_counter()
+            async with session_factory() as session:
+                while await session.scalar(
+                        select(func.count()).select_from(Todo).where(Todo.validation_status == PENDING_VALIDATION)):
+                    await session.commit()
+                    await asyncio.sleep(0.01)
+            drain_seconds = time.perf_counter() - started
+            await validator.stop()
+
+    await engine.dispose()
+    if database_file:
+        os.remove(database_file)
+
+    print(f"backend: {engine.dialect.name}, Users service latency {args.users_latency * 1000:.1f} ms")
+    print(f"{'mode':<10} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'creates/s':>10}")
+    report("sync", sync_latencies)
+    report("deferred", deferred_latencies)
+    print(f"validator drained the remaining pending rows {drain_seconds:.2f}s after the last create")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""Open-loop overload test for the admission control middleware.
+
+Simulates a DB pool of POOL_SIZE connections with a fixed service time and
+offers OVERLOAD times its capacity, with and without admission control:
+
+    py benchmarks/load_admission.py --overload 3 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from middleware.admission import AdmissionControlMiddleware
+
+
+def build_app(pool_size: int, service_time: float, admission: dict = None) -> FastAPI:
+    app = FastAPI()
+    pool = asyncio.Semaphore(pool_size)
+
+    @app.get("/todos")
+    async def get_todos():
+        # Stand-in for waiting on a pooled connection inside get_session
+        async with pool:
+            await asyncio.sleep(service_time)
+        return []
+
+    if admission is not None:
+        app.add_middleware(AdmissionControlMiddleware, **admission)
+    return app
+
+
+async def run(app: FastAPI, rate: float, duration: float) -> tuple[list[float], int]:
+    latencies, rejected = [], 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            nonlocal rejected
+            started = time.perf_counter()
+            response = await client.get("/todos")
+            if response.status_code == 503:
+                rejected += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+        tasks = []
+        interval = 1.0 / rate
+        started = time.perf_counter()
+        next_at = started
+        while next_at - started < duration:
+            tasks.append(asyncio.create_task(one()))
+            next_at += interval
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        await asyncio.gather(*tasks)
+    return latencies, rejected
+
+
+def percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--service-time", type=float, default=0.02)
+    parser.add_argument("--overload", type=float, default=3.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    capacity = args.pool_size / args.service_time
+    rate = capacity * args.overload
+    print(f"capacity={capacity:.0f} req/s offered={rate:.0f} req/s for {args.duration}s")
+
+    scenarios = {
+        "no admission": None,
+        "admission": {
+            "read_concurrency": args.pool_size,
+            "read_queue": args.pool_size * 2,
+            "queue_timeout": 0.5,
+        },
+    }
+    print(f"{'scenario':<14} {'ok':>7} {'503':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, admission in scenarios.items():
+        app = build_app(args.pool_size, args.service_time, admission)
+        latencies, rejected = await run(app, rate, args.duration)
+        print(f"{name:<14} {len(latencies):>7} {rejected:>7} "
+              f"{percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 99) * 1000:>9.1f} "
+              f"{max(latencies) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""DB pool occupancy against Users service latency, with lazy vs eager connection checkout.
+
+Drives POST /todos, GET /todos/user/{user_id} and GET /todos/user/{user_id}/summary with
+--clients concurrent clients over a pool of --pool-size connections (no overflow). The
+Users service is stubbed with each --users-latency in turn. "eager" checks a connection out
+when the request's session is opened, as a session set up before the route would;
+"lazy" is get_session as it is, taking one on the first statement. Pool occupancy is
+sampled every millisecond. Uses BENCH_DATABASE_URL or a temporary SQLite file.
+
+    py benchmarks/load_pool.py --clients 50 --pool-size 5 --users-latency 0,0.02,0.1
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base
+from dependencies import TodoSession, get_session
+from routers import todo_routes
+from services.todos_service import TodoService
+
+
+def build_app(session_factory, eager: bool) -> FastAPI:
+    app = FastAPI()
+    app.include_router(todo_routes.router)
+
+    async def override_session():
+        async with session_factory() as session:
+            if eager:
+                await session.connection()
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    return app
+
+
+async def run(app: FastAPI, engine, clients: int, requests: int, users: int) -> dict:
+    pool = engine.sync_engine.pool
+    samples, latencies, errors = [], [], 0
+    sampling = True
+
+    async def sample():
+        while sampling:
+            samples.append(pool.checkedout())
+            await asyncio.sleep(0.001)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def one(i: int):
+            nonlocal errors
+            user_id = random.randint(1, users)
+            started = time.perf_counter()
+            if i % 3 == 0:
+                response = await client.post("/todos", json={
+                    "title": f"Todo {i}", "description": "", "is_completed": False, "user_id": user_id})
+            elif i % 3 == 1:
+                response = await client.get(f"/todos/user/{user_id}")
+            else:
+                # Half the users have no counters yet, so the Users service is asked
+                response = await client.get(f"/todos/user/{user_id + users}/summary")
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+        async def client_loop(number: int):
+            for i in range(number, requests, clients):
+                await one(i)
+
+        sampler = asyncio.create_task(sample())
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(number) for number in range(clients)))
+        elapsed = time.perf_counter() - started
+        sampling = False
+        await sampler
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "pool_mean": statistics.mean(samples),
+        "pool_max": max(samples),
+        "errors": errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--users-latency", default="0,0.02,0.1", help="comma-separated seconds per Users service call")
+    args = parser.parse_args()
+
+    database_file = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url is None:
+        database_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{database_file}"
+    engine = create_async_engine(url, pool_size=args.pool_size, max_overflow=0, pool_timeout=60)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, sync_session_class=TodoSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    latency = 0.0
+
+    async def fake_check_user_exists(self, user_id):
+        await asyncio.sleep(latency)
+        return True
+
+    async def fake_check_users_exist(self, user_ids):
+        await asyncio.sleep(latency)
+        return {user_id: True for user_id in user_ids}
+
+    print(f"backend: {engine.dialect.name}, {args.clients} clients, pool of {args.pool_size}, {args.requests} requests")
+    print(f"{'users ms':>8} {'checkout':<9} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'pool mean':>10} {'pool max':>9} {'errors':>7}")
+    with patch.object(TodoService, "check_user_exists", fake_check_user_exists), \
+            patch.object(TodoService, "check_users_exist", fake_check_users_exist):
+        for latency in [float(value) for value in args.users_latency.split(",")]:
+            for mode in ("eager", "lazy"):
+                result = await run(
+                    build_app(session_factory, eager=mode == "eager"), engine, args.clients, args.requests, args.users)
+                print(f"{latency * 1000:>8.0f} {mode:<9} {result['throughput']:>8.0f} {result['p50'] * 1000:>9.1f} "
+                      f"{result['p99'] * 1000:>9.1f} {result['pool_mean']:>10.2f} {result['pool_max']:>9} "
+                      f"{result['errors']:>7}")
+
+    await engine.dispose()
+    if database_file:
+        os.remove(database_file)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
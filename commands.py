@@ -1,7 +1,42 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, Field, model_validator
 
 class CreateTodoCommand(BaseModel):
     title: str
     description: str
     is_completed: bool
-    user_id: int
\ No newline at end of file
+    user_id: int
+
+# Bulk commands run as set-based UPDATE/DELETE statements. With batch_size set,
+# rows are changed batch_size at a time, one transaction per batch, to keep locks short.
+
+class BulkCompleteTodosCommand(BaseModel):
+    user_id: int
+    batch_size: Optional[int] = Field(default=None, gt=0)
+
+class BulkReopenTodosCommand(BaseModel):
+    user_id: int
+    batch_size: Optional[int] = Field(default=None, gt=0)
+
+class BulkDeleteTodosCommand(BaseModel):
+    user_id: Optional[int] = None
+    is_completed: Optional[bool] = None
+    batch_size: Optional[int] = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def require_filter(self):
+        if self.user_id is None and self.is_completed is None:
+            raise ValueError("At least one of user_id or is_completed is required")
+        return self
+
+class BulkReassignTodosCommand(BaseModel):
+    from_user_id: int
+    to_user_id: int
+    batch_size: Optional[int] = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def require_other_user(self):
+        # The filter would keep matching the rows it just reassigned, so batches would never end
+        if self.from_user_id == self.to_user_id:
+            raise ValueError("from_user_id and to_user_id must differ")
+        return self
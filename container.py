@@ -0,0 +1,36 @@
+from functools import lru_cache
+
+# The services and handlers behind the routes, each built on first use and then shared:
+# one TodoService, with its TodoRepository, serves both handlers, the importer and the
+# user validation workers. Modules are imported inside the getters, so importing the app
+# builds nothing, and NumPy is only loaded when the stats route first runs.
+
+
+@lru_cache(maxsize=None)
+def get_todos_service():
+    from services.todos_service import TodoService
+    return TodoService()
+
+
+@lru_cache(maxsize=None)
+def get_command_handler():
+    from handlers.command_handler import TodoCommandHandler
+    return TodoCommandHandler(todos_service=get_todos_service())
+
+
+@lru_cache(maxsize=None)
+def get_query_handler():
+    from handlers.query_handler import TodoQueryHandler
+    return TodoQueryHandler(todos_service=get_todos_service())
+
+
+@lru_cache(maxsize=None)
+def get_import_service():
+    from services.import_service import TodoImportService
+    return TodoImportService(get_todos_service())
+
+
+@lru_cache(maxsize=None)
+def get_stats_service():
+    from services.stats_service import TodoStatsService
+    return TodoStatsService()
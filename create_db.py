@@ -1,23 +1,28 @@
 import asyncio
-from database import Base, engine
+from database import Base, get_shard_engines
+from sharding.router import seed_todo_ids
 
 
 async def create_db():
-    async with engine.begin() as conn:
-        # Import your models here
-        from models import Todo
+    # Every shard gets the full schema
+    for shard_index, engine in enumerate(get_shard_engines()):
+        async with engine.begin() as conn:
+            # Import your models here
+            from models import Todo, ArchivedTodo, TodoUserSummary, IdempotencyKey
 
-        # Drop all tables if they exist
-        print("Dropping all tables...")
-        await conn.run_sync(Base.metadata.drop_all)
-        print("Tables dropped.")
+            # Drop all tables if they exist
+            print(f"Dropping all tables on shard {shard_index}...")
+            await conn.run_sync(Base.metadata.drop_all)
+            print("Tables dropped.")
 
-        # Create all tables
-        print("Creating all tables...")
-        await conn.run_sync(Base.metadata.create_all)
-        print("Tables created.")
+            # Create all tables
+            print(f"Creating all tables on shard {shard_index}...")
+            await conn.run_sync(Base.metadata.create_all)
+            # Todo ids start at the shard's own range
+            await seed_todo_ids(conn, shard_index)
+            print("Tables created.")
 
-    await engine.dispose()
+        await engine.dispose()
 
 if __name__ == "__main__":
     asyncio.run(create_db())
@@ -1,16 +1,67 @@
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 from dotenv import load_dotenv
 import os
+from typing import Optional
+from metrics import REGISTRY
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Comma-separated database URLs, one per shard; without it DATABASE_URL is the only shard
+SHARD_DATABASE_URLS = [url.strip() for url in os.getenv("SHARD_DATABASE_URLS", "").split(",") if url.strip()]
+# Compiled SQL kept per engine; misses that keep rising mean it is too small
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "500"))
+# Prepared statements kept per asyncpg connection
+PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("PREPARED_STATEMENT_CACHE_SIZE", "500"))
 
-engine = create_async_engine(
-    url=DATABASE_URL,
-    echo=True
-)
+statement_cache = REGISTRY.counter(
+    "sql_statement_cache_total", "SQL statements executed, by compiled cache result", ("result",))
+CACHE_RESULTS = {CACHE_HIT: "hit", CACHE_MISS: "miss"}
+
+
+def count_statement_cache(conn, cursor, statement, parameters, context, executemany):
+    # Text and DDL statements are not cached
+    statement_cache.inc(result=CACHE_RESULTS.get(context.cache_hit, "uncached"))
+
+
+def create_engine(url: str):
+    connect_args = {}
+    if make_url(url).get_driver_name() == "asyncpg":
+        connect_args["prepared_statement_cache_size"] = PREPARED_STATEMENT_CACHE_SIZE
+    engine = create_async_engine(url=url, echo=True, query_cache_size=QUERY_CACHE_SIZE, connect_args=connect_args)
+    event.listen(engine.sync_engine, "after_cursor_execute", count_statement_cache)
+    return engine
+
+
+_shard_engines: Optional[list[AsyncEngine]] = None
+
+
+def get_shard_engines() -> list[AsyncEngine]:
+    # Created on first use rather than at import, so importing the app loads no DB driver
+    # and builds no pool; the lifespan warm-up is normally the first caller
+    global _shard_engines
+    if _shard_engines is None:
+        _shard_engines = [create_engine(url) for url in SHARD_DATABASE_URLS or [DATABASE_URL]]
+    return _shard_engines
+
+
+def get_engine() -> AsyncEngine:
+    # The first shard, which also holds the tables that are not split by user
+    return get_shard_engines()[0]
+
+
+async def dispose_engines() -> None:
+    for shard in _shard_engines or []:
+        await shard.dispose()
+
+
+REGISTRY.gauge(
+    "db_pool_checked_out", "Pooled DB connections currently checked out, over all shards",
+    function=lambda: sum(getattr(shard.sync_engine.pool, "checkedout", lambda: 0)() for shard in _shard_engines or []))
 
 
 class Base(DeclarativeBase):
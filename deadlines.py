@@ -0,0 +1,38 @@
+import contextvars
+import time
+from typing import Optional
+from exceptions.deadline_exceeded_exception import DeadlineExceededException
+
+# Absolute deadline (time.monotonic()) of the request being served, if any
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+def set_deadline(timeout: Optional[float]) -> contextvars.Token:
+    deadline = None if timeout is None else time.monotonic() + timeout
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token: contextvars.Token) -> None:
+    _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    left = deadline - time.monotonic()
+    return left if default is None else min(left, default)
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check() -> None:
+    if expired():
+        raise DeadlineExceededException()
@@ -1,9 +1,54 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
-from database import engine
+import asyncio
+from functools import lru_cache
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import deadlines
+from database import get_shard_engines
+from repositories.summary_repository import apply_flush_deltas
+from sharding.router import ShardRouter, ShardedTodoSession
 
-async_session = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+class TodoSession(Session):
+    pass
+
+
+@event.listens_for(TodoSession, "after_begin")
+@event.listens_for(ShardedTodoSession, "after_begin")
+def apply_statement_timeout(session, transaction, connection):
+    left = deadlines.remaining()
+    if left is None:
+        return
+    if left <= 0:
+        deadlines.check()
+    # SET LOCAL only lasts for this transaction, so pooled connections never keep it
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}")
+
+
+@event.listens_for(TodoSession, "after_flush")
+@event.listens_for(ShardedTodoSession, "after_flush")
+def update_user_summaries(session, flush_context):
+    # ORM writes keep todo_user_summaries in step within the same transaction;
+    # bulk statements apply their deltas explicitly through TodoSummaryRepository
+    apply_flush_deltas(session)
+
+
+@lru_cache(maxsize=None)
+def get_router() -> ShardRouter:
+    # Its async_session is a plain session on a single database; with several shards,
+    # statements are routed by the user_id or todo id in their criteria and fanned out
+    # otherwise. shard_sessions has one session factory per shard.
+    return ShardRouter(get_shard_engines(), session_class=TodoSession)
 
 
 async def get_session():
-    async with async_session() as session:
-        yield session
+    # Opening the session takes nothing from the pool: a connection is checked out on its
+    # first statement and returned at commit, so handlers call the Users service before
+    # their first statement or after a commit
+    async with get_router().async_session() as session:
+        try:
+            yield session
+        except asyncio.CancelledError:
+            # The request timed out mid-statement: discard the connection instead of returning it to the pool
+            await session.invalidate()
+            raise
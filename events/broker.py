@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from sqlalchemy import bindparam, text, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from metrics import REGISTRY
+from schemas import TodoEventModel
+
+logger = logging.getLogger(__name__)
+
+EVENTS_BROKER = os.getenv("EVENTS_BROKER", "memory")
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENTS_SUBSCRIBER_QUEUE_SIZE", "100"))
+NOTIFY_CHANNEL = os.getenv("EVENTS_NOTIFY_CHANNEL", "todo_events")
+# Above this many rows in one batch, subscribers get one "resync" per user instead of per-row events
+BULK_ROW_EVENTS_LIMIT = int(os.getenv("BULK_ROW_EVENTS_LIMIT", "100"))
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD = 7900
+
+# unnest scans the payloads in array order, so listeners get them in publish order
+NOTIFY_MANY = text("SELECT pg_notify(:channel, payload) FROM unnest(:payloads) AS payload").bindparams(
+    bindparam("payloads", type_=ARRAY(Text)))
+
+subscribers_gauge = REGISTRY.gauge("events_subscribers", "Open change feed subscriptions")
+published_total = REGISTRY.counter("events_published_total", "Todo events published", ("type",))
+dropped_total = REGISTRY.counter("events_dropped_total", "Events dropped for subscribers that fell behind")
+
+
+class Subscription:
+    def __init__(self, user_id: int, max_queue: int = SUBSCRIBER_QUEUE_SIZE):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+    def deliver(self, event: TodoEventModel) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop the backlog and tell the client to refetch instead
+            # of letting one subscriber grow memory without bound
+            dropped_total.inc(self.queue.qsize())
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(TodoEventModel(type="resync", user_id=self.user_id))
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[TodoEventModel]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InMemoryBroker:
+    def __init__(self):
+        self._subscriptions: dict[int, set[Subscription]] = {}
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[Subscription]:
+        subscription = Subscription(user_id)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        subscribers_gauge.inc()
+        try:
+            yield subscription
+        finally:
+            subscribers_gauge.dec()
+            user_subscriptions = self._subscriptions.get(user_id)
+            if user_subscriptions is not None:
+                user_subscriptions.discard(subscription)
+                if not user_subscriptions:
+                    del self._subscriptions[user_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    async def publish(self, event: TodoEventModel) -> None:
+        await self.publish_many([event])
+
+    async def publish_many(self, events: list[TodoEventModel]) -> None:
+        for event in events:
+            published_total.inc(type=event.type)
+            self._fan_out(event)
+
+    def _fan_out(self, event: TodoEventModel) -> None:
+        user_ids = {event.user_id, event.previous_user_id} - {None}
+        for user_id in user_ids:
+            for subscription in tuple(self._subscriptions.get(user_id, ())):
+                subscription.deliver(event)
+
+
+class PostgresBroker(InMemoryBroker):
+    # Fans events out across workers with LISTEN/NOTIFY: every worker publishes with
+    # pg_notify and delivers to its own subscribers from one dedicated LISTEN connection.
+    def __init__(self, engine, channel: str = NOTIFY_CHANNEL):
+        super().__init__()
+        self.engine = engine
+        self.channel = channel
+        self._listen_connection = None
+        self._driver_connection = None
+
+    async def start(self) -> None:
+        self._listen_connection = await self.engine.connect()
+        raw_connection = await self._listen_connection.get_raw_connection()
+        self._driver_connection = raw_connection.driver_connection
+        await self._driver_connection.add_listener(self.channel, self._on_notify)
+
+    async def stop(self) -> None:
+        if self._listen_connection is not None:
+            await self._driver_connection.remove_listener(self.channel, self._on_notify)
+            await self._listen_connection.close()
+            self._listen_connection = None
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            self._fan_out(TodoEventModel.model_validate_json(payload))
+        except ValueError:
+            logger.exception("Ignoring malformed todo event payload")
+
+    async def publish_many(self, events: list[TodoEventModel]) -> None:
+        # One pooled connection and one statement for the whole batch, so a bulk
+        # command's events do not hold the pool for a round trip each
+        if not events:
+            return
+        payloads = []
+        for event in events:
+            published_total.inc(type=event.type)
+            payload = event.model_dump_json()
+            if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+                # Too large to NOTIFY: send the ids and let clients refetch the todo
+                payload = event.model_copy(update={"todo": None}).model_dump_json()
+            payloads.append(payload)
+        async with self.engine.connect() as conn:
+            await conn.execute(NOTIFY_MANY, {"channel": self.channel, "payloads": payloads})
+            await conn.commit()
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        if EVENTS_BROKER == "postgres":
+            from database import get_engine
+            _broker = PostgresBroker(get_engine())
+        else:
+            _broker = InMemoryBroker()
+    return _broker
+
+
+def set_broker(broker) -> None:
+    global _broker
+    _broker = broker
+
+
+async def publish_todo_event(event_type: str, todo=None, todo_id: Optional[int] = None,
+                             user_id: Optional[int] = None, previous_user_id: Optional[int] = None) -> None:
+    # Runs after the write has committed, so a broker failure is logged, never raised
+    try:
+        event = TodoEventModel(
+            type=event_type,
+            todo_id=todo.id if todo is not None else todo_id,
+            user_id=todo.user_id if todo is not None else user_id,
+            previous_user_id=previous_user_id,
+            todo=todo if event_type != "deleted" else None,
+        )
+        await get_broker().publish(event)
+    except Exception:
+        logger.exception("Failed to publish %s event", event_type)
+
+
+async def publish_bulk_events(event_type: str, rows, previous_user_id: Optional[int] = None) -> None:
+    # rows start with (todo_id, user_id), e.g. a bulk statement's RETURNING.
+    # Published as one batch; like single events, a broker failure is only logged.
+    if len(rows) <= BULK_ROW_EVENTS_LIMIT:
+        events = [
+            TodoEventModel(type=event_type, todo_id=todo_id, user_id=user_id, previous_user_id=previous_user_id)
+            for todo_id, user_id, *_ in rows
+        ]
+    else:
+        events = [
+            TodoEventModel(type="resync", user_id=user_id)
+            for user_id in {row[1] for row in rows} | ({previous_user_id} - {None})
+        ]
+    try:
+        await get_broker().publish_many(events)
+    except Exception:
+        logger.exception("Failed to publish %s events", event_type)
+
+
+def encode_sse(event: TodoEventModel) -> str:
+    return f"event: {event.type}\ndata: {event.model_dump_json()}\n\n"
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+from events.broker import (InMemoryBroker, PostgresBroker, Subscription, publish_todo_event, publish_bulk_events,
+                           set_broker, dropped_total)
+from schemas import TodoEventModel
+
+
+class TestInMemoryBroker(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.broker = InMemoryBroker()
+        set_broker(self.broker)
+
+    def tearDown(self):
+        set_broker(None)
+
+    async def test_publish_fans_out_to_user_subscribers(self):
+        async with self.broker.subscribe(1) as first, self.broker.subscribe(1) as second, \
+                self.broker.subscribe(2) as other:
+            await self.broker.publish(TodoEventModel(type="deleted", user_id=1, todo_id=10))
+
+            self.assertEqual((await first.get(timeout=1)).todo_id, 10)
+            self.assertEqual((await second.get(timeout=1)).todo_id, 10)
+            self.assertIsNone(await other.get(timeout=0.01))
+
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+    async def test_reassignment_reaches_previous_user(self):
+        async with self.broker.subscribe(1) as previous_owner:
+            await publish_todo_event("updated", todo_id=5, user_id=2, previous_user_id=1)
+
+            event = await previous_owner.get(timeout=1)
+
+        self.assertEqual((event.type, event.user_id, event.previous_user_id), ("updated", 2, 1))
+
+    async def test_slow_subscriber_gets_resync(self):
+        subscription = Subscription(user_id=1, max_queue=2)
+        dropped_before = dropped_total.value()
+
+        for todo_id in range(3):
+            subscription.deliver(TodoEventModel(type="updated", user_id=1, todo_id=todo_id))
+
+        # The backlog is replaced by a single resync marker instead of growing
+        self.assertEqual(subscription.queue.qsize(), 1)
+        self.assertEqual((await subscription.get()).type, "resync")
+        self.assertEqual(dropped_total.value(), dropped_before + 2)
+
+    async def test_publish_failures_are_not_raised(self):
+        with patch.object(InMemoryBroker, 'publish', new_callable=AsyncMock, side_effect=RuntimeError("down")):
+            await publish_todo_event("deleted", todo_id=1, user_id=1)
+
+
+    async def test_bulk_events_are_published_as_one_batch(self):
+        with patch.object(InMemoryBroker, 'publish_many', new_callable=AsyncMock) as mock_publish_many:
+            await publish_bulk_events("deleted", [(todo_id, 1, True) for todo_id in range(5)])
+
+        mock_publish_many.assert_awaited_once()
+        self.assertEqual([event.todo_id for event in mock_publish_many.call_args[0][0]], [0, 1, 2, 3, 4])
+
+    async def test_postgres_batch_notifies_over_one_connection(self):
+        engine = MagicMock()
+        conn = engine.connect.return_value.__aenter__.return_value = AsyncMock()
+        broker = PostgresBroker(engine, channel="todo_events")
+
+        await broker.publish_many([TodoEventModel(type="deleted", user_id=1, todo_id=todo_id) for todo_id in range(3)])
+        await broker.publish_many([])
+
+        engine.connect.assert_called_once()
+        conn.execute.assert_awaited_once()
+        parameters = conn.execute.call_args[0][1]
+        self.assertEqual(parameters["channel"], "todo_events")
+        self.assertEqual([TodoEventModel.model_validate_json(payload).todo_id for payload in parameters["payloads"]],
+                         [0, 1, 2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,5 @@
+class CrossShardMoveException(Exception):
+    def __init__(self, from_user_id, to_user_id):
+        self.from_user_id = from_user_id
+        self.to_user_id = to_user_id
+        super().__init__(f"Todos of user {from_user_id} cannot move to user {to_user_id}, who is on another shard.")
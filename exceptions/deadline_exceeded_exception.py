@@ -0,0 +1,3 @@
+class DeadlineExceededException(Exception):
+    def __init__(self, message="Request deadline exceeded"):
+        super().__init__(message)
@@ -1,20 +1,41 @@
-from models import Todo
-from commands import CreateTodoCommand
+import os
+from datetime import datetime, timezone
+from typing import Optional
+from models import Todo, VALIDATED, PENDING_VALIDATION
+from commands import CreateTodoCommand, BulkCompleteTodosCommand, BulkReopenTodosCommand, BulkDeleteTodosCommand, BulkReassignTodosCommand
+from sqlalchemy import select, update, delete, true, false
 from sqlalchemy.ext.asyncio import AsyncSession
 from repositories.todos_repository import TodoRepository
+from repositories.summary_repository import TodoSummaryRepository, add_delta, deltas_for_rows
 from services.todos_service import TodoService
 from exceptions.user_not_found_exception import UserNotFoundException
+from exceptions.cross_shard_move_exception import CrossShardMoveException
+from events.broker import publish_todo_event, publish_bulk_events
+from services.user_validation_service import get_user_validation_service
+from sharding.router import shard_router
+import deadlines
+
+USER_VALIDATION_MODE = os.getenv("USER_VALIDATION_MODE", "sync")
+
 
 class TodoCommandHandler:
-    def __init__(self):
-        self.todos_service = TodoService()
+    def __init__(self, validation_mode: str = USER_VALIDATION_MODE, todos_service: Optional[TodoService] = None):
+        self.todos_service = todos_service or TodoService()
+        self.summary_repository = TodoSummaryRepository()
+        self.validation_mode = validation_mode
 
     async def handle_create_todo_command(self, command: CreateTodoCommand, session: AsyncSession) -> Todo:
+        if self.validation_mode == "deferred":
+            return await self._create_pending_todo(command, session)
+
         user_exists = await self.todos_service.check_user_exists(command.user_id)
 
         if not user_exists:
             raise UserNotFoundException(f"User with id {command.user_id} not found")
 
+        # Don't start DB work for a client that has already given up
+        deadlines.check()
+
         new_todo = Todo(
             title=command.title,
             description=command.description,
@@ -24,4 +45,121 @@ class TodoCommandHandler:
         session.add(new_todo)
         await session.commit()
         await session.refresh(new_todo)
-        return new_todo
\ No newline at end of file
+        await publish_todo_event("created", new_todo)
+        return new_todo
+
+    async def _create_pending_todo(self, command: CreateTodoCommand, session: AsyncSession) -> Todo:
+        # Accept now, verify later: the row stays hidden from reads until the
+        # background validator has confirmed the user (and publishes "created" then)
+        new_todo = Todo(
+            title=command.title,
+            description=command.description,
+            is_completed=command.is_completed,
+            user_id=command.user_id,
+            validation_status=PENDING_VALIDATION,
+        )
+        session.add(new_todo)
+        await session.commit()
+        await session.refresh(new_todo)
+        get_user_validation_service().notify()
+        return new_todo
+
+    async def handle_bulk_complete_todos_command(self, command: BulkCompleteTodosCommand, session: AsyncSession) -> int:
+        return await self._bulk_update(
+            session,
+            [Todo.user_id == command.user_id, Todo.is_completed == false()],
+            {"is_completed": True},
+            command.batch_size,
+            lambda rows: completion_deltas(rows, 1),
+        )
+
+    async def handle_bulk_reopen_todos_command(self, command: BulkReopenTodosCommand, session: AsyncSession) -> int:
+        return await self._bulk_update(
+            session,
+            [Todo.user_id == command.user_id, Todo.is_completed == true()],
+            {"is_completed": False},
+            command.batch_size,
+            lambda rows: completion_deltas(rows, -1),
+        )
+
+    async def handle_bulk_reassign_todos_command(self, command: BulkReassignTodosCommand, session: AsyncSession) -> int:
+        user_exists = await self.todos_service.check_user_exists(command.to_user_id)
+
+        if not user_exists:
+            raise UserNotFoundException(f"User with id {command.to_user_id} not found")
+
+        # A todo's id says which shard it is on, so todos never move between shards
+        router = shard_router(session)
+        if router is not None and router.for_user(command.from_user_id) != router.for_user(command.to_user_id):
+            raise CrossShardMoveException(command.from_user_id, command.to_user_id)
+
+        return await self._bulk_update(
+            session,
+            [Todo.user_id == command.from_user_id],
+            {"user_id": command.to_user_id},
+            command.batch_size,
+            lambda rows: reassignment_deltas(rows, command.from_user_id),
+            previous_user_id=command.from_user_id,
+        )
+
+    async def handle_bulk_delete_todos_command(self, command: BulkDeleteTodosCommand, session: AsyncSession) -> int:
+        conditions = []
+        if command.user_id is not None:
+            conditions.append(Todo.user_id == command.user_id)
+        if command.is_completed is not None:
+            conditions.append(Todo.is_completed == command.is_completed)
+
+        return await self._run_batches(
+            session, lambda where: delete(Todo).where(*where), conditions, command.batch_size,
+            lambda rows: deltas_for_rows(((user_id, is_completed) for _, user_id, is_completed, _ in rows), -1),
+            "deleted")
+
+    async def _bulk_update(self, session: AsyncSession, conditions: list, values: dict, batch_size: Optional[int],
+                           summary_deltas, previous_user_id: Optional[int] = None) -> int:
+        values = {**values, "date_updated": datetime.now(timezone.utc)}
+        return await self._run_batches(
+            session, lambda where: update(Todo).where(*where).values(**values), conditions, batch_size,
+            summary_deltas, "updated", previous_user_id)
+
+    async def _run_batches(self, session: AsyncSession, build_statement, conditions: list, batch_size: Optional[int],
+                           summary_deltas, event_type: str, previous_user_id: Optional[int] = None) -> int:
+        # Every bulk filter excludes the rows it has already changed, so each
+        # batch picks up the next batch_size matching ids until none are left.
+        # The batch statement keeps the command's own conditions, so its user_id
+        # term still routes it to that user's shard.
+        deadlines.check()
+        affected = 0
+        while True:
+            where = conditions
+            if batch_size is not None:
+                batch_ids = select(Todo.id).where(*conditions).order_by(Todo.id).limit(batch_size).scalar_subquery()
+                where = [*conditions, Todo.id.in_(batch_ids)]
+            result = await session.execute(
+                build_statement(where).returning(Todo.id, Todo.user_id, Todo.is_completed, Todo.validation_status),
+                execution_options={"synchronize_session": False})
+            rows = result.all()
+            # Same transaction as the batch, so the summary counters never drift from it.
+            # Rows still pending validation are not counted yet.
+            await self.summary_repository.apply(
+                session, summary_deltas([row for row in rows if row[3] == VALIDATED]))
+            await session.commit()
+            affected += len(rows)
+            await publish_bulk_events(event_type, rows, previous_user_id)
+            if batch_size is None or len(rows) < batch_size:
+                return affected
+            deadlines.check()
+
+
+def completion_deltas(rows, sign: int) -> dict:
+    deltas = {}
+    for _, user_id, _, _ in rows:
+        add_delta(deltas, user_id, 0, sign)
+    return deltas
+
+
+def reassignment_deltas(rows, from_user_id: int) -> dict:
+    deltas = {}
+    for _, user_id, is_completed, _ in rows:
+        add_delta(deltas, from_user_id, -1, -1 if is_completed else 0)
+        add_delta(deltas, user_id, 1, 1 if is_completed else 0)
+    return deltas
@@ -1,19 +1,79 @@
-from sqlalchemy.future import select
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from models import Todo
-from queries import GetTodosByUserQuery
+from queries import GetTodosByUserQuery, GetTodosByIdsQuery, GetTodosByUsersQuery, GetTodoSummaryByUserQuery
 from exceptions.user_not_found_exception import UserNotFoundException
+import deadlines
 from services.todos_service import TodoService
+from repositories.summary_repository import TodoSummaryRepository
+from repositories.statements import (
+    TODOS_BY_USER, ANY_TODOS_BY_USER, ARCHIVED_TODOS_BY_USER, TODOS_BY_IDS, TODOS_BY_USERS, select_fields, fetch_all)
+from sharding.router import shard_router
 
 class TodoQueryHandler:
-    def __init__(self):
-        self.todos_service = TodoService()
+    def __init__(self, todos_service: Optional[TodoService] = None):
+        self.todos_service = todos_service or TodoService()
+        self.summary_repository = TodoSummaryRepository()
     
     async def handle_get_todos_by_user_query(self, query: GetTodosByUserQuery, session: AsyncSession) -> list[Todo]:
         user_exists = await self.todos_service.check_user_exists(query.user_id)
         
         if not user_exists:
             raise UserNotFoundException(f"User with id {query.user_id} not found")
+
+        # Skip the query if the deadline passed during the user check
+        deadlines.check()
         
-        result = await session.execute(select(Todo).filter(Todo.user_id == query.user_id))
-        return result.scalars().all()
+        statement = ANY_TODOS_BY_USER if query.include_pending else TODOS_BY_USER
+        result = await session.execute(select_fields(statement, query.fields), {"user_id": query.user_id})
+        todos = fetch_all(result, query.fields)
+        if query.include_archived:
+            # Only this opt-in path reads todos_archive
+            archived = await session.execute(
+                select_fields(ARCHIVED_TODOS_BY_USER, query.fields), {"user_id": query.user_id})
+            todos = sorted([*todos, *fetch_all(archived, query.fields)], key=lambda todo: todo.id)
+        return todos
+
+
+    async def handle_get_todos_by_ids_query(self, query: GetTodosByIdsQuery, session: AsyncSession) -> list[Todo]:
+        result = await session.execute(select_fields(TODOS_BY_IDS, query.fields), {"ids": sorted(set(query.ids))})
+        todos = fetch_all(result, query.fields)
+        if shard_router(session) is not None:
+            # Each shard's rows come back in order, one shard after the other
+            todos = sorted(todos, key=lambda todo: todo.id)
+        return todos
+
+    async def handle_get_todos_by_users_query(self, query: GetTodosByUsersQuery, session: AsyncSession) -> dict:
+        users_exist = await self.todos_service.check_users_exist(query.user_ids)
+        found_user_ids = [user_id for user_id, exists in users_exist.items() if exists]
+
+        todos_by_user = {user_id: [] for user_id in found_user_ids}
+        if found_user_ids:
+            deadlines.check()
+            # One IN query for every requested user instead of a query per user
+            # user_id is needed for the grouping, whether or not it was asked for
+            fields = query.fields and (*query.fields, "user_id")
+            result = await session.execute(select_fields(TODOS_BY_USERS, fields), {"user_ids": found_user_ids})
+            for todo in fetch_all(result, fields):
+                todos_by_user[todo.user_id].append(todo)
+
+        return {
+            "results": [{"user_id": user_id, "todos": todos} for user_id, todos in todos_by_user.items()],
+            "not_found_user_ids": [user_id for user_id, exists in users_exist.items() if not exists],
+        }
+
+    async def handle_get_todo_summary_by_user_query(self, query: GetTodoSummaryByUserQuery, session: AsyncSession) -> dict:
+        # One primary-key lookup on the counters table, however many todos the user has
+        summary = await self.summary_repository.get(session, query.user_id)
+        if summary is None:
+            # End the read first, so no pooled connection is held while the Users service answers
+            await session.commit()
+            # No counters yet: only a user who exists gets an empty summary
+            user_exists = await self.todos_service.check_user_exists(query.user_id)
+            if not user_exists:
+                raise UserNotFoundException(f"User with id {query.user_id} not found")
+            total, completed = 0, 0
+        else:
+            total, completed = summary.total, summary.completed
+
+        return {"user_id": query.user_id, "total": total, "completed": completed, "pending": total - completed}
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
+from commands import BulkCompleteTodosCommand, BulkDeleteTodosCommand, BulkReassignTodosCommand
+from exceptions.user_not_found_exception import UserNotFoundException
+from handlers.command_handler import TodoCommandHandler
+from services.todos_service import TodoService
+
+
+def result_with_rows(rowcount):
+    result = MagicMock()
+    result.all.return_value = [(todo_id, 1, False, "validated") for todo_id in range(rowcount)]
+    return result
+
+
+class TestTodoCommandHandler(unittest.IsolatedAsyncioTestCase):
+
+    async def test_bulk_complete_single_statement(self):
+        mock_session = MagicMock(spec=AsyncSession)
+        mock_session.execute.return_value = result_with_rows(7)
+
+        handler = TodoCommandHandler()
+        affected = await handler.handle_bulk_complete_todos_command(
+            BulkCompleteTodosCommand(user_id=1), mock_session)
+
+        self.assertEqual(affected, 7)
+        # The update plus the summary counter upsert, committed together
+        self.assertEqual(mock_session.execute.call_count, 2)
+        statement = str(mock_session.execute.call_args_list[0][0][0])
+        self.assertTrue(statement.startswith("UPDATE todos SET"))
+        self.assertIn("todos.user_id = :user_id_1", statement)
+        summary_statement = mock_session.execute.call_args_list[1][0][0]
+        self.assertTrue(str(summary_statement).startswith("INSERT INTO todo_user_summaries"))
+        self.assertEqual(summary_statement.compile().params["completed_m0"], 7)
+        mock_session.commit.assert_called_once()
+
+    async def test_bulk_delete_in_batches(self):
+        mock_session = MagicMock(spec=AsyncSession)
+        mock_session.execute.side_effect = [
+            result_with_rows(2), MagicMock(), result_with_rows(2), MagicMock(), result_with_rows(1), MagicMock()]
+
+        handler = TodoCommandHandler()
+        affected = await handler.handle_bulk_delete_todos_command(
+            BulkDeleteTodosCommand(is_completed=True, batch_size=2), mock_session)
+
+        # Stops once a batch comes back short, committing after every batch
+        self.assertEqual(affected, 5)
+        self.assertEqual(mock_session.execute.call_count, 6)
+        self.assertEqual(mock_session.commit.call_count, 3)
+        statement = str(mock_session.execute.call_args_list[4][0][0])
+        # The command's own conditions stay on the DELETE, next to the batch's ids
+        self.assertTrue(statement.startswith("DELETE FROM todos WHERE todos.is_completed = true AND todos.id IN (SELECT"))
+        self.assertIn("LIMIT", statement)
+
+    def test_bulk_delete_requires_filter(self):
+        with self.assertRaises(ValueError):
+            BulkDeleteTodosCommand()
+
+    @patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock, return_value=False)
+    async def test_bulk_reassign_unknown_target_user(self, mock_check_user_exists):
+        mock_session = MagicMock(spec=AsyncSession)
+
+        handler = TodoCommandHandler()
+        with self.assertRaises(UserNotFoundException):
+            await handler.handle_bulk_reassign_todos_command(
+                BulkReassignTodosCommand(from_user_id=1, to_user_id=2), mock_session)
+
+        mock_check_user_exists.assert_called_once_with(2)
+        mock_session.execute.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
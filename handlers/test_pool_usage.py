@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from commands import CreateTodoCommand, BulkReassignTodosCommand
+from database import Base
+from dependencies import TodoSession
+from handlers.command_handler import TodoCommandHandler
+from handlers.query_handler import TodoQueryHandler
+from queries import GetTodosByUserQuery, GetTodosByUsersQuery, GetTodoSummaryByUserQuery
+from services.todos_service import TodoService
+
+
+class TestNoConnectionDuringUsersCalls(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.directory.name, 'todos.db')}")
+        self.session_factory = async_sessionmaker(
+            bind=self.engine, expire_on_commit=False, sync_session_class=TodoSession)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        # Every Users service call records how many pooled connections were checked out meanwhile
+        self.checked_out = []
+
+        async def check_user_exists(user_id):
+            self.checked_out.append(self.engine.sync_engine.pool.checkedout())
+            return True
+
+        async def check_users_exist(user_ids):
+            self.checked_out.append(self.engine.sync_engine.pool.checkedout())
+            return {user_id: True for user_id in user_ids}
+
+        for name, side_effect in (("check_user_exists", check_user_exists), ("check_users_exist", check_users_exist)):
+            patcher = patch.object(TodoService, name, new_callable=AsyncMock, side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.directory.cleanup()
+
+    async def test_handlers_call_users_service_without_a_connection(self):
+        command_handler = TodoCommandHandler(validation_mode="sync")
+        query_handler = TodoQueryHandler()
+        calls = [
+            lambda session: command_handler.handle_create_todo_command(
+                CreateTodoCommand(title="Todo", description="", is_completed=False, user_id=1), session),
+            lambda session: query_handler.handle_get_todos_by_user_query(GetTodosByUserQuery(user_id=1), session),
+            lambda session: query_handler.handle_get_todos_by_users_query(GetTodosByUsersQuery(user_ids=[1, 2]), session),
+            lambda session: command_handler.handle_bulk_reassign_todos_command(
+                BulkReassignTodosCommand(from_user_id=1, to_user_id=3), session),
+            # No counters for user 4, so the Users service is asked after the summary read
+            lambda session: query_handler.handle_get_todo_summary_by_user_query(
+                GetTodoSummaryByUserQuery(user_id=4), session),
+        ]
+        # One session per call, as get_session opens one per request
+        for call in calls:
+            async with self.session_factory() as session:
+                await call(session)
+
+        self.assertEqual(self.checked_out, [0] * len(calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
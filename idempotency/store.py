@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from pydantic import BaseModel
+from sqlalchemy import select, delete, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_STORE = os.getenv("IDEMPOTENCY_STORE", "database")
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "300"))
+
+
+class IdempotencyRecord(BaseModel):
+    request_hash: str
+    status_code: Optional[int] = None
+    content_type: Optional[str] = None
+    body: Optional[bytes] = None
+
+    @property
+    def completed(self) -> bool:
+        return self.status_code is not None
+
+
+# claim() returns None when the caller now owns the key, otherwise the record
+# already stored under it (completed, or still in progress elsewhere)
+class InMemoryIdempotencyStore:
+    def __init__(self):
+        self._records: dict[tuple[str, str], tuple[float, IdempotencyRecord]] = {}
+
+    async def claim(self, scope: str, key: str, request_hash: str, lease: float) -> Optional[IdempotencyRecord]:
+        existing = self._records.get((scope, key))
+        if existing is not None and existing[0] > time.monotonic():
+            return existing[1]
+        self._records[(scope, key)] = (time.monotonic() + lease, IdempotencyRecord(request_hash=request_hash))
+        return None
+
+    async def complete(self, scope: str, key: str, status_code: int, content_type: Optional[str],
+                       body: bytes, ttl: float) -> None:
+        existing = self._records.get((scope, key))
+        if existing is not None:
+            record = existing[1].model_copy(update={"status_code": status_code, "content_type": content_type, "body": body})
+            self._records[(scope, key)] = (time.monotonic() + ttl, record)
+
+    async def release(self, scope: str, key: str) -> None:
+        existing = self._records.get((scope, key))
+        if existing is not None and not existing[1].completed:
+            del self._records[(scope, key)]
+
+    async def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [name for name, (expires_at, _) in self._records.items() if expires_at <= now]
+        for name in expired:
+            del self._records[name]
+        return len(expired)
+
+
+class DatabaseIdempotencyStore:
+    # Keys live in the idempotency_keys table so every worker sees the same claims.
+    # Each call uses its own short transaction, separate from the request's session.
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    async def claim(self, scope: str, key: str, request_hash: str, lease: float) -> Optional[IdempotencyRecord]:
+        async with self.session_factory() as session:
+            while True:
+                now = datetime.now(timezone.utc)
+                insert = sqlite_insert if session.get_bind().dialect.name == "sqlite" else postgresql_insert
+                statement = insert(IdempotencyKey).values(
+                    scope=scope, key=key, request_hash=request_hash, expires_at=now + timedelta(seconds=lease))
+                # Take over the key only once the previous record has expired
+                statement = statement.on_conflict_do_update(
+                    index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+                    set_={
+                        "request_hash": statement.excluded.request_hash,
+                        "status_code": None,
+                        "content_type": None,
+                        "response_body": None,
+                        "expires_at": statement.excluded.expires_at,
+                    },
+                    where=IdempotencyKey.expires_at <= now,
+                ).returning(IdempotencyKey.key)
+                claimed = (await session.execute(statement)).first()
+                await session.commit()
+                if claimed is not None:
+                    return None
+
+                existing = (await session.execute(
+                    select(IdempotencyKey).where(
+                        IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.expires_at > now)
+                )).scalars().one_or_none()
+                await session.commit()
+                if existing is not None:
+                    return IdempotencyRecord(
+                        request_hash=existing.request_hash, status_code=existing.status_code,
+                        content_type=existing.content_type, body=existing.response_body)
+                # Released or expired between the two statements: try to claim again
+
+    async def complete(self, scope: str, key: str, status_code: int, content_type: Optional[str],
+                       body: bytes, ttl: float) -> None:
+        async with self.session_factory() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+                .values(status_code=status_code, content_type=content_type, response_body=body,
+                        expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl)))
+            await session.commit()
+
+    async def release(self, scope: str, key: str) -> None:
+        async with self.session_factory() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)))
+            await session.commit()
+
+    async def purge_expired(self) -> int:
+        async with self.session_factory() as session:
+            result = await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc)))
+            await session.commit()
+            return result.rowcount
+
+
+_store = None
+
+
+def get_idempotency_store():
+    global _store
+    if _store is None:
+        if IDEMPOTENCY_STORE == "memory":
+            _store = InMemoryIdempotencyStore()
+        else:
+            from dependencies import get_router
+            from sharding.router import GLOBAL_SHARD
+            _store = DatabaseIdempotencyStore(get_router().shard_sessions[GLOBAL_SHARD])
+    return _store
+
+
+def set_idempotency_store(store) -> None:
+    global _store
+    _store = store
+
+
+async def purge_expired_keys(interval: float = IDEMPOTENCY_PURGE_INTERVAL) -> None:
+    # Expired keys are already ignored and overwritten on claim; this only keeps the table small
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await get_idempotency_store().purge_expired()
+            if purged:
+                logger.info("Purged %s expired idempotency keys", purged)
+        except Exception:
+            logger.exception("Failed to purge expired idempotency keys")
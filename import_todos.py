@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+import os
+import time
+from dependencies import get_router
+from database import dispose_engines
+from services.import_service import TodoImportService, IMPORT_BATCH_SIZE, IMPORT_FORMATS
+
+CHUNK_SIZE = 1024 * 1024
+
+
+async def read_chunks(path: str):
+    with open(path, "rb") as source:
+        while chunk := source.read(CHUNK_SIZE):
+            yield chunk
+
+
+async def import_file(path: str, file_format: str, rejects_path: str, batch_size: int):
+    started = time.perf_counter()
+
+    def report(progress):
+        elapsed = time.perf_counter() - started
+        print(f"{progress.rows_read} read, {progress.rows_imported} imported, "
+              f"{progress.rows_rejected} rejected ({progress.rows_imported / elapsed:.0f} rows/s)")
+
+    import_service = TodoImportService(batch_size=batch_size)
+    async with get_router().async_session() as session:
+        with open(rejects_path, "w", encoding="utf-8") as rejects:
+            result = await import_service.import_todos(
+                read_chunks(path), file_format, session, rejects, on_progress=report)
+
+    print(f"Done: {result.rows_imported} of {result.rows_read} rows imported in {time.perf_counter() - started:.1f}s")
+    if result.rows_rejected:
+        print(f"{result.rows_rejected} rejected rows written to {rejects_path}")
+    else:
+        os.remove(rejects_path)
+
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import todos from a CSV or NDJSON file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS,
+                        help="defaults to the file extension")
+    parser.add_argument("--rejects", help="where to write rejected lines (default: <path>.rejects.ndjson)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    file_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    asyncio.run(import_file(args.path, file_format, args.rejects or f"{args.path}.rejects.ndjson", args.batch_size))
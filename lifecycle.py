@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import os
+import httpx
+from database import dispose_engines
+from repositories.statements import (
+    TODO_BY_ID, ANY_TODO_BY_ID, TODOS_BY_USER, ANY_TODOS_BY_USER, ARCHIVED_TODOS_BY_USER, TODOS_BY_IDS, TODOS_BY_USERS,
+    projected)
+from schemas import todo_fields, todo_list_fields_model
+from services.todos_service import open_users_client, close_users_client, USERS_SERVICE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker keeps serving after SIGTERM while GET /ops/ready answers 503, so load
+# balancers stop routing to it before it closes its listener (see serve.py)
+DRAIN_DELAY = float(os.getenv("DRAIN_DELAY", "5"))
+
+# The common ?fields= projection, primed along with the full statements
+WARMUP_FIELDS = todo_fields([os.getenv("WARMUP_FIELDS", "id,title,is_completed")])
+
+# Every hot statement with parameters that match no row
+WARMUP_STATEMENTS = [
+    (TODO_BY_ID, {"todo_id": 0}),
+    (ANY_TODO_BY_ID, {"todo_id": 0}),
+    (TODOS_BY_USER, {"user_id": -1}),
+    (ANY_TODOS_BY_USER, {"user_id": -1}),
+    (ARCHIVED_TODOS_BY_USER, {"user_id": -1}),
+    (TODOS_BY_IDS, {"ids": [0]}),
+    (TODOS_BY_USERS, {"user_ids": [-1]}),
+    (projected(TODOS_BY_USER, WARMUP_FIELDS), {"user_id": -1}),
+]
+
+_ready = False
+_draining = False
+
+
+def is_ready() -> bool:
+    return _ready and not _draining
+
+
+def mark_ready() -> None:
+    global _ready
+    _ready = True
+
+
+def is_draining() -> bool:
+    return _draining
+
+
+def start_draining() -> None:
+    global _draining
+    _draining = True
+
+
+async def warm_up(shard_sessions=None) -> None:
+    # Run by the lifespan before the worker accepts requests: creates the engines and fills each shard's pool,
+    # compiles the hot statements into the engine cache (and prepares them on every
+    # pooled asyncpg connection) and opens the Users service client. Failures are
+    # logged; the worker still starts, and pays for setup on its first requests instead.
+    if shard_sessions is None:
+        from dependencies import get_router
+        shard_sessions = get_router().shard_sessions
+    await asyncio.gather(
+        *(warm_shard(session_factory) for session_factory in shard_sessions.values()), warm_users_client())
+    todo_list_fields_model(WARMUP_FIELDS)
+
+
+async def warm_shard(session_factory) -> None:
+    pool = session_factory.kw["bind"].sync_engine.pool
+    # Single connection pools (e.g. in-memory SQLite) have no size
+    sessions = [session_factory() for _ in range(getattr(pool, "size", lambda: 1)())]
+    try:
+        # All checked out at once, so the pool opens as many connections
+        await asyncio.gather(*(session.connection() for session in sessions))
+        for session in sessions:
+            for statement, parameters in WARMUP_STATEMENTS:
+                await session.execute(statement, parameters)
+    except Exception:
+        logger.exception("Database warm-up failed")
+    finally:
+        for session in sessions:
+            await session.close()
+
+
+async def warm_users_client() -> None:
+    client = await open_users_client()
+    try:
+        # Any response leaves a kept-alive connection in the client's pool
+        await client.head(os.getenv("USERS_SERVICE_URL", "http://localhost:8001"), timeout=USERS_SERVICE_TIMEOUT)
+    except httpx.HTTPError as e:
+        logger.warning("Users service warm-up failed: %s", e)
+
+
+async def close() -> None:
+    global _ready
+    _ready = False
+    await close_users_client()
+    await dispose_engines()
@@ -1,14 +1,61 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routers import todo_routes
+import lifecycle
+from events.broker import get_broker
+from handlers.command_handler import USER_VALIDATION_MODE
+from idempotency.store import purge_expired_keys
+from middleware.admission import AdmissionControlMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.deadline import DeadlineMiddleware, parse_route_timeouts
+from middleware.idempotency_keys import IdempotencyMiddleware
+from routers import todo_routes, ops_routes
+from services.archive_service import ARCHIVE_ENABLED, get_archive_service
+from services.user_validation_service import get_user_validation_service
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The worker only reports ready once the DB pool, statement caches and Users client are warm
+    await lifecycle.warm_up()
+    broker = get_broker()
+    await broker.start()
+    purge_task = asyncio.create_task(purge_expired_keys())
+    if USER_VALIDATION_MODE == "deferred":
+        await get_user_validation_service().start()
+    if ARCHIVE_ENABLED:
+        await get_archive_service().start()
+    lifecycle.mark_ready()
+    yield
+    await get_archive_service().stop()
+    await get_user_validation_service().stop()
+    purge_task.cancel()
+    await broker.stop()
+    await lifecycle.close()
+
 
 app = FastAPI(
     title="Chalkboard Todo FastAPI Postgres Async App - Todos Microservice",
     description="ToDo and Users Microservices using FastAPI, PostgreSQL, and SQLAlchemy Async",
     docs_url="/",
+    lifespan=lifespan,
 )
 
+# Innermost, so stored responses are the uncompressed bodies and replays skip only the handler
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
+# Added last so it runs outermost and the deadline also covers time spent queued for admission
+app.add_middleware(DeadlineMiddleware, route_timeouts={
+    # Imports stream whole files, so they get a far longer default than API calls
+    "POST /todos:import": float(os.getenv("IMPORT_TIMEOUT", "3600")),
+    **parse_route_timeouts(os.getenv("REQUEST_ROUTE_TIMEOUTS", "")),
+})
+
 app.include_router(todo_routes.router)
+app.include_router(ops_routes.router)
 
 if __name__ == "__main__":
+    # Development server; production runs serve.py
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,137 @@
+import asyncio
+import os
+from typing import Optional
+import deadlines
+from starlette.responses import JSONResponse
+from metrics import REGISTRY
+from middleware.routing import route_key, LONG_LIVED_ROUTES
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+READ_CONCURRENCY = int(os.getenv("ADMISSION_READ_CONCURRENCY", "32"))
+READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", "64"))
+WRITE_CONCURRENCY = int(os.getenv("ADMISSION_WRITE_CONCURRENCY", "16"))
+WRITE_QUEUE = int(os.getenv("ADMISSION_WRITE_QUEUE", "32"))
+QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+queue_depth = REGISTRY.gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot", ("budget",))
+in_flight = REGISTRY.gauge(
+    "admission_in_flight", "Requests currently admitted", ("budget",))
+admitted_total = REGISTRY.counter(
+    "admission_admitted_total", "Requests admitted", ("budget",))
+rejected_total = REGISTRY.counter(
+    "admission_rejected_total", "Requests shed by admission control", ("budget", "reason"))
+
+
+class AdmissionBudget:
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        # Created on first use so the semaphore binds to the serving event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    # Returns the rejection reason when the request is shed, None once admitted
+    async def acquire(self, timeout: Optional[float] = None) -> Optional[str]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        if self.active >= self.concurrency and self.waiting >= self.max_queue:
+            rejected_total.inc(budget=self.name, reason="queue_full")
+            return "queue_full"
+
+        self.waiting += 1
+        queue_depth.inc(budget=self.name)
+        try:
+            queue_timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=queue_timeout)
+        except asyncio.TimeoutError:
+            rejected_total.inc(budget=self.name, reason="queue_timeout")
+            return "queue_timeout"
+        finally:
+            self.waiting -= 1
+            queue_depth.dec(budget=self.name)
+
+        self.active += 1
+        in_flight.inc(budget=self.name)
+        admitted_total.inc(budget=self.name)
+        return None
+
+    def release(self) -> None:
+        self.active -= 1
+        in_flight.dec(budget=self.name)
+        self._semaphore.release()
+
+
+def parse_route_limits(value: str) -> dict[str, tuple[int, int]]:
+    # Format: "GET /todos/user/{user_id}=16:64;POST /todos=8:32"
+    limits = {}
+    for entry in filter(None, (part.strip() for part in value.split(";"))):
+        route, _, limit = entry.rpartition("=")
+        concurrency, _, max_queue = limit.partition(":")
+        limits[route.strip()] = (int(concurrency), int(max_queue or 0))
+    return limits
+
+
+class AdmissionControlMiddleware:
+    def __init__(
+        self,
+        app,
+        read_concurrency: int = READ_CONCURRENCY,
+        read_queue: int = READ_QUEUE,
+        write_concurrency: int = WRITE_CONCURRENCY,
+        write_queue: int = WRITE_QUEUE,
+        queue_timeout: float = QUEUE_TIMEOUT,
+        retry_after: int = RETRY_AFTER,
+        route_limits: Optional[dict[str, tuple[int, int]]] = None,
+        exempt_paths: tuple = ("/metrics", "/", "/openapi.json"),
+    ):
+        self.app = app
+        self.retry_after = retry_after
+        self.exempt_paths = set(exempt_paths)
+        self.read_budget = AdmissionBudget("read", read_concurrency, read_queue, queue_timeout)
+        self.write_budget = AdmissionBudget("write", write_concurrency, write_queue, queue_timeout)
+        if route_limits is None:
+            route_limits = parse_route_limits(os.getenv("ADMISSION_ROUTE_LIMITS", ""))
+        self.route_budgets = {
+            route: AdmissionBudget(route, concurrency, max_queue, queue_timeout)
+            for route, (concurrency, max_queue) in route_limits.items()
+        }
+
+    def budget_for(self, scope, route: str) -> AdmissionBudget:
+        budget = self.route_budgets.get(route)
+        if budget is not None:
+            return budget
+        return self.read_budget if scope["method"] in READ_METHODS else self.write_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        route = route_key(scope)
+        if route in LONG_LIVED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        budget = self.budget_for(scope, route)
+        # Never queue past the request deadline set by DeadlineMiddleware
+        reason = await budget.acquire(deadlines.remaining())
+        if reason is not None:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Service overloaded, retry later"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
@@ -0,0 +1,191 @@
+import os
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional: br is only offered when the package is installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd is only offered when the package is installed
+    zstandard = None
+
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Server preference when the client weighs several encodings equally
+PREFERRED_ENCODINGS = ("zstd", "br", "gzip")
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings() -> tuple:
+    return tuple(
+        encoding for encoding in PREFERRED_ENCODINGS
+        if (encoding != "br" or brotli is not None) and (encoding != "zstd" or zstandard is not None)
+    )
+
+
+def negotiate_encoding(accept_encoding: str, supported: tuple) -> Optional[str]:
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = MINIMUM_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+        zstd_level: int = ZSTD_LEVEL,
+        encodings: Optional[tuple] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality, "zstd": zstd_level}
+        self.encodings = encodings if encodings is not None else available_encodings()
+
+    def compressor_for(self, encoding: str):
+        if encoding == "zstd":
+            return ZstdCompressor(self.levels["zstd"])
+        if encoding == "br":
+            return BrotliCompressor(self.levels["br"])
+        return GzipCompressor(self.levels["gzip"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Also used when nothing is acceptable, so those responses still get Vary
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message = None
+        self.passthrough = False
+        self.compressor = None
+        self.buffer = b""
+
+    def _start_compressed(self, content_length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+
+    async def send(self, message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = MutableHeaders(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = "content-encoding" in headers or content_type.startswith(EXCLUDED_CONTENT_TYPES)
+            if not self.passthrough:
+                # Compressed or not, the body depends on Accept-Encoding, so shared caches
+                # must not serve this response to clients that asked for something else
+                headers.add_vary_header("Accept-Encoding")
+                self.passthrough = self.encoding is None
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            self.buffer += body
+            if more_body and len(self.buffer) < self.middleware.minimum_size:
+                # Too little seen yet to tell whether the response is worth compressing
+                return
+            body, self.buffer = self.buffer, b""
+            if not more_body:
+                # Whole response known: honour the size threshold
+                if len(body) < self.middleware.minimum_size:
+                    await self._send(self.start_message)
+                    await self._send({"type": "http.response.body", "body": body})
+                    return
+                compressor = self.middleware.compressor_for(self.encoding)
+                compressed = compressor.compress(body) + compressor.finish()
+                self._start_compressed(len(compressed))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming response: length is unknown, compress and flush chunk by chunk
+            self.compressor = self.middleware.compressor_for(self.encoding)
+            self._start_compressed(None)
+            await self._send(self.start_message)
+
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,88 @@
+import asyncio
+import os
+from typing import Optional
+from starlette.responses import JSONResponse
+import deadlines
+from metrics import REGISTRY
+from middleware.routing import route_key, LONG_LIVED_ROUTES
+
+DEADLINE_HEADER = "x-request-timeout"
+DEFAULT_TIMEOUT = float(os.getenv("REQUEST_DEFAULT_TIMEOUT", "10"))
+MAX_TIMEOUT = float(os.getenv("REQUEST_MAX_TIMEOUT", "30"))
+
+deadline_exceeded_total = REGISTRY.counter(
+    "request_deadline_exceeded_total", "Requests that ran past their deadline", ("route",))
+
+
+def parse_route_timeouts(value: str) -> dict[str, float]:
+    # Format: "GET /todos=5;POST /todos=3"
+    timeouts = {}
+    for entry in filter(None, (part.strip() for part in value.split(";"))):
+        route, _, timeout = entry.rpartition("=")
+        timeouts[route.strip()] = float(timeout)
+    return timeouts
+
+
+class DeadlineMiddleware:
+    def __init__(
+        self,
+        app,
+        default_timeout: float = DEFAULT_TIMEOUT,
+        max_timeout: float = MAX_TIMEOUT,
+        route_timeouts: Optional[dict[str, float]] = None,
+        exempt_paths: tuple = ("/metrics", "/", "/openapi.json"),
+    ):
+        self.app = app
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.exempt_paths = set(exempt_paths)
+        if route_timeouts is None:
+            route_timeouts = parse_route_timeouts(os.getenv("REQUEST_ROUTE_TIMEOUTS", ""))
+        self.route_timeouts = route_timeouts
+
+    def timeout_for(self, scope, route: str) -> float:
+        for name, value in scope.get("headers", ()):
+            if name.decode("latin-1").lower() == DEADLINE_HEADER:
+                try:
+                    requested = float(value.decode("latin-1"))
+                except ValueError:
+                    break
+                if requested > 0:
+                    return min(requested, self.max_timeout)
+                break
+        return self.route_timeouts.get(route, self.default_timeout)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        route = route_key(scope)
+        if route in LONG_LIVED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        timeout = self.timeout_for(scope, route)
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                if message["status"] == 504:
+                    deadline_exceeded_total.inc(route=route)
+            await send(message)
+
+        token = deadlines.set_deadline(timeout)
+        try:
+            # Cancels the handler, its DB statement and any Users service call in flight
+            await asyncio.wait_for(self.app(scope, receive, send_wrapper), timeout=timeout)
+        except asyncio.TimeoutError:
+            if response_started:
+                deadline_exceeded_total.inc(route=route)
+                return
+            response = JSONResponse(
+                status_code=504, content={"detail": "Request deadline exceeded"})
+            await response(scope, receive, send_wrapper)
+        finally:
+            deadlines.reset_deadline(token)
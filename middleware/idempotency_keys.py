@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from starlette.responses import JSONResponse, Response
+import deadlines
+from idempotency.store import get_idempotency_store
+from metrics import REGISTRY
+from middleware.routing import route_key
+
+IDEMPOTENCY_KEY_HEADER = "idempotency-key"
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# How long a key stays claimed by a request that never finishes (e.g. a crashed worker)
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENT_ROUTES = {
+    "POST /todos",
+    "POST /todos:bulkComplete",
+    "POST /todos:bulkReopen",
+    "POST /todos:bulkDelete",
+    "POST /todos:bulkReassign",
+}
+
+replayed_total = REGISTRY.counter(
+    "idempotency_replayed_total", "Responses replayed for a repeated Idempotency-Key", ("route",))
+rejected_total = REGISTRY.counter(
+    "idempotency_rejected_total", "Requests refused for their Idempotency-Key", ("route", "reason"))
+
+
+class IdempotencyMiddleware:
+    def __init__(
+        self,
+        app,
+        routes: set = IDEMPOTENT_ROUTES,
+        ttl: float = IDEMPOTENCY_TTL,
+        lock_timeout: float = IDEMPOTENCY_LOCK_TIMEOUT,
+        poll_interval: float = IDEMPOTENCY_POLL_INTERVAL,
+        store=None,
+    ):
+        self.app = app
+        self.routes = set(routes)
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._store = store
+        self._locks: dict[tuple[str, str], list] = {}
+
+    @property
+    def store(self):
+        return self._store if self._store is not None else get_idempotency_store()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        key = None
+        for name, value in scope.get("headers", ()):
+            if name.decode("latin-1").lower() == IDEMPOTENCY_KEY_HEADER:
+                key = value.decode("latin-1").strip()
+                break
+        route = route_key(scope)
+        if not key or route not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        if len(key) > MAX_KEY_LENGTH:
+            rejected_total.inc(route=route, reason="invalid_key")
+            response = JSONResponse(
+                status_code=400, content={"detail": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"})
+            await response(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        request_hash = hashlib.sha256(body).hexdigest()
+
+        # Duplicates within this worker queue on the key; other workers see the
+        # stored claim and poll until the first request finishes
+        async with self._serialized((route, key)):
+            response = await self._claim(route, key, request_hash)
+            if response is not None:
+                await response(scope, receive, send)
+                return
+            await self._run(scope, receive, send, body, route, key)
+
+    async def _claim(self, route: str, key: str, request_hash: str):
+        give_up_at = time.monotonic() + deadlines.remaining(self.lock_timeout)
+        while True:
+            record = await self.store.claim(route, key, request_hash, self.lock_timeout)
+            if record is None:
+                return None
+            if record.request_hash != request_hash:
+                rejected_total.inc(route=route, reason="mismatch")
+                return JSONResponse(
+                    status_code=422, content={"detail": "Idempotency-Key was already used with a different request"})
+            if record.completed:
+                replayed_total.inc(route=route)
+                return Response(
+                    content=record.body, status_code=record.status_code, media_type=record.content_type,
+                    headers={"Idempotent-Replayed": "true"})
+            if time.monotonic() >= give_up_at:
+                rejected_total.inc(route=route, reason="in_progress")
+                return JSONResponse(
+                    status_code=409, headers={"Retry-After": "1"},
+                    content={"detail": "A request with this Idempotency-Key is still in progress"})
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, scope, receive, send, body: bytes, route: str, key: str) -> None:
+        status_code = None
+        content_type = None
+        chunks = []
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if body_sent:
+                # The body was consumed up front; from here on only a disconnect can follow
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send_wrapper(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_wrapper)
+        except BaseException:
+            await self.store.release(route, key)
+            raise
+
+        # Only successful results are kept; failures release the key so a retry runs again
+        if status_code is not None and 200 <= status_code < 300:
+            await self.store.complete(route, key, status_code, content_type, b"".join(chunks), self.ttl)
+        else:
+            await self.store.release(route, key)
+
+    @asynccontextmanager
+    async def _serialized(self, name: tuple[str, str]):
+        entry = self._locks.get(name)
+        if entry is None:
+            entry = self._locks[name] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[name]
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
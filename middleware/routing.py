@@ -0,0 +1,27 @@
+from typing import Optional
+from starlette.routing import Match
+
+# Streaming endpoints that stay open indefinitely: they must not hold an
+# admission slot or be cut off by the request deadline
+LONG_LIVED_ROUTES = {"GET /todos/user/{user_id}/events"}
+
+
+def route_template(scope) -> Optional[str]:
+    router = getattr(scope.get("app"), "router", None)
+    return match_template(getattr(router, "routes", ()), scope)
+
+
+def match_template(routes, scope) -> Optional[str]:
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            # Newer FastAPI versions wrap included routers instead of copying their routes
+            included_router = getattr(route, "original_router", None)
+            if included_router is not None:
+                return match_template(included_router.routes, scope)
+            return getattr(route, "path", None)
+    return None
+
+
+def route_key(scope) -> str:
+    return f"{scope['method']} {route_template(scope)}"
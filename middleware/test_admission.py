@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+import httpx
+from fastapi import APIRouter, FastAPI
+from middleware.admission import AdmissionBudget, AdmissionControlMiddleware, parse_route_limits, rejected_total
+
+
+class TestAdmissionControl(unittest.IsolatedAsyncioTestCase):
+
+    def build_app(self, **kwargs):
+        app = FastAPI()
+        self.release = asyncio.Event()
+
+        @app.get("/slow")
+        async def slow_read():
+            await self.release.wait()
+            return {"ok": True}
+
+        # Served from an included router, like the app's own routes
+        router = APIRouter()
+
+        @router.get("/items/{item_id}")
+        async def slow_item(item_id: int):
+            await self.release.wait()
+            return {"id": item_id}
+
+        app.include_router(router)
+
+        @app.post("/slow")
+        async def slow_write():
+            return {"ok": True}
+
+        app.add_middleware(AdmissionControlMiddleware, **kwargs)
+        return app
+
+    async def test_rejects_when_queue_is_full(self):
+        app = self.build_app(read_concurrency=1, read_queue=1, queue_timeout=5, retry_after=3)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = asyncio.create_task(client.get("/slow"))
+            second = asyncio.create_task(client.get("/slow"))
+            await asyncio.sleep(0.05)
+
+            # One request admitted, one queued: the third is shed immediately
+            rejected = await client.get("/slow")
+            self.assertEqual(rejected.status_code, 503)
+            self.assertEqual(rejected.headers["Retry-After"], "3")
+
+            self.release.set()
+            self.assertEqual((await first).status_code, 200)
+            self.assertEqual((await second).status_code, 200)
+
+    async def test_writes_have_separate_budget(self):
+        app = self.build_app(read_concurrency=1, read_queue=0, queue_timeout=5)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            blocked_read = asyncio.create_task(client.get("/slow"))
+            await asyncio.sleep(0.05)
+
+            self.assertEqual((await client.get("/slow")).status_code, 503)
+            self.assertEqual((await client.post("/slow")).status_code, 200)
+
+            self.release.set()
+            self.assertEqual((await blocked_read).status_code, 200)
+
+    async def test_route_limits_use_path_template(self):
+        app = self.build_app(route_limits={"GET /items/{item_id}": (1, 0)}, queue_timeout=5)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            blocked = asyncio.create_task(client.get("/items/1"))
+            await asyncio.sleep(0.05)
+
+            self.assertEqual((await client.get("/items/2")).status_code, 503)
+
+            self.release.set()
+            self.assertEqual((await blocked).status_code, 200)
+            self.assertEqual((await client.get("/slow")).status_code, 200)
+
+    async def test_queue_timeout_is_counted(self):
+        budget = AdmissionBudget("timeout-test", concurrency=1, max_queue=1, queue_timeout=0.01)
+        self.assertIsNone(await budget.acquire())
+
+        reason = await budget.acquire()
+
+        self.assertEqual(reason, "queue_timeout")
+        self.assertEqual(rejected_total.value(budget="timeout-test", reason="queue_timeout"), 1)
+        budget.release()
+        self.assertEqual(budget.active, 0)
+
+    def test_parse_route_limits(self):
+        limits = parse_route_limits("GET /todos/user/{user_id}=16:64; POST /todos=8")
+
+        self.assertEqual(limits, {"GET /todos/user/{user_id}": (16, 64), "POST /todos": (8, 0)})
+
+
+if __name__ == '__main__':
+    unittest.main()
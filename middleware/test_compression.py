@@ -0,0 +1,104 @@
+import gzip
+import unittest
+import brotli
+import httpx
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from middleware.compression import CompressionMiddleware, negotiate_encoding
+
+LARGE_BODY = "todo " * 2000
+
+
+class TestCompressionMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    def build_app(self, **kwargs):
+        app = FastAPI()
+
+        @app.get("/large")
+        async def large():
+            return PlainTextResponse(LARGE_BODY)
+
+        @app.get("/small")
+        async def small():
+            return PlainTextResponse("tiny")
+
+        @app.get("/stream")
+        async def stream():
+            async def chunks():
+                for _ in range(5):
+                    yield LARGE_BODY[:1000]
+            return StreamingResponse(chunks(), media_type="text/plain")
+
+        @app.get("/small-stream")
+        async def small_stream():
+            async def chunks():
+                yield "ti"
+                yield "ny"
+            return StreamingResponse(chunks(), media_type="text/plain")
+
+        app.add_middleware(CompressionMiddleware, **kwargs)
+        return app
+
+    async def get(self, app, path, accept_encoding):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            # Fetch raw bytes so the assertions see the encoding on the wire
+            async with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+                body = b"".join([chunk async for chunk in response.aiter_raw()])
+                return response, body
+
+    async def test_negotiates_each_encoding(self):
+        app = self.build_app()
+        decoders = {
+            "gzip": gzip.decompress,
+            "br": brotli.decompress,
+            "zstd": lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+        }
+        for encoding, decode in decoders.items():
+            response, body = await self.get(app, "/large", encoding)
+
+            self.assertEqual(response.headers["Content-Encoding"], encoding)
+            self.assertEqual(int(response.headers["Content-Length"]), len(body))
+            self.assertIn("Accept-Encoding", response.headers["Vary"])
+            self.assertEqual(decode(body).decode(), LARGE_BODY)
+
+    async def test_small_responses_skip_compression(self):
+        response, body = await self.get(self.build_app(minimum_size=500), "/small", "gzip")
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(body, b"tiny")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+
+    async def test_small_streaming_responses_skip_compression(self):
+        response, body = await self.get(self.build_app(minimum_size=500), "/small-stream", "gzip")
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(body, b"tiny")
+
+    async def test_streaming_response_is_compressed_incrementally(self):
+        response, body = await self.get(self.build_app(), "/stream", "gzip")
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertEqual(gzip.decompress(body).decode(), LARGE_BODY[:1000] * 5)
+
+    async def test_identity_when_nothing_acceptable(self):
+        response, body = await self.get(self.build_app(), "/large", "identity")
+
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(body.decode(), LARGE_BODY)
+
+    def test_negotiate_encoding(self):
+        supported = ("zstd", "br", "gzip")
+
+        self.assertEqual(negotiate_encoding("gzip, br", supported), "br")
+        self.assertEqual(negotiate_encoding("gzip;q=1.0, br;q=0.5", supported), "gzip")
+        self.assertEqual(negotiate_encoding("*;q=0.1, zstd;q=0", supported), "br")
+        self.assertIsNone(negotiate_encoding("gzip;q=0", supported))
+        self.assertIsNone(negotiate_encoding("", supported))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+import httpx
+from fastapi import FastAPI
+import deadlines
+from dependencies import apply_statement_timeout
+from exceptions.deadline_exceeded_exception import DeadlineExceededException
+from middleware.deadline import DeadlineMiddleware, deadline_exceeded_total, parse_route_timeouts
+
+
+class TestDeadlineMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    def build_app(self, **kwargs):
+        app = FastAPI()
+        self.cancelled = asyncio.Event()
+
+        @app.get("/remaining")
+        async def get_remaining():
+            return {"remaining": deadlines.remaining()}
+
+        @app.get("/hang")
+        async def hang():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                self.cancelled.set()
+                raise
+
+        app.add_middleware(DeadlineMiddleware, **kwargs)
+        return app
+
+    async def test_header_sets_deadline(self):
+        app = self.build_app(default_timeout=10)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/remaining", headers={"X-Request-Timeout": "2"})
+
+        self.assertLessEqual(response.json()["remaining"], 2)
+        self.assertGreater(response.json()["remaining"], 1)
+
+    async def test_route_default_and_max_timeout(self):
+        app = self.build_app(default_timeout=10, max_timeout=3, route_timeouts={"GET /remaining": 5})
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            route_default = await client.get("/remaining")
+            clamped = await client.get("/remaining", headers={"X-Request-Timeout": "60"})
+
+        self.assertGreater(route_default.json()["remaining"], 4)
+        self.assertLessEqual(clamped.json()["remaining"], 3)
+
+    async def test_expired_request_is_cancelled_and_counted(self):
+        app = self.build_app()
+        before = deadline_exceeded_total.value(route="GET /hang")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/hang", headers={"X-Request-Timeout": "0.05"})
+
+        self.assertEqual(response.status_code, 504)
+        self.assertTrue(self.cancelled.is_set())
+        self.assertEqual(deadline_exceeded_total.value(route="GET /hang"), before + 1)
+
+    def test_parse_route_timeouts(self):
+        self.assertEqual(parse_route_timeouts("GET /todos=5; POST /todos=2.5"),
+                         {"GET /todos": 5.0, "POST /todos": 2.5})
+
+
+class TestStatementTimeout(unittest.TestCase):
+
+    def test_sets_local_statement_timeout_for_postgres(self):
+        connection = MagicMock()
+        connection.dialect.name = "postgresql"
+        token = deadlines.set_deadline(2)
+        try:
+            apply_statement_timeout(None, None, connection)
+        finally:
+            deadlines.reset_deadline(token)
+
+        statement = connection.exec_driver_sql.call_args[0][0]
+        self.assertTrue(statement.startswith("SET LOCAL statement_timeout = "))
+        self.assertLessEqual(int(statement.rsplit(" ", 1)[1]), 2000)
+
+    def test_no_deadline_leaves_connection_untouched(self):
+        connection = MagicMock()
+        connection.dialect.name = "postgresql"
+
+        apply_statement_timeout(None, None, connection)
+
+        connection.exec_driver_sql.assert_not_called()
+
+    def test_expired_deadline_refuses_to_begin(self):
+        connection = MagicMock()
+        token = deadlines.set_deadline(-1)
+        try:
+            with self.assertRaises(DeadlineExceededException):
+                apply_statement_timeout(None, None, connection)
+        finally:
+            deadlines.reset_deadline(token)
+
+
+if __name__ == '__main__':
+    unittest.main()
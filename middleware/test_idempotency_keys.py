@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import unittest
+import httpx
+from fastapi import FastAPI, HTTPException
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base
+from idempotency.store import InMemoryIdempotencyStore, DatabaseIdempotencyStore
+from middleware.idempotency_keys import IdempotencyMiddleware
+
+
+class TestIdempotencyMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    def build_app(self, store, **kwargs):
+        app = FastAPI()
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+        @app.post("/todos", status_code=201)
+        async def create(payload: dict):
+            self.calls += 1
+            await self.release.wait()
+            if payload.get("fail"):
+                raise HTTPException(status_code=500, detail="boom")
+            return {"id": self.calls, **payload}
+
+        app.add_middleware(IdempotencyMiddleware, routes={"POST /todos"}, store=store, poll_interval=0.01, **kwargs)
+        return app
+
+    def client(self, app):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def test_replays_stored_response(self):
+        app = self.build_app(InMemoryIdempotencyStore())
+        async with self.client(app) as client:
+            first = await client.post("/todos", json={"title": "a"}, headers={"Idempotency-Key": "k1"})
+            replay = await client.post("/todos", json={"title": "a"}, headers={"Idempotency-Key": "k1"})
+            other = await client.post("/todos", json={"title": "a"}, headers={"Idempotency-Key": "k2"})
+            unkeyed = await client.post("/todos", json={"title": "a"})
+
+        self.assertEqual((first.status_code, replay.status_code), (201, 201))
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(other.json()["id"], 2)
+        self.assertEqual(unkeyed.json()["id"], 3)
+        self.assertEqual(self.calls, 3)
+
+    async def test_key_reused_with_different_body(self):
+        app = self.build_app(InMemoryIdempotencyStore())
+        async with self.client(app) as client:
+            await client.post("/todos", json={"title": "a"}, headers={"Idempotency-Key": "k1"})
+            response = await client.post("/todos", json={"title": "b"}, headers={"Idempotency-Key": "k1"})
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    async def test_failures_are_not_stored(self):
+        app = self.build_app(InMemoryIdempotencyStore())
+        async with self.client(app) as client:
+            failed = await client.post("/todos", json={"fail": True}, headers={"Idempotency-Key": "k1"})
+            retried = await client.post("/todos", json={"fail": True}, headers={"Idempotency-Key": "k1"})
+
+        self.assertEqual((failed.status_code, retried.status_code), (500, 500))
+        self.assertEqual(self.calls, 2)
+
+    async def test_concurrent_duplicates_are_serialized(self):
+        app = self.build_app(InMemoryIdempotencyStore())
+        self.release.clear()
+        async with self.client(app) as client:
+            requests = [
+                asyncio.create_task(client.post("/todos", json={"title": "a"}, headers={"Idempotency-Key": "k1"}))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.05)
+            self.release.set()
+            responses = await asyncio.gather(*requests)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual({response.json()["id"] for response in responses}, {1})
+
+    async def test_in_progress_elsewhere_times_out_with_conflict(self):
+        store = InMemoryIdempotencyStore()
+        # Claimed by another worker that has not finished yet
+        body = b'{"title": "a"}'
+        await store.claim("POST /todos", "k1", hashlib.sha256(body).hexdigest(), lease=60)
+        app = self.build_app(store, lock_timeout=0.05)
+        async with self.client(app) as client:
+            response = await client.post(
+                "/todos", content=body, headers={"Idempotency-Key": "k1", "Content-Type": "application/json"})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.calls, 0)
+
+
+class TestDatabaseIdempotencyStore(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.store = DatabaseIdempotencyStore(async_sessionmaker(bind=self.engine, expire_on_commit=False))
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def test_claim_complete_and_expire(self):
+        self.assertIsNone(await self.store.claim("POST /todos", "k1", "hash", lease=60))
+
+        in_progress = await self.store.claim("POST /todos", "k1", "hash", lease=60)
+        self.assertFalse(in_progress.completed)
+
+        await self.store.complete("POST /todos", "k1", 201, "application/json", b'{"id": 1}', ttl=60)
+        stored = await self.store.claim("POST /todos", "k1", "hash", lease=60)
+        self.assertEqual((stored.status_code, stored.body), (201, b'{"id": 1}'))
+
+        # An expired record is taken over by the next claim
+        await self.store.complete("POST /todos", "k1", 201, "application/json", b'{"id": 1}', ttl=-1)
+        self.assertIsNone(await self.store.claim("POST /todos", "k1", "hash", lease=60))
+
+    async def test_release_and_purge(self):
+        await self.store.claim("POST /todos", "k1", "hash", lease=60)
+        await self.store.release("POST /todos", "k1")
+        self.assertIsNone(await self.store.claim("POST /todos", "k1", "hash", lease=-1))
+
+        self.assertEqual(await self.store.purge_expired(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,21 +1,126 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+import os
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, LargeBinary, Index, true, event
 from datetime import datetime, timezone
 from database import Base
 
+# Number of hash partitions of todos on user_id (PostgreSQL only; 0 keeps a plain
+# table). Existing databases are converted or rebalanced with partition_todos.py.
+TODOS_HASH_PARTITIONS = int(os.getenv("TODOS_HASH_PARTITIONS", "0"))
+
+# Todo.validation_status values. Creates in deferred validation mode start out
+# pending until the background validator has checked the user.
+VALIDATED = "validated"
+PENDING_VALIDATION = "pending_validation"
+INVALID_USER = "invalid_user"
+
 
 class Todo(Base):
     __tablename__ = "todos"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # A partitioned table's primary key must contain the partition column. id keeps
+    # its own index, so lookups by id alone stay one index probe per partition.
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     title = Column(String, index=True)
     description = Column(String)
     is_completed = Column(Boolean, default=False)
-    user_id = Column(Integer, index=True)
+    user_id = Column(Integer, index=True, primary_key=TODOS_HASH_PARTITIONS > 0)
+
+    # Callables, so each row gets its own timestamp rather than the import time
+    date_created = Column(DateTime(timezone=True), index=True,
+                          default=lambda: datetime.now(timezone.utc))
+    date_updated = Column(DateTime(timezone=True), default=lambda: datetime.now(
+        timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    validation_status = Column(String, nullable=False, default=VALIDATED, server_default=VALIDATED)
 
-    date_created = Column(DateTime(timezone=True),
-                          default=datetime.now(timezone.utc))
-    date_updated = Column(DateTime(timezone=True), default=datetime.now(
-        timezone.utc), onupdate=datetime.now(timezone.utc))
+    __table_args__ = (
+        # Only pending rows are indexed, so the validator's scan stays small
+        Index("ix_todos_pending_validation", "user_id",
+              postgresql_where=validation_status == PENDING_VALIDATION,
+              sqlite_where=validation_status == PENDING_VALIDATION),
+        # Covers the common per-user list projection (?fields=id,title,is_completed): on
+        # PostgreSQL it is answered by an index-only scan, without reading the table
+        Index("ix_todos_user_id_id_covering", "user_id", "id",
+              postgresql_include=["title", "is_completed"],
+              postgresql_where=validation_status == VALIDATED,
+              sqlite_where=validation_status == VALIDATED),
+        # Candidates for the archive job: completed todos by last update
+        Index("ix_todos_completed_date_updated", "date_updated",
+              postgresql_where=is_completed == true(),
+              sqlite_where=is_completed == true()),
+        {
+            # Lets each shard's ids start at its own offset (see sharding/router.py)
+            "sqlite_autoincrement": True,
+            **({"postgresql_partition_by": "HASH (user_id)"} if TODOS_HASH_PARTITIONS else {}),
+        },
+    )
 
     def __repr__(self):
         return f"<Todo {self.title} for user {self.user_id} at {self.date_created}>"
+
+
+def hash_partitions_ddl(table: str, parent: str, partitions: int) -> list[str]:
+    return [
+        f"CREATE TABLE {table}_p{remainder} PARTITION OF {parent} "
+        f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        for remainder in range(partitions)
+    ]
+
+
+@event.listens_for(Todo.__table__, "after_create")
+def create_todo_partitions(target, connection, **kw):
+    if TODOS_HASH_PARTITIONS and connection.dialect.name == "postgresql":
+        for statement in hash_partitions_ddl(target.name, target.name, TODOS_HASH_PARTITIONS):
+            connection.exec_driver_sql(statement)
+
+
+class ArchivedTodo(Base):
+    # Completed todos moved out of todos by the archive job. Rows are never updated
+    # here, and ids stay those of the original todos.
+    __tablename__ = "todos_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String)
+    description = Column(String)
+    is_completed = Column(Boolean, default=True)
+    user_id = Column(Integer, nullable=False)
+    # Part of the key because PostgreSQL needs the partition column in it
+    date_created = Column(DateTime(timezone=True), primary_key=True)
+    date_updated = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False,
+                         default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_todos_archive_user_id", "user_id", "id"),
+        # Monthly partitions (todos_archive_YYYY_MM) are created by the archive job
+        {"postgresql_partition_by": "RANGE (date_created)"},
+    )
+
+    def __repr__(self):
+        return f"<ArchivedTodo {self.title} for user {self.user_id} at {self.date_created}>"
+
+
+class TodoUserSummary(Base):
+    __tablename__ = "todo_user_summaries"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TodoUserSummary {self.completed}/{self.total} for user {self.user_id}>"
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)
+    # NULL while the first request with this key is still running
+    status_code = Column(Integer)
+    content_type = Column(String)
+    response_body = Column(LargeBinary)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key} for {self.scope}>"
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import sys
+import time
+from dependencies import get_router
+from database import get_engine, dispose_engines
+from models import TODOS_HASH_PARTITIONS
+from repositories.partitioning import todo_partitions, repartition_todos
+
+
+async def status():
+    shard_sessions = get_router().shard_sessions
+    for shard_id, shard_session in shard_sessions.items():
+        async with shard_session() as session:
+            partitions = await todo_partitions(session)
+        if len(shard_sessions) > 1:
+            print(f"shard {shard_id}:")
+        if not partitions:
+            print("todos is not partitioned")
+        for name, rows in partitions:
+            print(f"{name:<16} ~{rows} rows")
+    await dispose_engines()
+
+
+async def repartition(partitions: int, batch_size: int):
+    started = time.perf_counter()
+
+    def report(copied):
+        print(f"{copied} todos copied ({time.perf_counter() - started:.1f}s)")
+
+    copied = 0
+    # Every shard is repartitioned in turn
+    for shard_session in get_router().shard_sessions.values():
+        async with shard_session() as session:
+            copied += await repartition_todos(
+                session, partitions, batch_size, on_batch=lambda shard_copied: report(copied + shard_copied))
+
+    print(f"Done: {copied} todos in {partitions} hash partitions, {time.perf_counter() - started:.1f}s")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or rebuild the hash partitions of todos (PostgreSQL)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="list partitions with estimated row counts")
+    repartition_parser = commands.add_parser(
+        "repartition", help="convert todos to hash partitions, or change their number (stop writers first)")
+    repartition_parser.add_argument("--partitions", type=int, default=TODOS_HASH_PARTITIONS or 16)
+    repartition_parser.add_argument("--batch-size", type=int, default=50000, help="todos copied per transaction")
+    args = parser.parse_args()
+
+    if get_engine().dialect.name != "postgresql":
+        sys.exit("Partitioning needs PostgreSQL")
+    if args.command == "status":
+        asyncio.run(status())
+    elif args.partitions < 1:
+        sys.exit("--partitions must be at least 1")
+    else:
+        asyncio.run(repartition(args.partitions, args.batch_size))
@@ -1,4 +1,24 @@
-from pydantic import BaseModel
+import os
+from typing import Optional
+from pydantic import BaseModel, Field
+
+MAX_BATCH_TODO_IDS = int(os.getenv("MAX_BATCH_TODO_IDS", "500"))
+MAX_BATCH_USER_IDS = int(os.getenv("MAX_BATCH_USER_IDS", "200"))
 
 class GetTodosByUserQuery(BaseModel):
+    user_id: int
+    include_pending: bool = False
+    include_archived: bool = False
+    # Only these TodoModel fields (and id) are read
+    fields: Optional[tuple[str, ...]] = None
+
+class GetTodosByIdsQuery(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=MAX_BATCH_TODO_IDS)
+    fields: Optional[tuple[str, ...]] = None
+
+class GetTodosByUsersQuery(BaseModel):
+    user_ids: list[int] = Field(min_length=1, max_length=MAX_BATCH_USER_IDS)
+    fields: Optional[tuple[str, ...]] = None
+
+class GetTodoSummaryByUserQuery(BaseModel):
     user_id: int
\ No newline at end of file
@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+import os
+import time
+from dependencies import get_router
+from database import dispose_engines
+from repositories.summary_repository import TodoSummaryRepository
+
+SUMMARY_RECONCILE_BATCH_SIZE = int(os.getenv("SUMMARY_RECONCILE_BATCH_SIZE", "1000"))
+
+
+async def reconcile(batch_size: int):
+    started = time.perf_counter()
+
+    def report(rebuilt):
+        print(f"{rebuilt} users recounted ({time.perf_counter() - started:.1f}s)")
+
+    rebuilt = 0
+    # Each shard counts its own users
+    for shard_id, shard_session in get_router().shard_sessions.items():
+        async with shard_session() as session:
+            rebuilt += await TodoSummaryRepository().rebuild(
+                session, batch_size, on_batch=lambda shard_rebuilt: report(rebuilt + shard_rebuilt))
+
+    print(f"Done: summaries rebuilt for {rebuilt} users in {time.perf_counter() - started:.1f}s")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild todo_user_summaries from the todos table")
+    parser.add_argument("--batch-size", type=int, default=SUMMARY_RECONCILE_BATCH_SIZE, help="users per transaction")
+    args = parser.parse_args()
+    asyncio.run(reconcile(args.batch_size))
@@ -0,0 +1,77 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Todo, hash_partitions_ddl
+
+TABLE = Todo.__tablename__
+# Built next to todos, then swapped in under its name
+STAGING_TABLE = f"{TABLE}_repartition"
+
+
+async def todo_partitions(session: AsyncSession) -> list[tuple[str, int]]:
+    # (partition, estimated rows); empty while todos is a plain table
+    result = await session.execute(text(
+        "SELECT child.relname, child.reltuples::bigint FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = :table ORDER BY length(child.relname), child.relname"), {"table": TABLE})
+    return [(name, max(rows, 0)) for name, rows in result.all()]
+
+
+async def repartition_todos(session: AsyncSession, partitions: int, batch_size: int, on_batch=None) -> int:
+    # Rebuilds todos as `partitions` hash partitions on user_id, from a plain or an
+    # already partitioned table. Rows are copied in id order, batch_size per
+    # transaction; the swap locks todos and copies rows inserted meanwhile. Updates and
+    # deletes of rows that were already copied are not carried over, so writers must be
+    # stopped while this runs.
+    columns = ", ".join(column.name for column in Todo.__table__.columns)
+
+    # Left over if a previous run was interrupted before the swap
+    await session.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+    await session.execute(text(
+        f"CREATE TABLE {STAGING_TABLE} (LIKE {TABLE} INCLUDING DEFAULTS) PARTITION BY HASH (user_id)"))
+    await session.execute(text(f"ALTER TABLE {STAGING_TABLE} ADD PRIMARY KEY (id, user_id)"))
+    for statement in hash_partitions_ddl(STAGING_TABLE, STAGING_TABLE, partitions):
+        await session.execute(text(statement))
+    await session.commit()
+
+    copy = text(f"INSERT INTO {STAGING_TABLE} ({columns}) SELECT {columns} FROM {TABLE} WHERE id > :after AND id <= :until")
+    copied = 0
+    last_id = 0
+    while True:
+        batch_end = await session.scalar(
+            text(f"SELECT max(id) FROM (SELECT id FROM {TABLE} WHERE id > :after ORDER BY id LIMIT :limit) batch"),
+            {"after": last_id, "limit": batch_size})
+        if batch_end is None:
+            break
+        result = await session.execute(copy, {"after": last_id, "until": batch_end})
+        await session.commit()
+        copied += result.rowcount
+        last_id = batch_end
+        if on_batch is not None:
+            on_batch(copied)
+
+    await session.execute(text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+    result = await session.execute(
+        text(f"INSERT INTO {STAGING_TABLE} ({columns}) SELECT {columns} FROM {TABLE} WHERE id > :after"),
+        {"after": last_id})
+    copied += result.rowcount
+    # The id sequence is owned by todos.id and would be dropped with the old table
+    sequence = await session.scalar(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": TABLE})
+    if sequence is not None:
+        await session.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    await session.execute(text(f"DROP TABLE {TABLE}"))
+    await session.execute(text(f"ALTER TABLE {STAGING_TABLE} RENAME TO {TABLE}"))
+    await session.execute(text(f"ALTER TABLE {TABLE} RENAME CONSTRAINT {STAGING_TABLE}_pkey TO {TABLE}_pkey"))
+    for remainder in range(partitions):
+        await session.execute(text(f"ALTER TABLE {STAGING_TABLE}_p{remainder} RENAME TO {TABLE}_p{remainder}"))
+    # Indexes on the parent are created on every partition
+    await session.run_sync(
+        lambda sync_session: [index.create(sync_session.connection()) for index in Todo.__table__.indexes])
+    if sequence is not None:
+        await session.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+    await session.commit()
+
+    # Fresh statistics, so the planner sees the new partitions right away
+    await session.execute(text(f"ANALYZE {TABLE}"))
+    await session.commit()
+    return copied
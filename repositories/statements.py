@@ -0,0 +1,44 @@
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import select, bindparam
+from models import Todo, ArchivedTodo, VALIDATED
+
+# The hot reads, built once at import. Values are bound at execution, e.g.
+# session.execute(TODO_BY_ID, {"todo_id": 1}), so every call reuses the same construct,
+# its memoized cache key and the engine's compiled SQL (and, on asyncpg, the
+# connection's prepared statement).
+TODO_BY_ID = select(Todo).filter(Todo.id == bindparam("todo_id"), Todo.validation_status == VALIDATED)
+# Any validation status, for updates and deletes
+ANY_TODO_BY_ID = select(Todo).filter(Todo.id == bindparam("todo_id"))
+ALL_TODOS = select(Todo).filter(Todo.validation_status == VALIDATED).order_by(Todo.id)
+TODOS_BY_USER = select(Todo).filter(
+    Todo.user_id == bindparam("user_id"), Todo.validation_status == VALIDATED).order_by(Todo.id)
+ANY_TODOS_BY_USER = select(Todo).filter(Todo.user_id == bindparam("user_id")).order_by(Todo.id)
+ARCHIVED_TODOS_BY_USER = select(ArchivedTodo).filter(
+    ArchivedTodo.user_id == bindparam("user_id")).order_by(ArchivedTodo.id)
+# Expanding IN: one cache entry whatever the number of values
+TODOS_BY_IDS = select(Todo).filter(
+    Todo.id.in_(bindparam("ids", expanding=True)), Todo.validation_status == VALIDATED).order_by(Todo.id)
+TODOS_BY_USERS = select(Todo).filter(
+    Todo.user_id.in_(bindparam("user_ids", expanding=True)), Todo.validation_status == VALIDATED
+).order_by(Todo.user_id, Todo.id)
+
+
+@lru_cache(maxsize=256)
+def projected(statement, fields: tuple[str, ...]):
+    # The statement reduced to the given columns of its entity, plus id. Cached per field
+    # set, so a projection is also built once. Fields the entity has no column for (e.g.
+    # archived_at on todos) are left out and take their TodoModel default.
+    entity = statement.column_descriptions[0]["entity"]
+    columns = entity.__table__.columns
+    return statement.with_only_columns(
+        *(getattr(entity, name) for name in dict.fromkeys(("id", *fields)) if name in columns))
+
+
+def select_fields(statement, fields: Optional[tuple[str, ...]]):
+    return statement if fields is None else projected(statement, fields)
+
+
+def fetch_all(result, fields: Optional[tuple[str, ...]]) -> list:
+    # ORM objects for whole rows, Row tuples for a projection
+    return result.scalars().all() if fields is None else result.all()
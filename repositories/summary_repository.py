@@ -0,0 +1,166 @@
+from typing import Optional
+from sqlalchemy import select, delete, func, case, inspect, union_all
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from models import Todo, ArchivedTodo, TodoUserSummary, VALIDATED
+from sharding.router import shard_router
+
+# user_id -> [total delta, completed delta]
+SummaryDeltas = dict[int, list[int]]
+
+
+def add_delta(deltas: SummaryDeltas, user_id: int, total: int, completed: int) -> None:
+    delta = deltas.setdefault(user_id, [0, 0])
+    delta[0] += total
+    delta[1] += completed
+
+
+def deltas_for_rows(rows, sign: int = 1) -> SummaryDeltas:
+    # rows are (user_id, is_completed) pairs, e.g. from a bulk statement's RETURNING
+    deltas = {}
+    for user_id, is_completed in rows:
+        add_delta(deltas, user_id, sign, sign if is_completed else 0)
+    return deltas
+
+
+def deltas_for_flush(session: Session) -> SummaryDeltas:
+    # Called from after_flush, where new/dirty/deleted and the attribute history
+    # still describe the changes that were just written. Only validated todos are counted.
+    deltas = {}
+    for todo in session.new:
+        if isinstance(todo, Todo) and counted(inspect(todo).dict.get("validation_status")):
+            add_delta(deltas, todo.user_id, 1, 1 if todo.is_completed else 0)
+    for todo in session.deleted:
+        if isinstance(todo, Todo) and counted(inspect(todo).dict.get("validation_status")):
+            add_delta(deltas, todo.user_id, -1, -1 if todo.is_completed else 0)
+    for todo in session.dirty:
+        if not isinstance(todo, Todo) or todo in session.deleted:
+            continue
+        # Read from the instance state so an unloaded column never triggers a query mid-flush
+        state = inspect(todo)
+        columns = ("user_id", "is_completed", "validation_status")
+        new = tuple(state.dict.get(name) for name in columns)
+        old = tuple(
+            history.deleted[0] if history.deleted else value
+            for history, value in zip((state.attrs[name].history for name in columns), new)
+        )
+        if (old[0], bool(old[1]), counted(old[2])) == (new[0], bool(new[1]), counted(new[2])):
+            continue
+        if counted(old[2]):
+            add_delta(deltas, old[0], -1, -1 if old[1] else 0)
+        if counted(new[2]):
+            add_delta(deltas, new[0], 1, 1 if new[1] else 0)
+    return deltas
+
+
+def counted(validation_status: Optional[str]) -> bool:
+    # None: unset on a new todo (the column default is validated) or not loaded
+    return validation_status is None or validation_status == VALIDATED
+
+
+def summary_upsert(dialect_name: str, values: list[dict], increment: bool = True):
+    insert = sqlite_insert if dialect_name == "sqlite" else postgresql_insert
+    statement = insert(TodoUserSummary).values(values)
+    if increment:
+        set_ = {
+            "total": TodoUserSummary.total + statement.excluded.total,
+            "completed": TodoUserSummary.completed + statement.excluded.completed,
+        }
+    else:
+        set_ = {"total": statement.excluded.total, "completed": statement.excluded.completed}
+    return statement.on_conflict_do_update(index_elements=[TodoUserSummary.user_id], set_=set_)
+
+
+def delta_upsert(dialect_name: str, deltas: SummaryDeltas):
+    # Sorted by user_id so concurrent transactions lock summary rows in the same order
+    values = [
+        {"user_id": user_id, "total": total, "completed": completed}
+        for user_id, (total, completed) in sorted(deltas.items())
+        if total or completed
+    ]
+    if not values:
+        return None
+    return summary_upsert(dialect_name, values)
+
+
+def deltas_by_shard(session, deltas: SummaryDeltas) -> list[tuple[Optional[dict], SummaryDeltas]]:
+    # (bind_arguments, deltas) per shard; a single database gets everything at once
+    router = shard_router(session)
+    if router is None:
+        return [(None, deltas)]
+    groups = router.group_by_shard(deltas.items(), lambda item: item[0])
+    return [({"shard_id": shard_id}, dict(items)) for shard_id, items in groups.items()]
+
+
+def apply_flush_deltas(session: Session) -> None:
+    # Bound by mapper, which a sharded session needs to pick an engine
+    dialect_name = session.get_bind(inspect(TodoUserSummary)).dialect.name
+    for bind_arguments, deltas in deltas_by_shard(session, deltas_for_flush(session)):
+        statement = delta_upsert(dialect_name, deltas)
+        if statement is not None:
+            session.connection(bind_arguments=bind_arguments).execute(statement)
+
+
+class TodoSummaryRepository:
+    async def get(self, session: AsyncSession, user_id: int) -> Optional[TodoUserSummary]:
+        result = await session.execute(select(TodoUserSummary).filter(TodoUserSummary.user_id == user_id))
+        return result.scalars().one_or_none()
+
+    async def apply(self, session: AsyncSession, deltas: SummaryDeltas) -> None:
+        dialect_name = session.get_bind(inspect(TodoUserSummary)).dialect.name
+        for bind_arguments, shard_deltas in deltas_by_shard(session, deltas):
+            statement = delta_upsert(dialect_name, shard_deltas)
+            if statement is not None:
+                await session.execute(statement, bind_arguments=bind_arguments)
+
+    async def rebuild(self, session: AsyncSession, batch_size: int, on_batch=None) -> int:
+        # Recounts users in user_id order, batch_size users per transaction.
+        # Archived todos still count, so both tables are read.
+        dialect_name = session.get_bind().dialect.name
+        counted_todos = union_all(
+            select(Todo.user_id, Todo.is_completed).where(Todo.validation_status == VALIDATED),
+            select(ArchivedTodo.user_id, ArchivedTodo.is_completed),
+        ).subquery()
+        rebuilt = 0
+        last_user_id = None
+        while True:
+            user_filter = [] if last_user_id is None else [counted_todos.c.user_id > last_user_id]
+            in_batch = [] if last_user_id is None else [TodoUserSummary.user_id > last_user_id]
+            batch_users = (
+                select(counted_todos.c.user_id).where(*user_filter).distinct()
+                .order_by(counted_todos.c.user_id).limit(batch_size).subquery())
+            batch_end = await session.scalar(select(func.max(batch_users.c.user_id)))
+            if batch_end is None:
+                # Users past the last batch no longer have any todos
+                await session.execute(delete(TodoUserSummary).where(*in_batch))
+                await session.commit()
+                return rebuilt
+
+            in_batch.append(TodoUserSummary.user_id <= batch_end)
+            # Hold the batch's summary rows so writers' increments wait for the recount
+            # instead of being overwritten by it
+            await session.execute(select(TodoUserSummary.user_id).where(*in_batch).with_for_update())
+            counts = await session.execute(
+                select(
+                    counted_todos.c.user_id,
+                    func.count(),
+                    func.sum(case((counted_todos.c.is_completed, 1), else_=0)),
+                )
+                .where(*user_filter, counted_todos.c.user_id <= batch_end)
+                .group_by(counted_todos.c.user_id))
+            values = [
+                {"user_id": user_id, "total": total, "completed": completed or 0}
+                for user_id, total, completed in counts.all()
+            ]
+            await session.execute(
+                delete(TodoUserSummary).where(
+                    *in_batch, TodoUserSummary.user_id.not_in([value["user_id"] for value in values])))
+            await session.execute(summary_upsert(dialect_name, values, increment=False))
+            await session.commit()
+
+            rebuilt += len(values)
+            last_user_id = batch_end
+            if on_batch is not None:
+                on_batch(rebuilt)
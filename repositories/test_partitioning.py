@@ -0,0 +1,95 @@
+import os
+import re
+import unittest
+from datetime import datetime, timezone
+from sqlalchemy import insert, select, func, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base
+from models import Todo, hash_partitions_ddl
+from repositories.partitioning import todo_partitions, repartition_todos
+
+# A scratch PostgreSQL database: the todos table in it is dropped and recreated
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+class TestHashPartitionsDdl(unittest.TestCase):
+
+    def test_one_partition_per_remainder(self):
+        self.assertEqual(hash_partitions_ddl("todos_repartition", "todos_repartition", 2), [
+            "CREATE TABLE todos_repartition_p0 PARTITION OF todos_repartition FOR VALUES WITH (MODULUS 2, REMAINDER 0)",
+            "CREATE TABLE todos_repartition_p1 PARTITION OF todos_repartition FOR VALUES WITH (MODULUS 2, REMAINDER 1)",
+        ])
+
+
+@unittest.skipUnless(TEST_POSTGRES_URL, "set TEST_POSTGRES_URL to run the EXPLAIN tests against PostgreSQL")
+class TestTodoPartitioning(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine(TEST_POSTGRES_URL)
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all, tables=[Todo.__table__])
+            await conn.run_sync(Base.metadata.create_all, tables=[Todo.__table__])
+
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as session:
+            await session.execute(insert(Todo), [
+                {"title": f"Todo {i}", "description": "", "is_completed": i % 3 == 0, "user_id": i % 200,
+                 "date_created": now, "date_updated": now}
+                for i in range(40000)
+            ])
+            await session.commit()
+            self.copied = await repartition_todos(session, 8, batch_size=15000)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def explain(self, session, statement) -> str:
+        sql = statement.compile(dialect=self.engine.dialect, compile_kwargs={"literal_binds": True})
+        result = await session.execute(text(f"EXPLAIN {sql}"))
+        return "\n".join(row[0] for row in result.all())
+
+    async def test_repartition_keeps_rows_and_ids(self):
+        async with self.session_factory() as session:
+            partitions = await todo_partitions(session)
+            total = await session.scalar(select(func.count()).select_from(Todo))
+            todo = Todo(title="After", description="", is_completed=False, user_id=1)
+            session.add(todo)
+            await session.commit()
+
+        self.assertEqual(self.copied, 40000)
+        self.assertEqual([name for name, _ in partitions], [f"todos_p{remainder}" for remainder in range(8)])
+        self.assertEqual(total, 40000)
+        # The id sequence survived the swap
+        self.assertEqual(todo.id, 40001)
+
+    async def test_user_queries_prune_to_one_partition(self):
+        async with self.session_factory() as session:
+            plans = [
+                await self.explain(session, select(Todo).filter(Todo.user_id == 7)),
+                await self.explain(session, select(Todo).filter(Todo.user_id == 7).order_by(Todo.id)),
+            ]
+
+        for plan in plans:
+            self.assertEqual(len(set(re.findall(r"todos_p\d+", plan))), 1, plan)
+
+    async def test_id_lookup_uses_index_on_every_partition(self):
+        async with self.session_factory() as session:
+            plan = await self.explain(session, select(Todo).filter(Todo.id == 12345))
+
+        self.assertEqual(len(set(re.findall(r"todos_p\d+", plan))), 8, plan)
+        self.assertNotIn("Seq Scan", plan)
+
+    async def test_rebalance_changes_partition_count(self):
+        async with self.session_factory() as session:
+            copied = await repartition_todos(session, 4, batch_size=15000)
+            partitions = await todo_partitions(session)
+            plan = await self.explain(session, select(Todo).filter(Todo.user_id == 7))
+
+        self.assertEqual(copied, 40000)
+        self.assertEqual(len(partitions), 4)
+        self.assertEqual(len(set(re.findall(r"todos_p\d+", plan))), 1, plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
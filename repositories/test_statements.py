@@ -0,0 +1,115 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base, count_statement_cache, statement_cache
+from handlers.query_handler import TodoQueryHandler
+from models import Todo, ArchivedTodo
+from queries import GetTodosByUserQuery, GetTodosByIdsQuery, GetTodosByUsersQuery
+from repositories.statements import TODOS_BY_USER, projected
+from repositories.todos_repository import TodoRepository
+from services.todos_service import TodoService
+
+
+class TestStatementCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.directory.name, 'todos.db')}")
+        event.listen(self.engine.sync_engine, "after_cursor_execute", count_statement_cache)
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(Todo), [
+                {"title": f"Todo {i}", "description": "", "is_completed": i % 2 == 0, "user_id": i % 10}
+                for i in range(100)
+            ])
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.directory.cleanup()
+
+    @patch.object(TodoService, 'check_users_exist', new_callable=AsyncMock)
+    @patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock, return_value=True)
+    async def test_hot_reads_hit_the_compiled_cache_under_load(self, mock_check_user_exists, mock_check_users_exist):
+        mock_check_users_exist.side_effect = lambda user_ids: {user_id: True for user_id in user_ids}
+        repository = TodoRepository()
+        handler = TodoQueryHandler()
+
+        async def client(number: int):
+            async with self.session_factory() as session:
+                for i in range(20):
+                    await repository.get_by_id(session, (number * 20 + i) % 100 + 1)
+                    await repository.get_user_todos_by_id(session, i % 10)
+                    await handler.handle_get_todos_by_user_query(
+                        GetTodosByUserQuery(user_id=i % 10, include_pending=i % 2 == 0, include_archived=True), session)
+                    # A different number of ids or users each time
+                    await handler.handle_get_todos_by_ids_query(GetTodosByIdsQuery(ids=list(range(1, i + 2))), session)
+                    await handler.handle_get_todos_by_users_query(
+                        GetTodosByUsersQuery(user_ids=list(range(i % 5 + 1))), session)
+                await repository.get_all(session)
+
+        hits, misses = statement_cache.value(result="hit"), statement_cache.value(result="miss")
+        await asyncio.gather(*(client(number) for number in range(10)))
+        hits, misses = statement_cache.value(result="hit") - hits, statement_cache.value(result="miss") - misses
+
+        # At most one miss per statement the first time the engine sees it
+        self.assertLessEqual(misses, 8)
+        self.assertGreaterEqual(hits / (hits + misses), 0.99)
+
+
+class TestProjections(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(Todo), [
+                {"title": f"Todo {i}", "description": "x" * 1000, "is_completed": i % 2 == 0, "user_id": i % 2}
+                for i in range(1, 5)
+            ])
+            now = datetime.now(timezone.utc)
+            await conn.execute(insert(ArchivedTodo), [{
+                "id": 5, "title": "Archived", "description": "x" * 1000, "is_completed": True, "user_id": 1,
+                "date_created": now, "date_updated": now, "archived_at": now}])
+
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    def test_projection_is_built_once_per_field_set(self):
+        statement = projected(TODOS_BY_USER, ("id", "title", "is_completed"))
+
+        self.assertIs(statement, projected(TODOS_BY_USER, ("id", "title", "is_completed")))
+        self.assertTrue(str(statement).startswith("SELECT todos.id, todos.title, todos.is_completed \nFROM todos"))
+
+    @patch.object(TodoService, 'check_users_exist', new_callable=AsyncMock, return_value={0: True, 1: True})
+    @patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock, return_value=True)
+    async def test_projected_reads_select_only_requested_columns(self, mock_check_user_exists, mock_check_users_exist):
+        fields = ("id", "title", "archived_at")
+        async with self.session_factory() as session:
+            todos = await TodoQueryHandler().handle_get_todos_by_user_query(
+                GetTodosByUserQuery(user_id=1, include_archived=True, fields=fields), session)
+            todo = await TodoRepository().get_by_id(session, 2, fields=fields)
+            by_users = await TodoQueryHandler().handle_get_todos_by_users_query(
+                GetTodosByUsersQuery(user_ids=[0, 1], fields=("id", "is_completed")), session)
+
+        self.assertEqual([(row.id, row.title) for row in todos], [(1, "Todo 1"), (3, "Todo 3"), (5, "Archived")])
+        self.assertIsNotNone(todos[-1].archived_at)
+        self.assertEqual((todo.id, todo.title), (2, "Todo 2"))
+        self.assertEqual([[row.id for row in result["todos"]] for result in by_users["results"]], [[2, 4], [1, 3]])
+        self.assertEqual(len(self.statements), 4)
+        for statement in self.statements:
+            self.assertNotIn("description", statement)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from models import Todo, TodoUserSummary
+from repositories.summary_repository import deltas_for_flush, delta_upsert
+from handlers.query_handler import TodoQueryHandler
+from queries import GetTodoSummaryByUserQuery
+from services.todos_service import TodoService
+from exceptions.user_not_found_exception import UserNotFoundException
+
+
+def persistent_todo(session: Session, **values) -> Todo:
+    todo = Todo(**values)
+    make_transient_to_detached(todo)
+    session.add(todo)
+    return todo
+
+
+class TestSummaryDeltas(unittest.TestCase):
+
+    def test_deltas_for_pending_changes(self):
+        session = Session()
+        session.add(Todo(title="new", is_completed=True, user_id=1))
+        reassigned = persistent_todo(session, id=1, title="moved", is_completed=False, user_id=1)
+        completed = persistent_todo(session, id=2, title="done", is_completed=False, user_id=2)
+        renamed = persistent_todo(session, id=3, title="renamed", is_completed=True, user_id=2)
+        removed = persistent_todo(session, id=4, title="removed", is_completed=True, user_id=3)
+
+        reassigned.user_id = 3
+        completed.is_completed = True
+        renamed.title = "new title"
+        session.delete(removed)
+
+        # user 1: +1 created (completed), -1 moved away; user 2: one more completed;
+        # user 3: +1 moved in, -1 deleted (completed)
+        self.assertEqual(deltas_for_flush(session), {1: [0, 1], 2: [0, 1], 3: [0, -1]})
+
+    def test_delta_upsert_increments_in_user_order(self):
+        statement = delta_upsert("postgresql", {2: [1, 0], 1: [-1, -1], 3: [0, 0]})
+
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("ON CONFLICT (user_id) DO UPDATE SET total = (todo_user_summaries.total + excluded.total)", sql)
+        params = statement.compile().params
+        self.assertEqual((params["user_id_m0"], params["user_id_m1"]), (1, 2))
+        self.assertNotIn("user_id_m2", params)
+
+    def test_delta_upsert_skips_empty_deltas(self):
+        self.assertIsNone(delta_upsert("sqlite", {1: [0, 0]}))
+
+
+class TestSummaryQuery(unittest.IsolatedAsyncioTestCase):
+
+    @patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock)
+    async def test_summary_served_from_counters(self, mock_check_user_exists):
+        mock_session = MagicMock(spec=AsyncSession)
+        mock_result = MagicMock()
+        mock_result.scalars().one_or_none.return_value = TodoUserSummary(user_id=1, total=5, completed=2)
+        mock_session.execute.return_value = mock_result
+
+        summary = await TodoQueryHandler().handle_get_todo_summary_by_user_query(
+            GetTodoSummaryByUserQuery(user_id=1), mock_session)
+
+        self.assertEqual(summary, {"user_id": 1, "total": 5, "completed": 2, "pending": 3})
+        mock_check_user_exists.assert_not_called()
+
+    @patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock, return_value=False)
+    async def test_summary_without_counters_checks_user(self, mock_check_user_exists):
+        mock_session = MagicMock(spec=AsyncSession)
+        mock_result = MagicMock()
+        mock_result.scalars().one_or_none.return_value = None
+        mock_session.execute.return_value = mock_result
+
+        with self.assertRaises(UserNotFoundException):
+            await TodoQueryHandler().handle_get_todo_summary_by_user_query(
+                GetTodoSummaryByUserQuery(user_id=1), mock_session)
+
+        mock_check_user_exists.assert_called_once_with(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,49 +1,68 @@
+import heapq
 from sqlalchemy.ext.asyncio import AsyncSession
 from models import Todo
-from sqlalchemy import select
 from sqlalchemy.orm.exc import NoResultFound
 from datetime import datetime, timezone
 from fastapi import HTTPException, status
+from events.broker import publish_todo_event
+from exceptions.cross_shard_move_exception import CrossShardMoveException
+from sharding.router import shard_router
+from typing import Optional
+from repositories.statements import (
+    TODO_BY_ID, ANY_TODO_BY_ID, ALL_TODOS, TODOS_BY_USER, select_fields, fetch_all)
 
 
 class TodoRepository:
     async def add(self, session: AsyncSession, todo: Todo) -> Todo:
         session.add(todo)
         await session.commit()
+        await publish_todo_event("created", todo)
         return todo
 
-    async def get_by_id(self, session: AsyncSession, todo_id: int) -> Todo:
-        statement = select(Todo).filter(Todo.id == todo_id)
-        result = await session.execute(statement)
+    async def get_by_id(self, session: AsyncSession, todo_id: int, fields: Optional[tuple[str, ...]] = None) -> Todo:
+        # fields: only these columns, returned as a Row instead of a Todo
+        result = await session.execute(select_fields(TODO_BY_ID, fields), {"todo_id": todo_id})
         try:
-            return result.scalars().one()
+            return result.scalars().one() if fields is None else result.one()
         except NoResultFound:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
 
-    async def get_all(self, session: AsyncSession) -> list[Todo]:
-        statement = select(Todo).order_by(Todo.id)
-        result = await session.execute(statement)
-        return result.scalars().all()
+    async def get_all(self, session: AsyncSession, fields: Optional[tuple[str, ...]] = None) -> list[Todo]:
+        statement = select_fields(ALL_TODOS, fields)
+        router = shard_router(session)
+        if router is None:
+            result = await session.execute(statement)
+            return fetch_all(result, fields)
+
+        # Scatter-gather: every shard is read concurrently and the id-ordered results merged
+        async def read(shard_session: AsyncSession) -> list[Todo]:
+            return fetch_all(await shard_session.execute(statement), fields)
+
+        return list(heapq.merge(*await router.scatter(read), key=lambda todo: todo.id))
 
     async def update(self, session: AsyncSession, todo_id: int, data: dict) -> Todo:
-        statement = select(Todo).filter(Todo.id == todo_id)
-        result = await session.execute(statement)
+        result = await session.execute(ANY_TODO_BY_ID, {"todo_id": todo_id})
         try:
             todo = result.scalars().one()
         except NoResultFound:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
 
+        previous_user_id = todo.user_id
+        router = shard_router(session)
+        if router is not None and "user_id" in data and router.for_user(data["user_id"]) != router.for_user(previous_user_id):
+            raise CrossShardMoveException(previous_user_id, data["user_id"])
         for key, value in data.items():
             setattr(todo, key, value)
         todo.date_updated = datetime.now(timezone.utc)
         await session.commit()
+        await publish_todo_event(
+            "updated", todo, previous_user_id=previous_user_id if previous_user_id != todo.user_id else None)
         return todo
 
     async def delete(self, session: AsyncSession, todo_id: int) -> None:
-        statement = select(Todo).filter(Todo.id == todo_id)
-        result = await session.execute(statement)
+        result = await session.execute(ANY_TODO_BY_ID, {"todo_id": todo_id})
         try:
             todo = result.scalars().one()
         except NoResultFound:
@@ -52,9 +71,9 @@ class TodoRepository:
 
         await session.delete(todo)
         await session.commit()
+        await publish_todo_event("deleted", todo_id=todo.id, user_id=todo.user_id)
 
-    async def get_user_todos_by_id(self, session: AsyncSession, user_id: int) -> list[Todo]:
-        statement = select(Todo).filter(
-            Todo.user_id == user_id).order_by(Todo.id)
-        result = await session.execute(statement)
-        return result.scalars().all()
+    async def get_user_todos_by_id(self, session: AsyncSession, user_id: int,
+                                   fields: Optional[tuple[str, ...]] = None) -> list[Todo]:
+        result = await session.execute(select_fields(TODOS_BY_USER, fields), {"user_id": user_id})
+        return fetch_all(result, fields)
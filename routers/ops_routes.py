@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import lifecycle
+from dependencies import get_session
+from exceptions.deadline_exceeded_exception import DeadlineExceededException
+from metrics import REGISTRY
+from schemas import TodoStatsModel
+from container import get_stats_service
+from services.stats_service import STATS_HISTOGRAM_DAYS
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/ops/ready", response_class=PlainTextResponse, include_in_schema=False)
+async def get_ready():
+    # 503 until the lifespan warm-up has finished, and again once the worker starts draining
+    if not lifecycle.is_ready():
+        return PlainTextResponse("draining" if lifecycle.is_draining() else "starting",
+                                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return PlainTextResponse("ready")
+
+
+@router.get("/ops/stats", status_code=status.HTTP_200_OK, response_model=TodoStatsModel)
+async def get_stats(days: int = Query(STATS_HISTOGRAM_DAYS, ge=1, le=366, description="Days of created-per-day history"),
+                    session: AsyncSession = Depends(get_session)):
+    try:
+        return await get_stats_service().get_stats(session, days)
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,16 +1,23 @@
+import time
 import unittest
 import httpx
 from unittest.mock import patch, AsyncMock
 from fastapi.testclient import TestClient
 from fastapi import status
+import lifecycle
 from main import app  # Import your FastAPI app
 from schemas import TodoModel
 from exceptions.user_not_found_exception import UserNotFoundException
+from exceptions.cross_shard_move_exception import CrossShardMoveException
 from services.todos_service import TodoService
 from unittest.mock import patch, AsyncMock
 from fastapi import status
 from handlers.query_handler import TodoQueryHandler
 from handlers.command_handler import TodoCommandHandler
+from services.import_service import TodoImportService
+from schemas import TodoImportResultModel, TodoStatsModel
+from services.stats_service import TodoStatsService
+from idempotency.store import InMemoryIdempotencyStore, set_idempotency_store
 
 class TestTodoRoutes(unittest.TestCase):
 
@@ -44,6 +51,28 @@ class TestTodoRoutes(unittest.TestCase):
         # Ensure handle_create_todo_command was called exactly once
         mock_handle_create_todo_command.assert_called_once()
 
+    @patch.object(TodoCommandHandler, 'handle_create_todo_command', new_callable=AsyncMock, return_value=TodoModel(
+        id=1,
+        title="Test Todo",
+        description="This is a test todo",
+        is_completed=False,
+        user_id=1,
+        date_created="2024-07-14T12:00:00Z",
+        date_updated="2024-07-14T12:00:00Z"
+    ))
+    def test_create_todo_idempotent_retry(self, mock_handle_create_todo_command):
+        todo_data = {"title": "Test Todo", "description": "This is a test todo", "is_completed": False, "user_id": 1}
+        set_idempotency_store(InMemoryIdempotencyStore())
+        try:
+            first = self.client.post("/todos", json=todo_data, headers={"Idempotency-Key": "create-1"})
+            retry = self.client.post("/todos", json=todo_data, headers={"Idempotency-Key": "create-1"})
+        finally:
+            set_idempotency_store(None)
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        mock_handle_create_todo_command.assert_called_once()
+
     @patch.object(TodoCommandHandler, 'handle_create_todo_command', side_effect=UserNotFoundException("User not found"))
     def test_create_todo_user_not_found(self, mock_handle_create_todo_command):
         response = self.client.post("/todos", json={
@@ -71,7 +100,7 @@ class TestTodoRoutes(unittest.TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()["title"], "Test Todo")
-        mock_get_todo.assert_called_once_with(1, unittest.mock.ANY)
+        mock_get_todo.assert_called_once_with(1, unittest.mock.ANY, None)
 
     @patch.object(TodoService, 'get_todo', return_value=None)
     def test_get_todo_not_found(self, mock_get_todo):
@@ -79,7 +108,7 @@ class TestTodoRoutes(unittest.TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
         self.assertIn("Todo not found", response.json()["detail"])
-        mock_get_todo.assert_called_once_with(999, unittest.mock.ANY)
+        mock_get_todo.assert_called_once_with(999, unittest.mock.ANY, None)
 
     @patch.object(TodoService, 'get_todos', return_value=[
         TodoModel(
@@ -97,7 +126,7 @@ class TestTodoRoutes(unittest.TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()), 1)
-        mock_get_todos.assert_called_once_with(unittest.mock.ANY)
+        mock_get_todos.assert_called_once_with(unittest.mock.ANY, None)
 
     @patch.object(TodoService, 'update_todo', return_value=TodoModel(
         id=1,
@@ -133,6 +162,19 @@ class TestTodoRoutes(unittest.TestCase):
         self.assertIn("Todo not found", response.json()["detail"])
         mock_update_todo.assert_called_once_with(999, unittest.mock.ANY, unittest.mock.ANY)
 
+    @patch.object(TodoService, 'update_todo', side_effect=CrossShardMoveException(1, 2))
+    def test_update_todo_to_user_on_another_shard(self, mock_update_todo):
+        response = self.client.put("/todos/1", json={
+            "title": "Test Todo",
+            "description": "This is a test todo",
+            "is_completed": False,
+            "user_id": 2
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn("another shard", response.json()["detail"])
+        mock_update_todo.assert_called_once_with(1, unittest.mock.ANY, unittest.mock.ANY)
+
     @patch.object(TodoService, 'delete_todo')
     def test_delete_todo(self, mock_delete_todo):
         response = self.client.delete("/todos/1")
@@ -182,5 +224,255 @@ class TestTodoRoutes(unittest.TestCase):
         self.assertEqual(todos[1]["description"], "Description 2")
         mock_handle_get_todos_by_user_query.assert_called_once()
 
+    @patch.object(TodoQueryHandler, 'handle_get_todos_by_user_query', new_callable=AsyncMock)
+    def test_get_user_todos_include_archived(self, mock_handle_get_todos_by_user_query):
+        mock_handle_get_todos_by_user_query.return_value = [
+            TodoModel(
+                id=1,
+                title="Archived Todo",
+                is_completed=True,
+                user_id=1,
+                date_created="2024-01-15T12:00:00Z",
+                date_updated="2024-01-15T12:00:00Z",
+                archived_at="2024-07-15T12:00:00Z"
+            )
+        ]
+
+        response = self.client.get("/todos/user/1?include_archived=true")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["archived_at"], "2024-07-15T12:00:00Z")
+        query = mock_handle_get_todos_by_user_query.call_args[0][0]
+        self.assertTrue(query.include_archived)
+        self.assertFalse(query.include_pending)
+
+    @patch.object(TodoQueryHandler, 'handle_get_todos_by_user_query', new_callable=AsyncMock)
+    def test_get_user_todos_fields(self, mock_handle_get_todos_by_user_query):
+        mock_handle_get_todos_by_user_query.return_value = [
+            TodoModel(
+                id=1,
+                title="Test Todo 1",
+                description="Description 1",
+                is_completed=False,
+                user_id=1,
+                date_created="2024-07-15T12:00:00Z",
+                date_updated="2024-07-15T12:00:00Z"
+            )
+        ]
+
+        response = self.client.get("/todos/user/1?fields=title,is_completed")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{"id": 1, "title": "Test Todo 1", "is_completed": False}])
+        query = mock_handle_get_todos_by_user_query.call_args[0][0]
+        self.assertEqual(query.fields, ("id", "title", "is_completed"))
+
+    @patch.object(TodoService, 'get_todo')
+    def test_get_todo_unknown_field(self, mock_get_todo):
+        response = self.client.get("/todos/1?fields=title,secret")
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertIn("secret", response.json()["detail"])
+        mock_get_todo.assert_not_called()
+
+    @patch.object(TodoService, 'get_todo', side_effect=ValueError("bad row"))
+    def test_get_todo_value_error_is_not_a_bad_request(self, mock_get_todo):
+        response = self.client.get("/todos/1?fields=title")
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @patch.object(TodoQueryHandler, 'handle_get_todos_by_user_query', new_callable=AsyncMock,
+                  side_effect=ValueError("bad row"))
+    def test_get_todos_by_user_value_error_is_not_a_bad_request(self, mock_handle_get_todos_by_user_query):
+        response = self.client.get("/todos/user/1?fields=title")
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @patch.object(TodoQueryHandler, 'handle_get_todos_by_ids_query', new_callable=AsyncMock)
+    @patch.object(TodoService, 'get_todos')
+    def test_get_todos_by_ids(self, mock_get_todos, mock_handle_get_todos_by_ids_query):
+        mock_handle_get_todos_by_ids_query.return_value = [
+            TodoModel(
+                id=1,
+                title="Test Todo 1",
+                description="Description 1",
+                is_completed=False,
+                user_id=1,
+                date_created="2024-07-15T12:00:00Z",
+                date_updated="2024-07-15T12:00:00Z"
+            )
+        ]
+
+        response = self.client.get("/todos?ids=1,2&ids=3")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 1)
+        query = mock_handle_get_todos_by_ids_query.call_args[0][0]
+        self.assertEqual(query.ids, [1, 2, 3])
+        mock_get_todos.assert_not_called()
+
+    def test_get_todos_by_ids_invalid(self):
+        response = self.client.get("/todos?ids=1,abc")
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    @patch.object(TodoQueryHandler, 'handle_get_todos_by_users_query', new_callable=AsyncMock)
+    def test_batch_get_todos_by_users(self, mock_handle_get_todos_by_users_query):
+        mock_handle_get_todos_by_users_query.return_value = {
+            "results": [
+                {"user_id": 1, "todos": [TodoModel(
+                    id=1,
+                    title="Test Todo 1",
+                    description="Description 1",
+                    is_completed=False,
+                    user_id=1,
+                    date_created="2024-07-15T12:00:00Z",
+                    date_updated="2024-07-15T12:00:00Z"
+                )]},
+                {"user_id": 2, "todos": []}
+            ],
+            "not_found_user_ids": [3]
+        }
+
+        response = self.client.post("/todos/users:batchGet", json={"user_ids": [1, 2, 3]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual([group["user_id"] for group in body["results"]], [1, 2])
+        self.assertEqual(body["results"][0]["todos"][0]["title"], "Test Todo 1")
+        self.assertEqual(body["not_found_user_ids"], [3])
+
+    def test_batch_get_todos_by_users_over_limit(self):
+        response = self.client.post("/todos/users:batchGet", json={"user_ids": list(range(10000))})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    @patch.object(TodoQueryHandler, 'handle_get_todo_summary_by_user_query', new_callable=AsyncMock,
+                  return_value={"user_id": 1, "total": 5, "completed": 2, "pending": 3})
+    def test_get_todo_summary_by_user(self, mock_handle_get_todo_summary_by_user_query):
+        response = self.client.get("/todos/user/1/summary")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"user_id": 1, "total": 5, "completed": 2, "pending": 3})
+
+    @patch.object(TodoQueryHandler, 'handle_get_todo_summary_by_user_query', side_effect=UserNotFoundException("User not found"))
+    def test_get_todo_summary_by_user_not_found(self, mock_handle_get_todo_summary_by_user_query):
+        response = self.client.get("/todos/user/1/summary")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch.object(TodoCommandHandler, 'handle_bulk_complete_todos_command', new_callable=AsyncMock, return_value=3)
+    def test_bulk_complete_todos(self, mock_handle_bulk_complete_todos_command):
+        response = self.client.post("/todos:bulkComplete", json={"user_id": 1, "batch_size": 500})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"affected": 3})
+        command = mock_handle_bulk_complete_todos_command.call_args[0][0]
+        self.assertEqual(command.user_id, 1)
+        self.assertEqual(command.batch_size, 500)
+
+    def test_bulk_delete_todos_requires_filter(self):
+        response = self.client.post("/todos:bulkDelete", json={})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    @patch.object(TodoCommandHandler, 'handle_bulk_reassign_todos_command', side_effect=UserNotFoundException("User not found"))
+    def test_bulk_reassign_todos_user_not_found(self, mock_handle_bulk_reassign_todos_command):
+        response = self.client.post("/todos:bulkReassign", json={"from_user_id": 1, "to_user_id": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        mock_handle_bulk_reassign_todos_command.assert_called_once()
+
+    @patch.object(TodoCommandHandler, 'handle_bulk_reassign_todos_command')
+    def test_bulk_reassign_todos_to_same_user(self, mock_handle_bulk_reassign_todos_command):
+        response = self.client.post("/todos:bulkReassign", json={"from_user_id": 1, "to_user_id": 1, "batch_size": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        mock_handle_bulk_reassign_todos_command.assert_not_called()
+
+    @patch.object(TodoImportService, 'import_todos', new_callable=AsyncMock)
+    def test_import_todos(self, mock_import_todos):
+        mock_import_todos.return_value = TodoImportResultModel(rows_read=2, rows_imported=2, rows_rejected=0)
+
+        response = self.client.post("/todos:import", content=b"title,description,is_completed,user_id\nA,a,false,1\n",
+                                    headers={"Content-Type": "text/csv"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["rows_imported"], 2)
+        self.assertEqual(response.json()["rejects"], [])
+        self.assertEqual(mock_import_todos.call_args[0][1], "csv")
+
+    def test_import_todos_unsupported_media_type(self):
+        response = self.client.post("/todos:import", content=b"<todos/>", headers={"Content-Type": "application/xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    @patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock, return_value=True)
+    def test_user_todo_events_websocket(self, mock_check_user_exists):
+        from events.broker import get_broker
+        from schemas import TodoEventModel
+
+        with TestClient(app) as client:
+            with client.websocket_connect("/todos/user/1/ws") as websocket:
+                # Wait for the subscription to register before publishing on the app's loop
+                deadline = time.monotonic() + 5
+                while get_broker().subscriber_count() == 0:
+                    if time.monotonic() > deadline:
+                        self.fail("WebSocket subscription never registered")
+                    time.sleep(0.01)
+                client.portal.call(get_broker().publish, TodoEventModel(type="deleted", user_id=1, todo_id=7))
+
+                event = websocket.receive_json()
+
+        self.assertEqual(event["type"], "deleted")
+        self.assertEqual(event["todo_id"], 7)
+
+    @patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock, return_value=False)
+    def test_user_todo_events_unknown_user(self, mock_check_user_exists):
+        response = self.client.get("/todos/user/1/events")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch.object(TodoStatsService, 'get_stats', new_callable=AsyncMock, return_value=TodoStatsModel(
+        total=4, completed=1, completion_rate=0.25,
+        todos_per_user={"users": 2, "mean": 2, "p50": 2, "p90": 2.8, "p99": 2.98, "max": 3},
+        created_per_day=[{"day": "2024-07-14", "count": 4}],
+        generated_at="2024-07-14T12:00:00Z"))
+    def test_get_stats(self, mock_get_stats):
+        response = self.client.get("/ops/stats?days=1")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["completion_rate"], 0.25)
+        self.assertEqual(mock_get_stats.call_args[0][1], 1)
+
+    def test_get_stats_invalid_days(self):
+        response = self.client.get("/ops/stats?days=0")
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_ready(self):
+        self.addCleanup(setattr, lifecycle, "_ready", lifecycle._ready)
+        self.addCleanup(setattr, lifecycle, "_draining", lifecycle._draining)
+        lifecycle._ready, lifecycle._draining = False, False
+
+        response = self.client.get("/ops/ready")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.text, "starting")
+
+        lifecycle.mark_ready()
+        response = self.client.get("/ops/ready")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        lifecycle.start_draining()
+        response = self.client.get("/ops/ready")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.text, "draining")
+
+    def test_metrics(self):
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("admission_rejected_total", response.text)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,22 +1,26 @@
+import asyncio
+import os
 import httpx
-from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, WebSocket
+from pydantic import ValidationError
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from dependencies import get_session
-from schemas import TodoModel, TodoCreateModel, TodoUpdateModel
-from commands import CreateTodoCommand
-from queries import GetTodosByUserQuery
-from services.todos_service import TodoService
+from schemas import TodoModel, TodoCreateModel, TodoUpdateModel, TodosBatchGetByUsersModel, TodosByUsersModel, BulkOperationResultModel, TodoImportResultModel, TodoSummaryModel
+from schemas import todo_fields, todo_fields_model, todo_list_fields_model, todos_by_users_fields_model
+from commands import CreateTodoCommand, BulkCompleteTodosCommand, BulkReopenTodosCommand, BulkDeleteTodosCommand, BulkReassignTodosCommand
+from queries import GetTodosByUserQuery, GetTodosByIdsQuery, GetTodosByUsersQuery, GetTodoSummaryByUserQuery
+from services.import_service import format_for_content_type
 from exceptions.user_not_found_exception import UserNotFoundException
-from handlers.command_handler import TodoCommandHandler
-from handlers.query_handler import TodoQueryHandler
-from typing import List
+from exceptions.deadline_exceeded_exception import DeadlineExceededException
+from exceptions.cross_shard_move_exception import CrossShardMoveException
+from container import get_command_handler, get_query_handler, get_todos_service, get_import_service
+from events.broker import get_broker, encode_sse
+from typing import List, Optional
 
 router = APIRouter()
 
-todos_service = TodoService()
-command_handler = TodoCommandHandler()
-query_handler = TodoQueryHandler()
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
 
 # Old Create Todo Route (Repository Pattern)
 # @router.post("/todos", status_code=status.HTTP_201_CREATED, response_model=TodoModel)
@@ -37,7 +41,7 @@ query_handler = TodoQueryHandler()
 @router.post("/todos", status_code=status.HTTP_201_CREATED, response_model=TodoModel)
 async def create_todo(command: CreateTodoCommand, session: AsyncSession = Depends(get_session)):
     try:
-        new_todo = await command_handler.handle_create_todo_command(command, session)
+        new_todo = await get_command_handler().handle_create_todo_command(command, session)
         return new_todo
     except UserNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -45,28 +49,150 @@ async def create_todo(command: CreateTodoCommand, session: AsyncSession = Depend
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Error communicating with User service")
     except httpx.RequestError as e:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="User service is unavailable")
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/todos:bulkComplete", status_code=status.HTTP_200_OK, response_model=BulkOperationResultModel)
+async def bulk_complete_todos(command: BulkCompleteTodosCommand, session: AsyncSession = Depends(get_session)):
+    try:
+        affected = await get_command_handler().handle_bulk_complete_todos_command(command, session)
+        return BulkOperationResultModel(affected=affected)
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/todos:bulkReopen", status_code=status.HTTP_200_OK, response_model=BulkOperationResultModel)
+async def bulk_reopen_todos(command: BulkReopenTodosCommand, session: AsyncSession = Depends(get_session)):
+    try:
+        affected = await get_command_handler().handle_bulk_reopen_todos_command(command, session)
+        return BulkOperationResultModel(affected=affected)
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/todos:bulkDelete", status_code=status.HTTP_200_OK, response_model=BulkOperationResultModel)
+async def bulk_delete_todos(command: BulkDeleteTodosCommand, session: AsyncSession = Depends(get_session)):
+    try:
+        affected = await get_command_handler().handle_bulk_delete_todos_command(command, session)
+        return BulkOperationResultModel(affected=affected)
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/todos:bulkReassign", status_code=status.HTTP_200_OK, response_model=BulkOperationResultModel)
+async def bulk_reassign_todos(command: BulkReassignTodosCommand, session: AsyncSession = Depends(get_session)):
+    try:
+        affected = await get_command_handler().handle_bulk_reassign_todos_command(command, session)
+        return BulkOperationResultModel(affected=affected)
+    except UserNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except CrossShardMoveException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Error communicating with User service")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="User service is unavailable")
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/todos:import", status_code=status.HTTP_200_OK, response_model=TodoImportResultModel)
+async def import_todos(request: Request, format: Optional[str] = Query(None, description="csv or ndjson, defaults to the Content-Type"),
+                       session: AsyncSession = Depends(get_session)):
+    file_format = format or format_for_content_type(request.headers.get("content-type"))
+    if file_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Send text/csv or application/x-ndjson, or pass ?format=")
+
+    try:
+        # The body is consumed as a stream, never buffered whole. Nothing is written to disk:
+        # the response carries the first rejected rows and the count of all of them
+        return await get_import_service().import_todos(request.stream(), file_format, session)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Error communicating with User service")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="User service is unavailable")
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
 @router.get("/todos/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoModel)
-async def get_todo(todo_id: int, session: AsyncSession = Depends(get_session)):
+async def get_todo(todo_id: int,
+                   fields: Optional[List[str]] = Query(None, description="Comma-separated todo fields to return"),
+                   session: AsyncSession = Depends(get_session)):
+    fields = parse_fields(fields)
     try:
-        todo = await todos_service.get_todo(todo_id, session)
+        todo = await get_todos_service().get_todo(todo_id, session, fields)
         if not todo:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
+        if fields is not None:
+            return fields_response(todo_fields_model(fields), todo)
         return todo
+    except DeadlineExceededException as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+def parse_fields(values: Optional[List[str]]) -> Optional[tuple[str, ...]]:
+    # Parsed before a route's try, so only bad ?fields= input answers 422
+    if values is None:
+        return None
+    try:
+        return todo_fields(values)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+
+def parse_ids(values: list[str]) -> list[int]:
+    # Accepts both ?ids=1,2,3 and ?ids=1&ids=2
+    return [int(value) for raw in values for value in raw.split(",") if value.strip()]
+
+
+def fields_response(model, data) -> Response:
+    # Serialized with the model for the requested fields; returning a Response skips
+    # validation against the route's full response_model
+    return Response(model.model_validate(data, from_attributes=True).model_dump_json(), media_type="application/json")
+
+
 @router.get("/todos", status_code=status.HTTP_200_OK, response_model=List[TodoModel])
-async def get_todos(session: AsyncSession = Depends(get_session)):
+async def get_todos(ids: Optional[List[str]] = Query(None, description="Comma-separated todo IDs to fetch in one query"),
+                    fields: Optional[List[str]] = Query(None, description="Comma-separated todo fields to return, e.g. id,title,is_completed"),
+                    session: AsyncSession = Depends(get_session)):
+    fields = parse_fields(fields)
     try:
-        todos = await todos_service.get_todos(session)
+        if ids is not None:
+            query = GetTodosByIdsQuery(ids=parse_ids(ids), fields=fields)
+            todos = await get_query_handler().handle_get_todos_by_ids_query(query, session)
+        else:
+            todos = await get_todos_service().get_todos(session, fields)
+        if fields is not None:
+            return fields_response(todo_list_fields_model(fields), todos)
         return todos
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except DeadlineExceededException as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -75,11 +201,17 @@ async def get_todos(session: AsyncSession = Depends(get_session)):
 @router.put("/todos/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoModel)
 async def update_todo(todo_id: int, todo_data: TodoUpdateModel, session: AsyncSession = Depends(get_session)):
     try:
-        todo = await todos_service.update_todo(todo_id, todo_data, session)
+        todo = await get_todos_service().update_todo(todo_id, todo_data, session)
         if not todo:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
         return todo
+    except CrossShardMoveException as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except DeadlineExceededException as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -88,8 +220,11 @@ async def update_todo(todo_id: int, todo_data: TodoUpdateModel, session: AsyncSe
 @router.delete("/todos/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(todo_id: int, session: AsyncSession = Depends(get_session)):
     try:
-        await todos_service.delete_todo(todo_id, session)
+        await get_todos_service().delete_todo(todo_id, session)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
+    except DeadlineExceededException as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -106,9 +241,18 @@ async def delete_todo(todo_id: int, session: AsyncSession = Depends(get_session)
 
 # New Get User Todos Route (CQRS Pattern)
 @router.get("/todos/user/{user_id}", status_code=status.HTTP_200_OK, response_model=list[TodoModel])
-async def get_todos_by_user(user_id: int, session: AsyncSession = Depends(get_session)):
+async def get_todos_by_user(user_id: int,
+                            include_pending: bool = Query(False, description="Include todos still waiting for user validation"),
+                            include_archived: bool = Query(False, description="Also read completed todos moved to the archive"),
+                            fields: Optional[List[str]] = Query(None, description="Comma-separated todo fields to return, e.g. id,title,is_completed"),
+                            session: AsyncSession = Depends(get_session)):
+    fields = parse_fields(fields)
     try:
-        todos = await query_handler.handle_get_todos_by_user_query(GetTodosByUserQuery(user_id=user_id), session)
+        query = GetTodosByUserQuery(user_id=user_id, include_pending=include_pending, include_archived=include_archived,
+                                    fields=fields)
+        todos = await get_query_handler().handle_get_todos_by_user_query(query, session)
+        if fields is not None:
+            return fields_response(todo_list_fields_model(fields), todos)
         return todos
     except UserNotFoundException as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -116,5 +260,102 @@ async def get_todos_by_user(user_id: int, session: AsyncSession = Depends(get_se
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Error communicating with User service")
     except httpx.RequestError as e:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="User service is unavailable")
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/todos/user/{user_id}/summary", status_code=status.HTTP_200_OK, response_model=TodoSummaryModel)
+async def get_todo_summary_by_user(user_id: int, session: AsyncSession = Depends(get_session)):
+    try:
+        return await get_query_handler().handle_get_todo_summary_by_user_query(GetTodoSummaryByUserQuery(user_id=user_id), session)
+    except UserNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Error communicating with User service")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="User service is unavailable")
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/todos/users:batchGet", status_code=status.HTTP_200_OK, response_model=TodosByUsersModel)
+async def batch_get_todos_by_users(request: TodosBatchGetByUsersModel,
+                                   fields: Optional[List[str]] = Query(None, description="Comma-separated todo fields to return"),
+                                   session: AsyncSession = Depends(get_session)):
+    fields = parse_fields(fields)
+    try:
+        query = GetTodosByUsersQuery(user_ids=request.user_ids, fields=fields)
+        result = await get_query_handler().handle_get_todos_by_users_query(query, session)
+        if fields is not None:
+            return fields_response(todos_by_users_fields_model(fields), result)
+        return result
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Error communicating with User service")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="User service is unavailable")
+    except DeadlineExceededException as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+async def ensure_user_exists(user_id: int) -> None:
+    try:
+        user_exists = await get_todos_service().check_user_exists(user_id)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Error communicating with User service")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="User service is unavailable")
+    if not user_exists:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id {user_id} not found")
+
+
+# Live change feed: replaces polling GET /todos/user/{user_id}
+@router.get("/todos/user/{user_id}/events", status_code=status.HTTP_200_OK)
+async def stream_user_todo_events(user_id: int):
+    await ensure_user_exists(user_id)
+
+    async def event_stream():
+        async with get_broker().subscribe(user_id) as subscription:
+            yield "retry: 3000\n\n"
+            while True:
+                event = await subscription.get(timeout=EVENTS_HEARTBEAT_SECONDS)
+                # Comment lines keep proxies from closing an idle stream
+                yield encode_sse(event) if event is not None else ": keepalive\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/todos/user/{user_id}/ws")
+async def user_todo_events_websocket(websocket: WebSocket, user_id: int):
+    try:
+        await ensure_user_exists(user_id)
+    except HTTPException as e:
+        await websocket.close(code=4000 + e.status_code, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    async with get_broker().subscribe(user_id) as subscription:
+        # Anything the client sends is ignored; receiving only tells us when it disconnects
+        receiver = asyncio.ensure_future(websocket.receive())
+        try:
+            while True:
+                getter = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    await websocket.send_text(getter.result().model_dump_json())
+                else:
+                    getter.cancel()
+                if receiver in done:
+                    if receiver.result()["type"] == "websocket.disconnect":
+                        return
+                    receiver = asyncio.ensure_future(websocket.receive())
+        finally:
+            receiver.cancel()
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, ConfigDict
-from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, RootModel, create_model
+from datetime import date, datetime
+from typing import Literal, Optional
 
 
 class TodoModel(BaseModel):
@@ -11,12 +12,36 @@ class TodoModel(BaseModel):
     user_id: int
     date_created: datetime
     date_updated: datetime
+    validation_status: str = "validated"
+    archived_at: Optional[datetime] = None
 
     model_config = ConfigDict(
         from_attributes=True
     )
 
 
+def todo_fields(values: list[str]) -> tuple[str, ...]:
+    # ?fields=id,title or ?fields=id&fields=title, in TodoModel order; id is always included
+    requested = {value.strip() for raw in values for value in raw.split(",") if value.strip()}
+    unknown = requested - TodoModel.model_fields.keys()
+    if unknown:
+        raise ValueError(f"Unknown todo fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in TodoModel.model_fields if name == "id" or name in requested)
+
+
+@lru_cache(maxsize=256)
+def todo_fields_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    # TodoModel cut down to the requested fields, which is what ?fields= responses are serialized with
+    return create_model(
+        "TodoFieldsModel", __config__=ConfigDict(from_attributes=True),
+        **{name: (TodoModel.model_fields[name].annotation, TodoModel.model_fields[name]) for name in fields})
+
+
+@lru_cache(maxsize=256)
+def todo_list_fields_model(fields: tuple[str, ...]) -> type[RootModel]:
+    return RootModel[list[todo_fields_model(fields)]]
+
+
 class TodoCreateModel(BaseModel):
     title: str
     description: str
@@ -53,3 +78,91 @@ class TodoUpdateModel(BaseModel):
             }
         }
     )
+
+
+
+class TodosBatchGetByUsersModel(BaseModel):
+    user_ids: list[int]
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "user_ids": [1111, 2222]
+            }
+        }
+    )
+
+
+class UserTodosModel(BaseModel):
+    user_id: int
+    todos: list[TodoModel]
+
+
+class TodosByUsersModel(BaseModel):
+    results: list[UserTodosModel]
+    not_found_user_ids: list[int]
+
+
+@lru_cache(maxsize=256)
+def todos_by_users_fields_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    user_todos_model = create_model(
+        "UserTodosFieldsModel", user_id=(int, ...), todos=(list[todo_fields_model(fields)], ...))
+    return create_model(
+        "TodosByUsersFieldsModel", results=(list[user_todos_model], ...), not_found_user_ids=(list[int], ...))
+
+
+class BulkOperationResultModel(BaseModel):
+    affected: int
+
+
+class TodoSummaryModel(BaseModel):
+    user_id: int
+    total: int
+    completed: int
+    pending: int
+
+
+class TodosPerUserModel(BaseModel):
+    users: int
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: int
+
+
+class DailyCountModel(BaseModel):
+    day: date
+    count: int
+
+
+class TodoStatsModel(BaseModel):
+    total: int
+    completed: int
+    completion_rate: float
+    todos_per_user: TodosPerUserModel
+    created_per_day: list[DailyCountModel]
+    generated_at: datetime
+
+
+class TodoImportRejectModel(BaseModel):
+    line: int
+    error: str
+    raw: str
+
+
+class TodoImportResultModel(BaseModel):
+    rows_read: int
+    rows_imported: int
+    rows_rejected: int
+    # The first rejected rows only; rows_rejected has the full count
+    rejects: list[TodoImportRejectModel] = []
+
+
+class TodoEventModel(BaseModel):
+    # "resync" tells a subscriber it fell behind and should refetch its todos
+    type: Literal["created", "updated", "deleted", "resync"]
+    user_id: int
+    todo_id: Optional[int] = None
+    previous_user_id: Optional[int] = None
+    todo: Optional[TodoModel] = None
@@ -0,0 +1,101 @@
+import argparse
+import importlib.util
+import logging
+import os
+import signal
+import threading
+import time
+import uvicorn
+import lifecycle
+
+# Worker processes; uvicorn's usual variable, one per core by default
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Seconds in-flight requests and open event streams get to finish once the listener is closed
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class DrainingServer(uvicorn.Server):
+    # On the first SIGTERM/SIGINT, GET /ops/ready turns 503 and requests keep being served
+    # for DRAIN_DELAY seconds. Then uvicorn's own shutdown runs: the listener closes,
+    # in-flight requests finish, and the lifespan shutdown releases the pool. A second
+    # signal skips the wait.
+    def handle_exit(self, sig, frame):
+        if lifecycle.is_draining() or lifecycle.DRAIN_DELAY <= 0:
+            super().handle_exit(sig, frame)
+            return
+        lifecycle.start_draining()
+        timer = threading.Timer(lifecycle.DRAIN_DELAY, super().handle_exit, (sig, frame))
+        timer.daemon = True
+        timer.start()
+
+
+def fastest(module: str, fallback: str) -> str:
+    return module if importlib.util.find_spec(module) else fallback
+
+
+def build_config(host: str, port: int) -> uvicorn.Config:
+    # Imported here, before any fork, so every worker starts with the app already loaded
+    from main import app
+    config = uvicorn.Config(
+        app, host=host, port=port,
+        loop=fastest("uvloop", "asyncio"), http=fastest("httptools", "h11"),
+        lifespan="on", timeout_graceful_shutdown=SHUTDOWN_TIMEOUT)
+    config.load()
+    return config
+
+
+def serve(host: str, port: int, workers: int) -> None:
+    config = build_config(host, port)
+    sock = config.bind_socket()
+    logger.info("Serving on %s:%s with %s worker(s), loop=%s, http=%s", host, port, workers, config.loop, config.http)
+    if workers <= 1 or not hasattr(os, "fork"):
+        DrainingServer(config).run(sockets=[sock])
+        return
+
+    # Prefork: every worker inherits the loaded app and the listening socket
+    children = set()
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            try:
+                DrainingServer(config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(sig, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    for _ in range(workers):
+        spawn()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        pid, status = os.wait()
+        children.discard(pid)
+        if not stopping:
+            logger.warning("Worker %s exited with status %s, starting a new one", pid, status)
+            # Don't spin if workers die right away, e.g. on a broken deploy
+            time.sleep(1)
+            spawn()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the todos API with several preloaded worker processes")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY, help="worker processes, one per core by default")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import select, insert, delete, true, literal, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Todo, ArchivedTodo, VALIDATED
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+
+archived_todos_total = REGISTRY.counter("todos_archived_total", "Todos moved to todos_archive")
+archive_errors_total = REGISTRY.counter("todos_archive_errors_total", "Archive runs that failed and will be retried")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class TodoArchiveService:
+    # Moves completed todos not updated for after_days days from todos to todos_archive,
+    # batch_size rows per transaction. The rows keep counting in todo_user_summaries.
+    def __init__(self, session_factory=None, after_days: int = ARCHIVE_AFTER_DAYS,
+                 batch_size: int = ARCHIVE_BATCH_SIZE, interval: float = ARCHIVE_INTERVAL):
+        self.session_factory = session_factory
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self.session_factory is None:
+            # One loop per shard: the job's statements and partitions are per database
+            from dependencies import get_router
+            session_factories = list(get_router().shard_sessions.values())
+        else:
+            session_factories = [self.session_factory]
+        self._tasks = [asyncio.create_task(self._run(session_factory)) for session_factory in session_factories]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def archive(self, session: AsyncSession, on_batch=None) -> int:
+        archived = 0
+        while True:
+            moved = await self.archive_batch(session)
+            archived += moved
+            if on_batch is not None and moved:
+                on_batch(archived)
+            if moved < self.batch_size:
+                return archived
+
+    async def archive_batch(self, session: AsyncSession) -> int:
+        now = datetime.now(timezone.utc)
+        # SKIP LOCKED: rows a request is changing right now wait for the next run,
+        # and two workers running the job never pick the same rows
+        result = await session.execute(
+            select(Todo.id, Todo.date_created)
+            .where(Todo.is_completed == true(), Todo.validation_status == VALIDATED,
+                   Todo.date_updated < now - timedelta(days=self.after_days))
+            .order_by(Todo.id).limit(self.batch_size)
+            .with_for_update(skip_locked=True))
+        rows = result.all()
+        if not rows:
+            await session.commit()
+            return 0
+
+        ids = [todo_id for todo_id, _ in rows]
+        if session.get_bind().dialect.name == "postgresql":
+            await self._create_partitions(session, {month_start(created.astimezone(timezone.utc).date()) for _, created in rows})
+        await session.execute(
+            insert(ArchivedTodo).from_select(
+                ["id", "title", "description", "is_completed", "user_id", "date_created", "date_updated", "archived_at"],
+                select(Todo.id, Todo.title, Todo.description, Todo.is_completed, Todo.user_id,
+                       Todo.date_created, Todo.date_updated, literal(now, ArchivedTodo.archived_at.type))
+                .where(Todo.id.in_(ids))))
+        await session.execute(delete(Todo).where(Todo.id.in_(ids)), execution_options={"synchronize_session": False})
+        await session.commit()
+
+        archived_todos_total.inc(len(ids))
+        return len(ids)
+
+    async def _create_partitions(self, session: AsyncSession, months: set[date]) -> None:
+        # Serializes partition creation between workers; released at commit
+        await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(ArchivedTodo.__tablename__))))
+        for month in sorted(months):
+            await session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {ArchivedTodo.__tablename__}_{month:%Y_%m} "
+                f"PARTITION OF {ArchivedTodo.__tablename__} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{next_month(month).isoformat()} 00:00:00+00')"))
+
+    async def _run(self, session_factory) -> None:
+        while True:
+            try:
+                async with session_factory() as session:
+                    archived = await self.archive(session)
+                if archived:
+                    logger.info("Archived %s todos", archived)
+            except Exception:
+                logger.exception("Todo archive run failed")
+                archive_errors_total.inc()
+            await asyncio.sleep(self.interval)
+
+
+_service = None
+
+
+def get_archive_service() -> TodoArchiveService:
+    global _service
+    if _service is None:
+        _service = TodoArchiveService()
+    return _service
@@ -0,0 +1,237 @@
+import codecs
+import csv
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Optional, TextIO
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Todo
+from repositories.summary_repository import TodoSummaryRepository, deltas_for_rows
+from sharding.router import shard_router
+from schemas import TodoImportResultModel, TodoImportRejectModel
+from services.todos_service import TodoService
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+# Rejected rows returned with the result; the rest are only counted (or written to the rejects file)
+IMPORT_REJECTS_SAMPLE = int(os.getenv("IMPORT_REJECTS_SAMPLE", "100"))
+IMPORT_FORMATS = ("csv", "ndjson")
+CONTENT_TYPE_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+COPY_COLUMNS = ("title", "description", "is_completed", "user_id", "date_created", "date_updated")
+
+TRUE_VALUES = {"true", "1", "yes", "y", "t"}
+FALSE_VALUES = {"false", "0", "no", "n", "f", ""}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    # Decodes incrementally so a multi-byte character split across chunks survives
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, str, object]]:
+    header = None
+    record, start_line, line_number = "", 0, 0
+    async for line in lines:
+        line_number += 1
+        record = f"{record}\n{line}" if record else line
+        start_line = start_line or line_number
+        # A quoted field may contain newlines: wait until the quotes balance
+        if record.count('"') % 2:
+            continue
+        raw, number = record, start_line
+        record, start_line = "", 0
+        if not raw.strip():
+            continue
+        values = next(csv.reader([raw]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield number, raw, ImportRowError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield number, raw, dict(zip(header, values))
+    if record:
+        yield start_line, record, ImportRowError("Unterminated quoted field")
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, str, object]]:
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield line_number, line, ImportRowError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(value, dict):
+            yield line_number, line, ImportRowError("Expected a JSON object")
+            continue
+        yield line_number, line, value
+
+
+def format_for_content_type(content_type: Optional[str]) -> Optional[str]:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return CONTENT_TYPE_FORMATS.get(media_type)
+
+
+def parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ImportRowError(f"Invalid is_completed value {value!r}")
+
+
+def parse_datetime(value, default: datetime) -> datetime:
+    if value in (None, ""):
+        return default
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise ImportRowError(f"Invalid timestamp {value!r}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def to_todo_row(record: dict, now: datetime) -> dict:
+    title = record.get("title")
+    if title is None or not str(title).strip():
+        raise ImportRowError("title is required")
+    try:
+        user_id = int(record.get("user_id"))
+    except (TypeError, ValueError):
+        raise ImportRowError(f"Invalid user_id {record.get('user_id')!r}")
+    description = record.get("description")
+    date_created = parse_datetime(record.get("date_created"), now)
+    return {
+        "title": str(title),
+        "description": None if description is None else str(description),
+        "is_completed": parse_bool(record.get("is_completed", False)),
+        "user_id": user_id,
+        "date_created": date_created,
+        "date_updated": parse_datetime(record.get("date_updated"), date_created),
+    }
+
+
+class TodoImportService:
+    def __init__(self, todos_service: Optional[TodoService] = None, batch_size: int = IMPORT_BATCH_SIZE,
+                 rejects_sample: int = IMPORT_REJECTS_SAMPLE):
+        self.todos_service = todos_service or TodoService()
+        self.batch_size = batch_size
+        self.rejects_sample = rejects_sample
+        self.summary_repository = TodoSummaryRepository()
+
+    async def import_todos(
+        self,
+        chunks: AsyncIterator[bytes],
+        file_format: str,
+        session: AsyncSession,
+        rejects: Optional[TextIO] = None,
+        on_progress: Optional[Callable[[TodoImportResultModel], None]] = None,
+    ) -> TodoImportResultModel:
+        if file_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format {file_format!r}, expected one of {IMPORT_FORMATS}")
+
+        records = iter_csv_records if file_format == "csv" else iter_ndjson_records
+        progress = TodoImportResultModel(rows_read=0, rows_imported=0, rows_rejected=0)
+        # user_id -> exists, so each user is checked once per import
+        known_users: dict[int, bool] = {}
+        batch: list[tuple[int, str, dict]] = []
+        now = datetime.now(timezone.utc)
+
+        def reject(line_number: int, raw: str, error: str) -> None:
+            progress.rows_rejected += 1
+            if len(progress.rejects) < self.rejects_sample:
+                progress.rejects.append(TodoImportRejectModel(line=line_number, error=error, raw=raw))
+            if rejects is not None:
+                rejects.write(json.dumps({"line": line_number, "error": error, "raw": raw}) + "\n")
+
+        async def flush() -> None:
+            rows = await self._validate_users(batch, known_users, reject)
+            if rows:
+                await self._copy_rows(session, rows)
+                progress.rows_imported += len(rows)
+            batch.clear()
+            logger.info("Imported %s rows, rejected %s of %s read",
+                        progress.rows_imported, progress.rows_rejected, progress.rows_read)
+            if on_progress is not None:
+                on_progress(progress)
+
+        async for line_number, raw, record in records(iter_lines(chunks)):
+            progress.rows_read += 1
+            if isinstance(record, Exception):
+                reject(line_number, raw, str(record))
+                continue
+            try:
+                batch.append((line_number, raw, to_todo_row(record, now)))
+            except ImportRowError as e:
+                reject(line_number, raw, str(e))
+                continue
+            if len(batch) >= self.batch_size:
+                await flush()
+
+        if batch:
+            await flush()
+        return progress
+
+    async def _validate_users(self, batch: list, known_users: dict[int, bool], reject) -> list[dict]:
+        unknown = {row["user_id"] for _, _, row in batch} - known_users.keys()
+        if unknown:
+            known_users.update(await self.todos_service.check_users_exist(sorted(unknown)))
+
+        rows = []
+        for line_number, raw, row in batch:
+            if known_users[row["user_id"]]:
+                rows.append(row)
+            else:
+                reject(line_number, raw, f"User with id {row['user_id']} not found")
+        return rows
+
+    async def _copy_rows(self, session: AsyncSession, rows: list[dict]) -> None:
+        router = shard_router(session)
+        if router is None:
+            shards = [(None, rows)]
+        else:
+            shards = [({"shard_id": shard_id}, shard_rows) for shard_id, shard_rows in
+                      router.group_by_shard(rows, lambda row: row["user_id"]).items()]
+        for bind_arguments, shard_rows in shards:
+            connection = await session.connection(bind_arguments=bind_arguments)
+            if connection.dialect.name == "postgresql" and connection.dialect.driver == "asyncpg":
+                # COPY ... FROM STDIN through asyncpg, bypassing per-row INSERT overhead
+                raw_connection = await connection.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(
+                    Todo.__tablename__,
+                    records=[tuple(row[column] for column in COPY_COLUMNS) for row in shard_rows],
+                    columns=COPY_COLUMNS,
+                )
+            else:
+                await session.execute(insert(Todo), shard_rows, bind_arguments=bind_arguments)
+        await self.summary_repository.apply(
+            session, deltas_for_rows((row["user_id"], row["is_completed"]) for row in rows))
+        await session.commit()
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import time
+from datetime import date, datetime, time as datetime_time, timedelta, timezone
+from typing import TYPE_CHECKING, Optional
+from sqlalchemy import select, func, literal_column, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Todo, ArchivedTodo, TodoUserSummary, VALIDATED
+from schemas import TodoStatsModel, TodosPerUserModel, DailyCountModel
+from sharding.router import shard_router
+
+if TYPE_CHECKING:
+    import numpy as np
+
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "60"))
+STATS_HISTOGRAM_DAYS = int(os.getenv("STATS_HISTOGRAM_DAYS", "30"))
+STATS_CHUNK_SIZE = int(os.getenv("STATS_CHUNK_SIZE", "100000"))
+
+PERCENTILES = (50, 90, 99)
+# julianday() of 1970-01-01T00:00:00
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+
+class TodoStatsService:
+    def __init__(self, cache_ttl: float = STATS_CACHE_TTL, chunk_size: int = STATS_CHUNK_SIZE):
+        self.cache_ttl = cache_ttl
+        self.chunk_size = chunk_size
+        self._cache: dict[int, tuple[float, TodoStatsModel]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def get_stats(self, session: AsyncSession, days: int = STATS_HISTOGRAM_DAYS) -> TodoStatsModel:
+        cached = self._cache.get(days)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # One request recomputes an expired entry; the others wait and reuse it
+        async with self._lock:
+            cached = self._cache.get(days)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+            stats = await self._compute(session, days)
+            self._cache[days] = (time.monotonic() + self.cache_ttl, stats)
+            return stats
+
+    async def _compute(self, session: AsyncSession, days: int) -> TodoStatsModel:
+        # Totals and the per-user distribution come from todo_user_summaries (one row
+        # per user), so only the recent date_created range is read from todos and todos_archive
+        start_day = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        router = shard_router(session)
+        if router is not None:
+            total, completed, todos_per_user, counts = await self._compute_sharded(router, start_day, days)
+        else:
+            total, completed = await self._totals(session)
+            if session.get_bind().dialect.name == "postgresql":
+                todos_per_user = await self._todos_per_user_sql(session)
+            else:
+                todos_per_user = distribution([await self._user_totals_chunked(session)])
+            counts = await self._created_per_day(session, start_day, days)
+
+        return TodoStatsModel(
+            total=total,
+            completed=completed,
+            completion_rate=completed / total if total else 0.0,
+            todos_per_user=todos_per_user,
+            created_per_day=[
+                DailyCountModel(day=start_day + timedelta(days=offset), count=counts.get(offset, 0))
+                for offset in range(days)
+            ],
+            generated_at=datetime.now(timezone.utc),
+        )
+
+    async def _compute_sharded(self, router, start_day: date, days: int):
+        # Every shard is read concurrently; the percentiles need all users' totals
+        # at once, so those are always gathered into NumPy
+        async def read(shard_session: AsyncSession):
+            return (
+                await self._totals(shard_session),
+                await self._user_totals_chunked(shard_session),
+                await self._created_per_day(shard_session, start_day, days),
+            )
+
+        parts = await router.scatter(read)
+        counts = {}
+        for _, _, shard_counts in parts:
+            for offset, count in shard_counts.items():
+                counts[offset] = counts.get(offset, 0) + count
+        return (
+            sum(totals[0] for totals, _, _ in parts),
+            sum(totals[1] for totals, _, _ in parts),
+            distribution([user_totals for _, user_totals, _ in parts]),
+            counts,
+        )
+
+    async def _totals(self, session: AsyncSession) -> tuple[int, int]:
+        return tuple((await session.execute(
+            select(
+                func.coalesce(func.sum(TodoUserSummary.total), 0),
+                func.coalesce(func.sum(TodoUserSummary.completed), 0),
+            ))).one())
+
+    async def _created_per_day(self, session: AsyncSession, start_day: date, days: int) -> dict[int, int]:
+        if session.get_bind().dialect.name == "postgresql":
+            return await self._created_per_day_sql(session, start_day)
+        return await self._created_per_day_chunked(session, start_day, days)
+
+    async def _todos_per_user_sql(self, session: AsyncSession) -> TodosPerUserModel:
+        row = (await session.execute(
+            select(
+                func.count(),
+                func.coalesce(func.avg(TodoUserSummary.total), 0),
+                *(func.percentile_cont(percentile / 100).within_group(TodoUserSummary.total)
+                  for percentile in PERCENTILES),
+                func.coalesce(func.max(TodoUserSummary.total), 0),
+            ).where(TodoUserSummary.total > 0))).one()
+        users, mean, p50, p90, p99, maximum = row
+        return TodosPerUserModel(
+            users=users, mean=mean, p50=p50 or 0, p90=p90 or 0, p99=p99 or 0, max=maximum)
+
+    async def _created_per_day_sql(self, session: AsyncSession, start_day: date) -> dict[int, int]:
+        created = created_since(start_day)
+        # Literals rather than bind parameters, so GROUP BY matches the selected expression
+        day = func.date_trunc(literal_column("'day'"), func.timezone(literal_column("'UTC'"), created.c.date_created))
+        result = await session.execute(select(day, func.count()).group_by(day))
+        return {(created.date() - start_day).days: count for created, count in result.all()}
+
+    async def _user_totals_chunked(self, session: AsyncSession) -> "np.ndarray":
+        # SQLite has no percentile_cont: stream the per-user totals into NumPy in chunks.
+        # NumPy is imported here, on first use, as it adds ~50ms to the app's import time
+        import numpy as np
+        chunks = [np.zeros(0, dtype=np.int64)]
+        result = await session.stream(select(TodoUserSummary.total).where(TodoUserSummary.total > 0))
+        async for partition in result.partitions(self.chunk_size):
+            chunks.append(np.fromiter((row[0] for row in partition), dtype=np.int64, count=len(partition)))
+        return np.concatenate(chunks)
+
+    async def _created_per_day_chunked(self, session: AsyncSession, start_day: date, days: int) -> dict[int, int]:
+        # Days since the Unix epoch as floats, bucketed with bincount one chunk at a time
+        import numpy as np
+        first_day = (start_day - date(1970, 1, 1)).days
+        counts = np.zeros(days, dtype=np.int64)
+        created = created_since(start_day)
+        result = await session.stream(select(func.julianday(created.c.date_created) - UNIX_EPOCH_JULIAN_DAY))
+        async for partition in result.partitions(self.chunk_size):
+            offsets = np.floor(
+                np.fromiter((row[0] for row in partition), dtype=np.float64, count=len(partition))
+            ).astype(np.int64) - first_day
+            offsets = offsets[(offsets >= 0) & (offsets < days)]
+            counts += np.bincount(offsets, minlength=days)
+        return {offset: int(count) for offset, count in enumerate(counts) if count}
+
+
+def created_since(start_day: date):
+    # Archived todos still count in todo_user_summaries, so the histogram reads them too
+    # and adds up to the totals. Each branch filters on date_created, which also prunes
+    # the monthly partitions of todos_archive.
+    since = datetime.combine(start_day, datetime_time(), timezone.utc)
+    return union_all(
+        select(Todo.date_created).where(Todo.date_created >= since, Todo.validation_status == VALIDATED),
+        select(ArchivedTodo.date_created).where(ArchivedTodo.date_created >= since),
+    ).subquery()
+
+
+def distribution(shard_totals: list["np.ndarray"]) -> TodosPerUserModel:
+    import numpy as np
+    totals = np.concatenate(shard_totals)
+    if not totals.size:
+        return TodosPerUserModel(users=0, mean=0, p50=0, p90=0, p99=0, max=0)
+    # NumPy's default linear interpolation matches PostgreSQL's percentile_cont
+    p50, p90, p99 = np.percentile(totals, PERCENTILES)
+    return TodosPerUserModel(
+        users=int(totals.size), mean=float(totals.mean()),
+        p50=float(p50), p90=float(p90), p99=float(p99), max=int(totals.max()))
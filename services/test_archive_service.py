@@ -0,0 +1,83 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base
+from handlers.query_handler import TodoQueryHandler
+from models import Todo, ArchivedTodo, TodoUserSummary, PENDING_VALIDATION
+from queries import GetTodosByUserQuery
+from repositories.summary_repository import TodoSummaryRepository
+from services.archive_service import TodoArchiveService, next_month
+from services.todos_service import TodoService
+
+
+class TestTodoArchiveService(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+        now = datetime.now(timezone.utc)
+        old = now - timedelta(days=100)
+        async with self.session_factory() as session:
+            await session.execute(insert(Todo), [
+                # ids 1-5: old and completed
+                *({"id": i, "title": f"Old {i}", "is_completed": True, "user_id": 1,
+                   "date_created": old, "date_updated": old} for i in range(1, 6)),
+                {"id": 6, "title": "Old open", "is_completed": False, "user_id": 1, "date_created": old, "date_updated": old},
+                {"id": 7, "title": "Recent", "is_completed": True, "user_id": 1, "date_created": old, "date_updated": now},
+                {"id": 8, "title": "Old pending", "is_completed": True, "user_id": 2, "date_created": old,
+                 "date_updated": old, "validation_status": PENDING_VALIDATION},
+            ])
+            await session.execute(insert(TodoUserSummary), [{"user_id": 1, "total": 7, "completed": 6}])
+            await session.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def test_archive_moves_old_completed_todos_in_batches(self):
+        batches = []
+        async with self.session_factory() as session:
+            archived = await TodoArchiveService(after_days=90, batch_size=2).archive(session, on_batch=batches.append)
+            hot_ids = (await session.execute(select(Todo.id).order_by(Todo.id))).scalars().all()
+            archived_ids = (await session.execute(select(ArchivedTodo.id).order_by(ArchivedTodo.id))).scalars().all()
+            summary = await TodoSummaryRepository().get(session, 1)
+
+        self.assertEqual(archived, 5)
+        self.assertEqual(batches, [2, 4, 5])
+        self.assertEqual(hot_ids, [6, 7, 8])
+        self.assertEqual(archived_ids, [1, 2, 3, 4, 5])
+        # Archiving does not change what a user has
+        self.assertEqual((summary.total, summary.completed), (7, 6))
+
+    @patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock)
+    async def test_reads_hot_table_unless_archived_included(self, mock_check_user_exists):
+        mock_check_user_exists.return_value = True
+        async with self.session_factory() as session:
+            await TodoArchiveService(after_days=90, batch_size=10).archive(session)
+            handler = TodoQueryHandler()
+            hot = await handler.handle_get_todos_by_user_query(GetTodosByUserQuery(user_id=1), session)
+            everything = await handler.handle_get_todos_by_user_query(
+                GetTodosByUserQuery(user_id=1, include_archived=True), session)
+
+        self.assertEqual(sorted(todo.id for todo in hot), [6, 7])
+        self.assertEqual([todo.id for todo in everything], [1, 2, 3, 4, 5, 6, 7])
+
+    async def test_rebuild_counts_archived_todos(self):
+        async with self.session_factory() as session:
+            await TodoArchiveService(after_days=90, batch_size=10).archive(session)
+            await TodoSummaryRepository().rebuild(session, batch_size=10)
+            summary = await TodoSummaryRepository().get(session, 1)
+
+        self.assertEqual((summary.total, summary.completed), (7, 6))
+
+    def test_next_month(self):
+        self.assertEqual(next_month(datetime(2024, 1, 31).date()), datetime(2024, 2, 1).date())
+        self.assertEqual(next_month(datetime(2024, 12, 1).date()), datetime(2025, 1, 1).date())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import io
+import json
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.import_service import TodoImportService, iter_lines, iter_csv_records, format_for_content_type
+from services.todos_service import TodoService
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+class TestImportParsing(unittest.IsolatedAsyncioTestCase):
+
+    async def test_lines_survive_split_multibyte_characters(self):
+        data = "title\ncafé ☕\nlast".encode("utf-8")
+
+        lines = await collect(iter_lines(chunked(data, 1)))
+
+        self.assertEqual(lines, ["title", "café ☕", "last"])
+
+    async def test_csv_quoted_newlines_and_column_mismatch(self):
+        data = b'title,description\r\n"Multi","line\ndescription"\nshort\n'
+
+        records = await collect(iter_csv_records(iter_lines(chunked(data, 4))))
+
+        self.assertEqual(records[0][0], 2)
+        self.assertEqual(records[0][2], {"title": "Multi", "description": "line\ndescription"})
+        self.assertEqual(records[1][0], 4)
+        self.assertIsInstance(records[1][2], ValueError)
+
+    def test_format_for_content_type(self):
+        self.assertEqual(format_for_content_type("text/csv; charset=utf-8"), "csv")
+        self.assertEqual(format_for_content_type("application/x-ndjson"), "ndjson")
+        self.assertIsNone(format_for_content_type("application/json"))
+
+
+class TestTodoImportService(unittest.IsolatedAsyncioTestCase):
+
+    @patch.object(TodoService, 'check_users_exist', new_callable=AsyncMock)
+    async def test_import_csv_in_batches_with_rejects(self, mock_check_users_exist):
+        mock_check_users_exist.side_effect = lambda user_ids: {user_id: user_id != 3 for user_id in user_ids}
+        mock_session = MagicMock(spec=AsyncSession)
+        data = (
+            b"title,description,is_completed,user_id\n"
+            b"A,first,true,1\n"
+            b"B,second,false,1\n"
+            b",no title,false,1\n"
+            b"C,unknown user,false,3\n"
+            b"D,bad flag,maybe,2\n"
+            b"E,fifth,0,2\n"
+        )
+        rejects = io.StringIO()
+        progress_updates = []
+
+        import_service = TodoImportService(batch_size=2)
+        result = await import_service.import_todos(
+            chunked(data, 7), "csv", mock_session, rejects,
+            on_progress=lambda progress: progress_updates.append(progress.rows_imported))
+
+        self.assertEqual((result.rows_read, result.rows_imported, result.rows_rejected), (6, 3, 3))
+        self.assertEqual(progress_updates, [2, 3])
+
+        # Every user is checked against the Users service once per import
+        checked = [user_id for call in mock_check_users_exist.call_args_list for user_id in call[0][0]]
+        self.assertEqual(sorted(checked), [1, 2, 3])
+
+        insert_calls = [call for call in mock_session.execute.call_args_list if len(call[0]) == 2]
+        inserted = [row for call in insert_calls for row in call[0][1]]
+        self.assertEqual([row["title"] for row in inserted], ["A", "B", "E"])
+        self.assertTrue(inserted[0]["is_completed"])
+        self.assertEqual(mock_session.commit.call_count, 2)
+
+        # Each batch bumps the user summary counters before it commits
+        summary_statements = [str(call[0][0]) for call in mock_session.execute.call_args_list if len(call[0]) == 1]
+        self.assertEqual(len(summary_statements), 2)
+        self.assertTrue(summary_statements[0].startswith("INSERT INTO todo_user_summaries"))
+
+        rejected = [json.loads(line) for line in rejects.getvalue().splitlines()]
+        self.assertEqual([line["line"] for line in rejected], [4, 6, 5])
+        self.assertIn("not found", rejected[2]["error"])
+
+    @patch.object(TodoService, 'check_users_exist', new_callable=AsyncMock, return_value={1: True})
+    async def test_import_ndjson(self, mock_check_users_exist):
+        mock_session = MagicMock(spec=AsyncSession)
+        data = (
+            b'{"title": "A", "description": "d", "is_completed": true, "user_id": 1, "date_created": "2024-07-14T12:00:00Z"}\n'
+            b'not json\n'
+        )
+        rejects = io.StringIO()
+
+        result = await TodoImportService().import_todos(chunked(data, 16), "ndjson", mock_session, rejects)
+
+        self.assertEqual((result.rows_imported, result.rows_rejected), (1, 1))
+        row = mock_session.execute.call_args_list[0][0][1][0]
+        self.assertEqual(row["date_created"].year, 2024)
+        self.assertEqual(row["date_updated"], row["date_created"])
+
+    @patch.object(TodoService, 'check_users_exist', new_callable=AsyncMock, return_value={})
+    async def test_rejects_sample_is_bounded(self, mock_check_users_exist):
+        data = b"".join(b"not json %d\n" % i for i in range(5))
+
+        result = await TodoImportService(rejects_sample=2).import_todos(
+            chunked(data, 16), "ndjson", MagicMock(spec=AsyncSession))
+
+        self.assertEqual(result.rows_rejected, 5)
+        self.assertEqual([reject.line for reject in result.rejects], [1, 2])
+        self.assertEqual(result.rejects[0].raw, "not json 0")
+
+    async def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            await TodoImportService().import_todos(chunked(b"", 1), "xml", MagicMock(), io.StringIO())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,16 @@
+import asyncio
+import ssl
 import unittest
+import httpx
 from unittest.mock import patch, AsyncMock
 from sqlalchemy.ext.asyncio import AsyncSession
-from services.todos_service import TodoService
+from services.todos_service import TodoService, users_tls_context
 from schemas import TodoCreateModel, TodoUpdateModel
 from models import Todo
 from exceptions.user_not_found_exception import UserNotFoundException
 from schemas import TodoCreateModel
+from exceptions.deadline_exceeded_exception import DeadlineExceededException
+import deadlines
 
 
 class TestTodoService(unittest.IsolatedAsyncioTestCase):
@@ -32,6 +37,40 @@ class TestTodoService(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result['first_name'], 'Test')
         self.assertEqual(result['last_name'], 'User')
     
+    @patch('httpx.AsyncClient')
+    async def test_find_user_by_id_uses_request_deadline(self, mock_client_class):
+        mock_client = AsyncMock()
+        mock_client.get.side_effect = httpx.ReadTimeout("timed out")
+        mock_client_class.return_value.__aenter__.return_value = mock_client
+
+        todo_service = TodoService()
+        token = deadlines.set_deadline(0.01)
+        try:
+            await asyncio.sleep(0.02)
+            with self.assertRaises(DeadlineExceededException):
+                await todo_service.find_user_by_id(1)
+        finally:
+            deadlines.reset_deadline(token)
+
+        # Expired before the call: no request is sent at all
+        mock_client.get.assert_not_called()
+
+    @patch('httpx.AsyncClient')
+    async def test_find_user_by_id_timeout_capped_by_deadline(self, mock_client_class):
+        mock_client = AsyncMock()
+        mock_client.get.side_effect = httpx.ReadTimeout("timed out")
+        mock_client_class.return_value.__aenter__.return_value = mock_client
+
+        todo_service = TodoService()
+        token = deadlines.set_deadline(0.5)
+        try:
+            with self.assertRaises(httpx.ReadTimeout):
+                await todo_service.find_user_by_id(1)
+        finally:
+            deadlines.reset_deadline(token)
+
+        self.assertLessEqual(mock_client_class.call_args.kwargs["timeout"], 0.5)
+
     @patch('services.todos_service.TodoService.find_user_by_id')
     async def test_check_user_exists(self, mock_find_user_by_id):
         mock_find_user_by_id.return_value = {
@@ -51,6 +90,30 @@ class TestTodoService(unittest.IsolatedAsyncioTestCase):
         # Assertions
         self.assertTrue(result)
 
+    @patch('services.todos_service.USERS_CHECK_CONCURRENCY', 2)
+    @patch('services.todos_service.TodoService.check_user_exists')
+    async def test_check_users_exist(self, mock_check_user_exists):
+        in_flight = 0
+        max_in_flight = 0
+
+        async def check(user_id):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return user_id != 3
+
+        mock_check_user_exists.side_effect = check
+
+        todo_service = TodoService()
+        result = await todo_service.check_users_exist([1, 2, 3, 1, 4, 2])
+
+        # Duplicates are checked once and fan-out is bounded
+        self.assertEqual(result, {1: True, 2: True, 3: False, 4: True})
+        self.assertEqual(mock_check_user_exists.call_count, 4)
+        self.assertEqual(max_in_flight, 2)
+
     @patch('services.todos_service.TodoService.find_user_by_id')
     async def test_create_todo(self, mock_find_user_by_id):
         mock_find_user_by_id.return_value = {
@@ -229,5 +292,12 @@ class TestTodoService(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result[0].title, 'Test Todo 1')
         self.assertEqual(result[1].title, 'Test Todo 2')
 
+    def test_users_clients_share_one_verifying_tls_context(self):
+        context = users_tls_context()
+
+        self.assertIs(users_tls_context(), context)
+        self.assertEqual(context.verify_mode, ssl.CERT_REQUIRED)
+        self.assertTrue(context.check_hostname)
+
 if __name__ == '__main__':
     unittest.main()
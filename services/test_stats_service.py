@@ -0,0 +1,88 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, AsyncMock, patch
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from database import Base
+from models import Todo, TodoUserSummary
+from repositories.summary_repository import TodoSummaryRepository
+from services.archive_service import TodoArchiveService
+from services.stats_service import TodoStatsService
+
+
+class TestTodoStatsService(unittest.IsolatedAsyncioTestCase):
+
+    @patch.object(TodoStatsService, '_compute', new_callable=AsyncMock)
+    async def test_stats_cached_until_ttl(self, mock_compute):
+        mock_session = MagicMock(spec=AsyncSession)
+
+        cached = TodoStatsService(cache_ttl=60)
+        await cached.get_stats(mock_session, 7)
+        await cached.get_stats(mock_session, 7)
+        await cached.get_stats(mock_session, 30)
+        self.assertEqual(mock_compute.call_count, 2)
+
+        mock_compute.reset_mock()
+        uncached = TodoStatsService(cache_ttl=0)
+        await uncached.get_stats(mock_session, 7)
+        await uncached.get_stats(mock_session, 7)
+        self.assertEqual(mock_compute.call_count, 2)
+
+    async def test_chunked_stats_on_sqlite(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        now = datetime.now(timezone.utc).replace(hour=12)
+        async with async_sessionmaker(bind=engine)() as session:
+            await session.execute(insert(Todo), [
+                {"title": f"Todo {i}", "description": "", "is_completed": i < 3, "user_id": 1 if i < 8 else 2,
+                 "date_created": now - timedelta(days=i % 2 + (40 if i == 9 else 0)), "date_updated": now}
+                for i in range(10)
+            ])
+            await session.execute(insert(TodoUserSummary), [
+                {"user_id": 1, "total": 8, "completed": 3},
+                {"user_id": 2, "total": 2, "completed": 0},
+                {"user_id": 3, "total": 0, "completed": 0},
+            ])
+            await session.commit()
+
+            stats = await TodoStatsService(chunk_size=3)._compute(session, 7)
+        await engine.dispose()
+
+        self.assertEqual((stats.total, stats.completed, stats.completion_rate), (10, 3, 0.3))
+        # Users without todos are left out of the distribution
+        self.assertEqual(stats.todos_per_user.users, 2)
+        self.assertEqual((stats.todos_per_user.p50, stats.todos_per_user.max), (5.0, 8))
+        self.assertEqual(len(stats.created_per_day), 7)
+        self.assertEqual(stats.created_per_day[-1].day, now.date())
+        # The todo created 40 days ago falls outside the histogram
+        self.assertEqual([day.count for day in stats.created_per_day[-2:]], [4, 5])
+
+
+    async def test_histogram_counts_archived_todos(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        now = datetime.now(timezone.utc).replace(hour=12)
+        async with async_sessionmaker(bind=engine, expire_on_commit=False)() as session:
+            await session.execute(insert(Todo), [
+                {"title": "Old", "description": "", "is_completed": True, "user_id": 1,
+                 "date_created": now - timedelta(days=100), "date_updated": now - timedelta(days=100)},
+                {"title": "New", "description": "", "is_completed": False, "user_id": 1,
+                 "date_created": now, "date_updated": now},
+            ])
+            await session.commit()
+            await TodoSummaryRepository().rebuild(session, batch_size=10)
+            self.assertEqual(await TodoArchiveService(after_days=90).archive(session), 1)
+
+            stats = await TodoStatsService()._compute(session, 120)
+        await engine.dispose()
+
+        self.assertEqual(stats.total, 2)
+        self.assertEqual(sum(day.count for day in stats.created_per_day), stats.total)
+        self.assertEqual(stats.created_per_day[-101].count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, AsyncMock, patch
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from commands import CreateTodoCommand
+from database import Base
+from handlers.command_handler import TodoCommandHandler
+from models import Todo, TodoUserSummary, VALIDATED, PENDING_VALIDATION, INVALID_USER
+from services.todos_service import TodoService
+from services.user_validation_service import UserValidationService
+
+
+class TestUserValidationService(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as session:
+            await session.execute(insert(Todo), [
+                {"title": f"Todo {i}", "description": "", "is_completed": i == 0, "user_id": user_id,
+                 "validation_status": PENDING_VALIDATION, "date_created": now, "date_updated": now}
+                for i, user_id in enumerate((1, 1, 2, 3))
+            ])
+            await session.execute(insert(TodoUserSummary), [{"user_id": 1, "total": 5, "completed": 1}])
+            await session.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def validate(self, invalid_action):
+        todos_service = MagicMock(spec=TodoService)
+        todos_service.check_users_exist = AsyncMock(
+            side_effect=lambda user_ids: {user_id: user_id != 3 for user_id in user_ids})
+        service = UserValidationService(
+            session_factory=self.session_factory, todos_service=todos_service,
+            workers=1, invalid_action=invalid_action)
+
+        with patch('services.user_validation_service.publish_bulk_events', new_callable=AsyncMock) as mock_publish:
+            async with self.session_factory() as session:
+                checked = await service.validate_batch(session)
+                # Nothing left to check on the next poll
+                self.assertEqual(await service.validate_batch(session), 0)
+                todos = (await session.execute(select(Todo.user_id, Todo.validation_status))).all()
+                summaries = (await session.execute(
+                    select(TodoUserSummary.user_id, TodoUserSummary.total, TodoUserSummary.completed)
+                    .order_by(TodoUserSummary.user_id))).all()
+
+        self.assertEqual(checked, 3)
+        todos_service.check_users_exist.assert_awaited_once()
+        self.assertEqual(mock_publish.call_args[0][0], "created")
+        self.assertEqual(len(mock_publish.call_args[0][1]), 3)
+        # Validated rows are added on top of the existing counters
+        self.assertEqual(summaries, [(1, 7, 2), (2, 1, 0)])
+        return sorted(todos)
+
+    async def test_validate_batch_deletes_invalid_users(self):
+        todos = await self.validate("delete")
+        self.assertEqual(todos, [(1, VALIDATED), (1, VALIDATED), (2, VALIDATED)])
+
+    async def test_validate_batch_flags_invalid_users(self):
+        todos = await self.validate("flag")
+        self.assertEqual(todos, [(1, VALIDATED), (1, VALIDATED), (2, VALIDATED), (3, INVALID_USER)])
+
+    @patch('handlers.command_handler.get_user_validation_service')
+    @patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock)
+    async def test_deferred_create_skips_users_service(self, mock_check_user_exists, mock_get_validation_service):
+        mock_session = MagicMock(spec=AsyncSession)
+
+        handler = TodoCommandHandler(validation_mode="deferred")
+        todo = await handler.handle_create_todo_command(
+            CreateTodoCommand(title="Todo", description="", is_completed=False, user_id=1), mock_session)
+
+        self.assertEqual(todo.validation_status, PENDING_VALIDATION)
+        mock_check_user_exists.assert_not_awaited()
+        mock_session.commit.assert_awaited_once()
+        mock_get_validation_service.return_value.notify.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,54 @@
+import asyncio
 import os
+import ssl
 import httpx
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from schemas import TodoCreateModel, TodoUpdateModel
 from models import Todo
 from repositories.todos_repository import TodoRepository
 from exceptions.user_not_found_exception import UserNotFoundException
+from exceptions.deadline_exceeded_exception import DeadlineExceededException
+import deadlines
+
+USERS_SERVICE_TIMEOUT = float(os.getenv('USERS_SERVICE_TIMEOUT', '5'))
+USERS_CHECK_CONCURRENCY = int(os.getenv('USERS_CHECK_CONCURRENCY', '16'))
+
+# Opened by the app lifespan, so calls reuse kept-alive connections to the Users service
+_users_client: Optional[httpx.AsyncClient] = None
+
+
+@lru_cache(maxsize=None)
+def users_tls_context() -> ssl.SSLContext:
+    # Loading the CA bundle takes tens of ms; it is loaded on first use and shared by every
+    # Users service client instead of once per client. Certificates are still verified.
+    return httpx.create_ssl_context()
+
+
+async def open_users_client() -> httpx.AsyncClient:
+    global _users_client
+    if _users_client is None:
+        _users_client = httpx.AsyncClient(verify=users_tls_context())
+    return _users_client
+
+
+async def close_users_client() -> None:
+    global _users_client
+    if _users_client is not None:
+        await _users_client.aclose()
+        _users_client = None
+
+
+@asynccontextmanager
+async def users_client(timeout: Optional[float]):
+    # The shared client when it is open; CLIs and tests without the lifespan get a client per call
+    if _users_client is not None:
+        yield _users_client
+    else:
+        async with httpx.AsyncClient(timeout=timeout, verify=users_tls_context()) as client:
+            yield client
 
 
 class TodoService:
@@ -14,9 +58,12 @@ class TodoService:
     async def find_user_by_id(self, user_id: int):
         base_url = os.getenv('USERS_SERVICE_URL', 'http://localhost:8001')
         url = f"{base_url}/users/{user_id}"
-        async with httpx.AsyncClient() as client:
+        # Never wait on the Users service past the request deadline
+        deadlines.check()
+        timeout = deadlines.remaining(USERS_SERVICE_TIMEOUT)
+        async with users_client(timeout) as client:
             try:
-                response = await client.get(url)
+                response = await client.get(url, timeout=timeout)
                 response.raise_for_status()  # Raise exception for non-2xx responses
                 return response.json() if response.status_code == 200 else None
             except httpx.HTTPStatusError as e:
@@ -24,6 +71,10 @@ class TodoService:
                     return None  # User not found
                 else:
                     raise  # Raise other HTTP status errors
+            except httpx.TimeoutException:
+                if deadlines.expired():
+                    raise DeadlineExceededException()
+                raise
             except httpx.RequestError:
                 raise  # Handle network or request errors
         
@@ -31,6 +82,18 @@ class TodoService:
         user_data = await self.find_user_by_id(user_id)
         return user_data is not None
 
+    async def check_users_exist(self, user_ids: list[int]) -> dict[int, bool]:
+        # Check each distinct user once, with bounded fan-out to the Users service
+        distinct_ids = list(dict.fromkeys(user_ids))
+        semaphore = asyncio.Semaphore(USERS_CHECK_CONCURRENCY)
+
+        async def check(user_id: int) -> bool:
+            async with semaphore:
+                return await self.check_user_exists(user_id)
+
+        results = await asyncio.gather(*(check(user_id) for user_id in distinct_ids))
+        return dict(zip(distinct_ids, results))
+
     async def create_todo(self, todo_data: TodoCreateModel, session: AsyncSession) -> Todo:
         # Validate user_id exists
         user = await self.find_user_by_id(todo_data.user_id)
@@ -45,11 +108,11 @@ class TodoService:
         )
         return await self.todo_repository.add(session, new_todo)
 
-    async def get_todo(self, todo_id: int, session: AsyncSession) -> Todo:
-        return await self.todo_repository.get_by_id(session, todo_id)
+    async def get_todo(self, todo_id: int, session: AsyncSession, fields: Optional[tuple[str, ...]] = None) -> Todo:
+        return await self.todo_repository.get_by_id(session, todo_id, fields)
 
-    async def get_todos(self, session: AsyncSession) -> list[Todo]:
-        return await self.todo_repository.get_all(session)
+    async def get_todos(self, session: AsyncSession, fields: Optional[tuple[str, ...]] = None) -> list[Todo]:
+        return await self.todo_repository.get_all(session, fields)
 
     async def update_todo(self, todo_id: int, todo_data: TodoUpdateModel, session: AsyncSession) -> Todo:
         # Validate user_id exists
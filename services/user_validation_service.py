@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Todo, VALIDATED, PENDING_VALIDATION, INVALID_USER
+from metrics import REGISTRY
+from repositories.summary_repository import TodoSummaryRepository, deltas_for_rows
+from services.todos_service import TodoService
+from events.broker import publish_bulk_events
+
+logger = logging.getLogger(__name__)
+
+USER_VALIDATION_WORKERS = int(os.getenv("USER_VALIDATION_WORKERS", "4"))
+USER_VALIDATION_BATCH_SIZE = int(os.getenv("USER_VALIDATION_BATCH_SIZE", "100"))
+USER_VALIDATION_POLL_INTERVAL = float(os.getenv("USER_VALIDATION_POLL_INTERVAL", "1.0"))
+# "delete" removes todos of users that do not exist, "flag" keeps them as invalid_user
+USER_VALIDATION_INVALID_ACTION = os.getenv("USER_VALIDATION_INVALID_ACTION", "delete")
+
+validated_users_total = REGISTRY.counter(
+    "user_validation_users_total", "Users checked by the deferred validator", ("result",))
+validation_errors_total = REGISTRY.counter(
+    "user_validation_errors_total", "Validator batches that failed and will be retried")
+
+
+class UserValidationService:
+    # Each worker owns the users with user_id % workers == its index, so workers in one
+    # process never check the same user twice; updates only touch pending rows, so
+    # overlapping workers in other processes are harmless.
+    def __init__(self, session_factory=None, todos_service: Optional[TodoService] = None,
+                 workers: int = USER_VALIDATION_WORKERS, batch_size: int = USER_VALIDATION_BATCH_SIZE,
+                 poll_interval: float = USER_VALIDATION_POLL_INTERVAL,
+                 invalid_action: str = USER_VALIDATION_INVALID_ACTION):
+        self.session_factory = session_factory
+        self.todos_service = todos_service or TodoService()
+        self.summary_repository = TodoSummaryRepository()
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.invalid_action = invalid_action
+        self._tasks: list[asyncio.Task] = []
+        self._wakeups: list[asyncio.Event] = []
+
+    async def start(self) -> None:
+        if self.session_factory is None:
+            from dependencies import get_router
+            self.session_factory = get_router().async_session
+        self._wakeups = [asyncio.Event() for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._run_worker(worker)) for worker in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeups = []
+
+    def notify(self) -> None:
+        # Called after a pending todo is committed, so it is checked without waiting for the next poll
+        for wakeup in self._wakeups:
+            wakeup.set()
+
+    async def validate_batch(self, session: AsyncSession, worker: int = 0) -> int:
+        pending = Todo.validation_status == PENDING_VALIDATION
+        result = await session.execute(
+            select(Todo.user_id).where(pending, Todo.user_id % self.workers == worker)
+            .distinct().limit(self.batch_size))
+        user_ids = result.scalars().all()
+        # No transaction stays open while the Users service is called
+        await session.commit()
+        if not user_ids:
+            return 0
+
+        users_exist = await self.todos_service.check_users_exist(user_ids)
+        valid_user_ids = [user_id for user_id, exists in users_exist.items() if exists]
+        invalid_user_ids = [user_id for user_id, exists in users_exist.items() if not exists]
+
+        validated = []
+        if valid_user_ids:
+            result = await session.execute(
+                update(Todo).where(pending, Todo.user_id.in_(valid_user_ids))
+                .values(validation_status=VALIDATED)
+                .returning(Todo.id, Todo.user_id, Todo.is_completed),
+                execution_options={"synchronize_session": False})
+            validated = result.all()
+            await self.summary_repository.apply(
+                session, deltas_for_rows((user_id, is_completed) for _, user_id, is_completed in validated))
+        if invalid_user_ids:
+            if self.invalid_action == "flag":
+                statement = update(Todo).values(validation_status=INVALID_USER)
+            else:
+                statement = delete(Todo)
+            await session.execute(
+                statement.where(pending, Todo.user_id.in_(invalid_user_ids)),
+                execution_options={"synchronize_session": False})
+        await session.commit()
+
+        validated_users_total.inc(len(valid_user_ids), result="valid")
+        validated_users_total.inc(len(invalid_user_ids), result="invalid")
+        # Subscribers only hear about a deferred create once it is visible
+        await publish_bulk_events("created", validated)
+        return len(user_ids)
+
+    async def _run_worker(self, worker: int) -> None:
+        while True:
+            try:
+                async with self.session_factory() as session:
+                    checked = await self.validate_batch(session, worker)
+            except Exception:
+                # e.g. the Users service is down: rows stay pending and are retried after the poll interval
+                logger.exception("User validation batch failed")
+                validation_errors_total.inc()
+                checked = 0
+            if checked < self.batch_size:
+                await self._wait(worker)
+
+    async def _wait(self, worker: int) -> None:
+        wakeup = self._wakeups[worker]
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+
+
+_service = None
+
+
+def get_user_validation_service() -> UserValidationService:
+    global _service
+    if _service is None:
+        from container import get_todos_service
+        _service = UserValidationService(todos_service=get_todos_service())
+    return _service
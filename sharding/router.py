@@ -0,0 +1,147 @@
+import asyncio
+import os
+from typing import Callable, Iterable, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, ColumnClause
+from models import Todo, ArchivedTodo, TodoUserSummary
+
+# Todo ids of shard n are n * SHARD_ID_RANGE + 1 up to (n + 1) * SHARD_ID_RANGE, so the
+# shard of a todo follows from its id. The default keeps 16 shards within a 32-bit id.
+SHARD_ID_RANGE = int(os.getenv("SHARD_ID_RANGE", str(2 ** 27)))
+# Tables without a user_id (idempotency_keys) live on the first shard only
+GLOBAL_SHARD = "0"
+
+USER_TABLES = {Todo.__table__, ArchivedTodo.__table__, TodoUserSummary.__table__}
+TODO_ID_TABLES = {Todo.__table__, ArchivedTodo.__table__}
+
+
+class ShardRouter:
+    # Users are spread over the shards by user_id % shards; each user's todos,
+    # archived todos and summary row live on the user's shard
+    def __init__(self, engines: list[AsyncEngine], session_class=Session, id_range: int = SHARD_ID_RANGE):
+        self.engines = {str(index): engine for index, engine in enumerate(engines)}
+        self.shard_ids = list(self.engines)
+        self.id_range = id_range
+        # One sessionmaker per shard, for scatter-gather and per-shard jobs
+        self.shard_sessions = {
+            shard_id: async_sessionmaker(bind=engine, expire_on_commit=False, sync_session_class=session_class)
+            for shard_id, engine in self.engines.items()
+        }
+        if len(engines) == 1:
+            self.async_session = self.shard_sessions[GLOBAL_SHARD]
+        else:
+            self.async_session = async_sessionmaker(
+                expire_on_commit=False, sync_session_class=ShardedTodoSession, router=self)
+
+    def for_user(self, user_id: int) -> str:
+        return self.shard_ids[user_id % len(self.shard_ids)]
+
+    def for_todo(self, todo_id: int) -> Optional[str]:
+        index = (todo_id - 1) // self.id_range
+        return str(index) if 0 <= index < len(self.shard_ids) else None
+
+    def group_by_shard(self, items: Iterable, user_id_of: Callable) -> dict[str, list]:
+        groups = {}
+        for item in items:
+            groups.setdefault(self.for_user(user_id_of(item)), []).append(item)
+        return groups
+
+    async def scatter(self, query: Callable) -> list:
+        # Runs query(session) on every shard concurrently, each in its own session
+        async def run(session_factory):
+            async with session_factory() as session:
+                return await query(session)
+
+        return await asyncio.gather(*(run(session_factory) for session_factory in self.shard_sessions.values()))
+
+    def shard_chooser(self, mapper, instance, clause=None, **kw) -> str:
+        user_id = getattr(instance, "user_id", None)
+        return self.for_user(user_id) if user_id is not None else GLOBAL_SHARD
+
+    def identity_chooser(self, mapper, primary_key, **kw) -> list[str]:
+        if mapper.local_table in TODO_ID_TABLES:
+            shard_id = self.for_todo(primary_key[0])
+            return [shard_id] if shard_id is not None else []
+        if mapper.local_table is TodoUserSummary.__table__:
+            return [self.for_user(primary_key[0])]
+        return [GLOBAL_SHARD]
+
+    def execute_chooser(self, context) -> list[str]:
+        mapper = context.bind_mapper
+        if mapper is None or mapper.local_table not in USER_TABLES:
+            return [GLOBAL_SHARD]
+        user_ids, todo_ids = criteria_values(getattr(context.statement, "whereclause", None), context.parameters)
+        if user_ids is not None:
+            return sorted({self.for_user(user_id) for user_id in user_ids})
+        if todo_ids is not None and mapper.local_table in TODO_ID_TABLES:
+            return sorted({shard_id for shard_id in map(self.for_todo, todo_ids) if shard_id is not None})
+        return self.shard_ids
+
+
+class ShardedTodoSession(ShardedSession):
+    def __init__(self, router: ShardRouter, **kwargs):
+        self.router = router
+        kwargs.pop("bind", None)
+        super().__init__(
+            shard_chooser=router.shard_chooser,
+            identity_chooser=router.identity_chooser,
+            execute_chooser=router.execute_chooser,
+            shards={shard_id: engine.sync_engine for shard_id, engine in router.engines.items()},
+            **kwargs)
+
+
+def shard_router(session) -> Optional[ShardRouter]:
+    # The router behind a sharded session (async or sync), None for a single database
+    sync_session = getattr(session, "sync_session", session)
+    return sync_session.router if isinstance(sync_session, ShardedTodoSession) else None
+
+
+def criteria_values(whereclause, parameters=None) -> tuple[Optional[set], Optional[set]]:
+    # user_id and id values from `column == value` / `column IN (...)` terms ANDed at the
+    # top of a WHERE clause; None when a column is not constrained that way. Values of
+    # bindparam() placeholders come from the execution parameters.
+    if whereclause is None:
+        return None, None
+    if isinstance(whereclause, BooleanClauseList) and whereclause.operator is operators.and_:
+        terms = whereclause.clauses
+    else:
+        terms = [whereclause]
+
+    found = {}
+    for term in terms:
+        if not isinstance(term, BinaryExpression) or not isinstance(term.left, ColumnClause):
+            continue
+        if term.left.table not in USER_TABLES or not isinstance(term.right, BindParameter):
+            continue
+        value = term.right.effective_value
+        if isinstance(parameters, dict) and term.right.key in parameters:
+            value = parameters[term.right.key]
+        if value is None:
+            continue
+        if term.operator is operators.eq:
+            values = {value}
+        elif term.operator is operators.in_op:
+            values = set(value)
+        else:
+            continue
+        name = term.left.name
+        # Several terms on one column narrow it down further
+        found[name] = found[name] & values if name in found else values
+    return found.get("user_id"), found.get("id")
+
+
+async def seed_todo_ids(connection, shard_index: int, id_range: int = SHARD_ID_RANGE) -> None:
+    # Starts the shard's todos id sequence at the beginning of its range
+    first_id = shard_index * id_range + 1
+    if connection.dialect.name == "postgresql":
+        await connection.execute(
+            text("SELECT setval(pg_get_serial_sequence('todos', 'id'), :first_id, false)"), {"first_id": first_id})
+    elif connection.dialect.name == "sqlite" and shard_index:
+        # Needs the AUTOINCREMENT table, which keeps its counter in sqlite_sequence
+        await connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'todos'"))
+        await connection.execute(
+            text("INSERT INTO sqlite_sequence (name, seq) VALUES ('todos', :seq)"), {"seq": first_id - 1})
@@ -0,0 +1,167 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+from commands import CreateTodoCommand, BulkCompleteTodosCommand, BulkDeleteTodosCommand, BulkReassignTodosCommand
+from database import Base
+from dependencies import TodoSession
+from exceptions.cross_shard_move_exception import CrossShardMoveException
+from handlers.command_handler import TodoCommandHandler
+from handlers.query_handler import TodoQueryHandler
+from models import Todo, TodoUserSummary
+from queries import GetTodosByUserQuery, GetTodosByIdsQuery, GetTodoSummaryByUserQuery
+from repositories.statements import TODOS_BY_IDS, TODOS_BY_USER
+from repositories.todos_repository import TodoRepository
+from services.stats_service import TodoStatsService
+from services.todos_service import TodoService
+from sharding.router import ShardRouter, criteria_values, seed_todo_ids
+
+
+class TestCriteriaValues(unittest.TestCase):
+
+    def test_reads_equality_and_in_terms(self):
+        statement = select(Todo).filter(Todo.user_id == 4, Todo.id.in_([7, 9]), Todo.is_completed == True)
+        self.assertEqual(criteria_values(statement.whereclause), ({4}, {7, 9}))
+
+    def test_reads_bound_parameters(self):
+        self.assertEqual(criteria_values(TODOS_BY_IDS.whereclause, {"ids": [7, 9]}), (None, {7, 9}))
+        self.assertEqual(criteria_values(TODOS_BY_USER.whereclause, {"user_id": 4}), ({4}, None))
+        self.assertEqual(criteria_values(TODOS_BY_USER.whereclause), (None, None))
+
+    def test_ignores_or_and_computed_terms(self):
+        self.assertEqual(criteria_values(select(Todo).filter((Todo.user_id == 1) | (Todo.user_id == 2)).whereclause),
+                         (None, None))
+        self.assertEqual(criteria_values(select(Todo).filter(Todo.user_id % 4 == 1).whereclause), (None, None))
+
+
+class TestShardedTodos(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        patcher = patch.object(TodoService, 'check_user_exists', new_callable=AsyncMock, return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.directory = tempfile.TemporaryDirectory()
+        engines = [
+            create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.directory.name, f'shard{index}.db')}")
+            for index in range(3)
+        ]
+        for index, engine in enumerate(engines):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await seed_todo_ids(conn, index, id_range=1000)
+        self.router = ShardRouter(engines, session_class=TodoSession, id_range=1000)
+
+        # users 0-5 on shards 0, 1, 2, 0, 1, 2
+        handler = TodoCommandHandler(validation_mode="sync")
+        self.ids = {}
+        async with self.router.async_session() as session:
+            for user_id in range(6):
+                for index in range(2):
+                    todo = await handler.handle_create_todo_command(CreateTodoCommand(
+                        title=f"Todo {index}", description="", is_completed=index == 0, user_id=user_id), session)
+                    self.ids.setdefault(user_id, []).append(todo.id)
+
+    async def asyncTearDown(self):
+        for engine in self.router.engines.values():
+            await engine.dispose()
+        self.directory.cleanup()
+
+    async def shard_rows(self, shard_id: str, entity):
+        async with self.router.shard_sessions[shard_id]() as session:
+            return (await session.execute(select(entity))).scalars().all()
+
+    async def test_todos_live_on_their_users_shard_with_shard_ids(self):
+        for shard_id in self.router.shard_ids:
+            todos = await self.shard_rows(shard_id, Todo)
+            summaries = await self.shard_rows(shard_id, TodoUserSummary)
+            self.assertEqual({todo.user_id % 3 for todo in todos}, {int(shard_id)})
+            self.assertEqual({summary.user_id % 3 for summary in summaries}, {int(shard_id)})
+        self.assertEqual(self.ids[1], [1001, 1002])
+        self.assertEqual(self.ids[3], [3, 4])
+        self.assertEqual(self.router.for_todo(self.ids[5][0]), "2")
+
+    async def test_reads_route_by_id_and_user(self):
+        async with self.router.async_session() as session:
+            todo = await TodoRepository().get_by_id(session, self.ids[4][1])
+            by_user = await TodoQueryHandler().handle_get_todos_by_user_query(GetTodosByUserQuery(user_id=2), session)
+            by_ids = await TodoQueryHandler().handle_get_todos_by_ids_query(
+                GetTodosByIdsQuery(ids=[self.ids[5][0], self.ids[0][1], self.ids[1][0]]), session)
+            summary = await TodoQueryHandler().handle_get_todo_summary_by_user_query(
+                GetTodoSummaryByUserQuery(user_id=4), session)
+
+        self.assertEqual((todo.user_id, todo.title), (4, "Todo 1"))
+        self.assertEqual([todo.id for todo in by_user], self.ids[2])
+        self.assertEqual([todo.id for todo in by_ids], sorted([self.ids[5][0], self.ids[0][1], self.ids[1][0]]))
+        self.assertEqual((summary["total"], summary["completed"]), (2, 1))
+
+    async def test_get_all_merges_shards_in_id_order(self):
+        async with self.router.async_session() as session:
+            todos = await TodoRepository().get_all(session)
+
+        self.assertEqual([todo.id for todo in todos], sorted(todo_id for ids in self.ids.values() for todo_id in ids))
+
+    async def test_update_keeps_todo_on_its_shard(self):
+        async with self.router.async_session() as session:
+            with self.assertRaises(CrossShardMoveException):
+                await TodoRepository().update(session, self.ids[1][0], {"user_id": 2})
+            await session.rollback()
+            todo = await TodoRepository().update(session, self.ids[1][0], {"user_id": 4})
+
+        self.assertEqual(todo.user_id, 4)
+        summaries = {summary.user_id: summary.total for summary in await self.shard_rows("1", TodoUserSummary)}
+        self.assertEqual(summaries, {1: 1, 4: 3})
+
+    async def test_bulk_commands_update_each_shard(self):
+        handler = TodoCommandHandler()
+        async with self.router.async_session() as session:
+            completed = await handler.handle_bulk_complete_todos_command(BulkCompleteTodosCommand(user_id=4), session)
+            deleted = await handler.handle_bulk_delete_todos_command(
+                BulkDeleteTodosCommand(is_completed=False, batch_size=2), session)
+            reassigned = await handler.handle_bulk_reassign_todos_command(
+                BulkReassignTodosCommand(from_user_id=0, to_user_id=3), session)
+            with self.assertRaises(CrossShardMoveException):
+                await handler.handle_bulk_reassign_todos_command(
+                    BulkReassignTodosCommand(from_user_id=1, to_user_id=2), session)
+            stats = await TodoStatsService(cache_ttl=0)._compute(session, 7)
+
+        self.assertEqual((completed, deleted, reassigned), (1, 5, 1))
+        summaries = {
+            summary.user_id: (summary.total, summary.completed)
+            for shard_id in self.router.shard_ids for summary in await self.shard_rows(shard_id, TodoUserSummary)
+        }
+        self.assertEqual(summaries, {0: (0, 0), 1: (1, 1), 2: (1, 1), 3: (2, 2), 4: (2, 2), 5: (1, 1)})
+        self.assertEqual((stats.total, stats.completed), (7, 7))
+        self.assertEqual(stats.todos_per_user.users, 5)
+        self.assertEqual(stats.created_per_day[-1].count, 7)
+
+
+    async def test_batched_bulk_commands_for_one_user_stay_on_its_shard(self):
+        chosen = []
+        execute_chooser = self.router.execute_chooser
+
+        def record(context):
+            shard_ids = execute_chooser(context)
+            if context.is_update or context.is_delete:
+                chosen.append(shard_ids)
+            return shard_ids
+
+        handler = TodoCommandHandler()
+        with patch.object(self.router, "execute_chooser", record):
+            async with self.router.async_session() as session:
+                completed = await handler.handle_bulk_complete_todos_command(
+                    BulkCompleteTodosCommand(user_id=4, batch_size=1), session)
+                reassigned = await handler.handle_bulk_reassign_todos_command(
+                    BulkReassignTodosCommand(from_user_id=0, to_user_id=3, batch_size=1), session)
+                deleted = await handler.handle_bulk_delete_todos_command(
+                    BulkDeleteTodosCommand(user_id=5, batch_size=1), session)
+
+        self.assertEqual((completed, reassigned, deleted), (1, 2, 2))
+        # Every batch ran on its user's shard alone
+        self.assertTrue(chosen)
+        self.assertTrue(all(len(shard_ids) == 1 for shard_ids in chosen))
+        self.assertEqual(sorted({shard_ids[0] for shard_ids in chosen}), ["0", "1", "2"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+import unittest
+import container
+
+# Run in a fresh interpreter, so modules other tests imported do not count
+IMPORT_MAIN = """
+import sys
+import container, database, main
+print(database._shard_engines is None, container.get_todos_service.cache_info().currsize, "numpy" in sys.modules)
+"""
+
+
+class TestContainer(unittest.TestCase):
+
+    def setUp(self):
+        for getter in (container.get_todos_service, container.get_command_handler, container.get_query_handler,
+                       container.get_import_service, container.get_stats_service):
+            getter.cache_clear()
+            self.addCleanup(getter.cache_clear)
+
+    def test_handlers_share_one_todos_service(self):
+        todos_service = container.get_todos_service()
+
+        self.assertIs(container.get_command_handler().todos_service, todos_service)
+        self.assertIs(container.get_query_handler().todos_service, todos_service)
+        self.assertIs(container.get_import_service().todos_service, todos_service)
+        self.assertIs(container.get_command_handler(), container.get_command_handler())
+
+    def test_importing_the_app_builds_nothing(self):
+        output = subprocess.run([sys.executable, "-c", IMPORT_MAIN], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+
+        self.assertEqual(output.split(), ["True", "0", "False"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import signal
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+import uvicorn
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import lifecycle
+from database import Base
+from dependencies import TodoSession
+from serve import DrainingServer
+
+
+class TestWarmUp(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.directory.name, 'todos.db')}")
+        self.session_factory = async_sessionmaker(
+            bind=self.engine, expire_on_commit=False, sync_session_class=TodoSession)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.directory.cleanup()
+
+    @patch("lifecycle.warm_users_client", new_callable=AsyncMock)
+    async def test_warm_up_fills_pool_and_statement_cache(self, mock_warm_users_client):
+        pool = self.engine.sync_engine.pool
+
+        await lifecycle.warm_up({0: self.session_factory})
+
+        self.assertEqual(pool.checkedin(), pool.size())
+        self.assertEqual(pool.checkedout(), 0)
+        self.assertGreaterEqual(len(self.engine.sync_engine._compiled_cache), len(lifecycle.WARMUP_STATEMENTS))
+        mock_warm_users_client.assert_awaited_once()
+
+    @patch("lifecycle.warm_users_client", new_callable=AsyncMock)
+    async def test_warm_up_survives_database_errors(self, mock_warm_users_client):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+
+        with self.assertLogs("lifecycle", level="ERROR"):
+            await lifecycle.warm_up({0: self.session_factory})
+
+        self.assertEqual(self.engine.sync_engine.pool.checkedout(), 0)
+        mock_warm_users_client.assert_awaited_once()
+
+
+class TestDrainingServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = DrainingServer(uvicorn.Config(MagicMock()))
+        self.addCleanup(setattr, lifecycle, "_draining", False)
+
+    @patch.object(lifecycle, "DRAIN_DELAY", 60)
+    def test_first_signal_drains_second_exits(self):
+        self.server.handle_exit(signal.SIGTERM, None)
+
+        self.assertTrue(lifecycle.is_draining())
+        self.assertFalse(self.server.should_exit)
+
+        self.server.handle_exit(signal.SIGTERM, None)
+
+        self.assertTrue(self.server.should_exit)
+
+    @patch.object(lifecycle, "DRAIN_DELAY", 0)
+    def test_no_drain_delay_exits_at_once(self):
+        self.server.handle_exit(signal.SIGTERM, None)
+
+        self.assertTrue(self.server.should_exit)
+
+
+if __name__ == '__main__':
+    unittest.main()